@@ -0,0 +1,44 @@
+import sys
+from io import BytesIO
+from time import perf_counter
+
+import _pillow_heif
+import pillow_heif
+
+
+def create_image(size: tuple[int, int], mode: str) -> bytes:
+    buf = BytesIO()
+    bytes_per_pixel = len(mode.split(";")[0]) * 2
+    pillow_heif.from_bytes(mode, size, bytes(size[0] * size[1] * bytes_per_pixel)).save(buf, quality=-1)
+    return buf.getvalue()
+
+
+def measure(data: bytes, iterations: int, **kwargs) -> float:
+    start_time = perf_counter()
+    for _ in range(iterations):
+        pillow_heif.open_heif(data, convert_hdr_to_8bit=False, **kwargs)[0].load()
+    return perf_counter() - start_time
+
+
+if __name__ == "__main__":
+    n_iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    image_size = (8064, 6048)
+    for image_mode in ("RGB;16", "RGBA;16"):
+        image_data = create_image(image_size, image_mode)
+        for bgr_mode in (False, True):
+            for remove_stride in (False, True):
+                args = {"bgr_mode": bgr_mode, "remove_stride": remove_stride}
+                kernels = _pillow_heif.set_simd(False)
+                time_scalar = measure(image_data, n_iterations, **args)
+                kernels_simd = _pillow_heif.set_simd(True)
+                time_simd = measure(image_data, n_iterations, **args)
+                print(
+                    f"{image_mode} {args}: {kernels}: {time_scalar:.3f}s, "
+                    f"{kernels_simd}: {time_simd:.3f}s ({time_scalar / time_simd:.2f}x)"
+                )
+        # postprocess is split in bands between `DECODE_THREADS` threads, except in-place stride removal
+        for decode_threads in (1, 2, 4, 8):
+            pillow_heif.options.DECODE_THREADS = decode_threads
+            time_threads = measure(image_data, n_iterations, bgr_mode=True, remove_stride=False)
+            print(f"{image_mode} bgr_mode, DECODE_THREADS={decode_threads}: {time_threads:.3f}s")
+    sys.exit(0)
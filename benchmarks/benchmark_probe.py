@@ -0,0 +1,47 @@
+import sys
+from pathlib import Path
+from time import perf_counter
+
+import pillow_heif
+
+EXTENSIONS = (".heic", ".heif", ".hif", ".avif")
+
+
+def can_open(file: Path) -> bool:
+    try:
+        pillow_heif.open_heif(file)
+    except (ValueError, EOFError, SyntaxError, RuntimeError):
+        return False
+    return True
+
+
+def measure(func, files: list[Path], iterations: int) -> float:
+    start_time = perf_counter()
+    for _ in range(iterations):
+        for file in files:
+            func(file)
+    return perf_counter() - start_time
+
+
+def open_heif_headers(file: Path) -> None:
+    heif_file = pillow_heif.open_heif(file)
+    for image in heif_file:
+        _ = image.size, image.mode, image.info["bit_depth"]
+
+
+def probe_heif_headers(file: Path) -> None:
+    probe = pillow_heif.probe_heif(file)
+    for image in probe.images:
+        _ = image.size, image.mode, image.bit_depth
+
+
+if __name__ == "__main__":
+    images_dir = Path(sys.argv[1]) if len(sys.argv) > 1 else Path(__file__).parent.parent.joinpath("tests/images")
+    n_iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    test_files = sorted(i for i in images_dir.rglob("*") if i.suffix.lower() in EXTENSIONS and can_open(i))
+    print(f"Files: {len(test_files)}, iterations: {n_iterations}")
+    time_open = measure(open_heif_headers, test_files, n_iterations)
+    print(f"open_heif: {time_open:.3f}s")
+    time_probe = measure(probe_heif_headers, test_files, n_iterations)
+    print(f"probe_heif: {time_probe:.3f}s ({time_open / time_probe:.1f}x)")
+    sys.exit(0)
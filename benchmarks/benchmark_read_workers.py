@@ -0,0 +1,29 @@
+import sys
+from pathlib import Path
+from time import perf_counter
+
+import pillow_heif
+
+
+def measure(file: Path, iterations: int, workers: int) -> float:
+    start_time = perf_counter()
+    for _ in range(iterations):
+        pillow_heif.read_heif(file, workers=workers)
+    return perf_counter() - start_time
+
+
+if __name__ == "__main__":
+    test_file = (
+        Path(sys.argv[1])
+        if len(sys.argv) > 1
+        else Path(__file__).parent.parent.joinpath("tests/images/heif/zPug_3.heic")
+    )
+    n_iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    print(f"File: {test_file}, images: {len(pillow_heif.open_heif(test_file))}, iterations: {n_iterations}")
+    print(f"DECODE_THREADS: {pillow_heif.options.DECODE_THREADS}")
+    time_sequential = measure(test_file, n_iterations, 1)
+    print(f"workers=1: {time_sequential:.3f}s")
+    for n_workers in (2, 4):
+        time_workers = measure(test_file, n_iterations, n_workers)
+        print(f"workers={n_workers}: {time_workers:.3f}s ({time_sequential / time_workers:.2f}x)")
+    sys.exit(0)
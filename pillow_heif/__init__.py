@@ -7,6 +7,8 @@ from .as_plugin import (
     HeifImageFile,
     register_heif_opener,
 )
+from .batch import HeifDecodeResult, decode_many
+from .cache import HeifDecodeCache
 from .constants import (
     HeifColorPrimaries,
     HeifDepthRepresentationType,
@@ -18,11 +20,16 @@ from .heif import (
     HeifDepthImage,
     HeifFile,
     HeifImage,
+    HeifPlane,
+    HeifThumbnailImage,
     encode,
+    encode_tiles,
     from_bytes,
     from_pillow,
     is_supported,
     open_heif,
+    open_heif_async,
     read_heif,
 )
 from .misc import get_file_mimetype, load_libheif_plugin, set_orientation
+from .probe import HeifProbe, HeifProbeImage, probe_heif
@@ -0,0 +1,298 @@
+"""Helpers of the image classes: lazily read ``info``, the cache of decoded frames and the geometry of regions.
+
+For internal use, so prototypes can change between versions.
+"""
+
+from collections import OrderedDict
+from collections.abc import Iterator
+from math import ceil
+from threading import Lock
+from typing import Any, ClassVar
+
+from . import options
+from .misc import (
+    MODE_INFO,
+    _get_heif_meta,
+    _retrieve_exif,
+    _retrieve_xmp,
+    save_colorspace_chroma,
+)
+
+
+class _LazyInfo(dict):  # noqa: FURB189  must stay a real `dict` for Pillow's `Image.info`
+    """``info`` dictionary of :py:class:`~pillow_heif.HeifImage`, which reads the values from the image on first access.
+
+    The keys are read in groups: accessing ``exif`` also reads ``metadata`` and ``xmp`` as they come from the
+    same blocks. Iterating, copying or comparing reads everything.
+    """
+
+    _KEY_GROUPS: ClassVar[dict[str, str]] = {
+        "exif": "metadata",
+        "metadata": "metadata",
+        "xmp": "metadata",
+        "thumbnails": "thumbnails",
+        "depth_images": "depth_images",
+        "aux": "aux",
+        "heif": "heif",
+        "pixel_aspect_ratio": "pixel_aspect_ratio",
+        "content_light_level": "hdr",
+        "mastering_display_colour_volume": "hdr",
+        "ambient_viewing_environment": "hdr",
+        "tiling": "tiling",
+        "icc_profile": "color_profile",
+        "icc_profile_type": "color_profile",
+        "nclx_profile": "color_profile",
+    }
+
+    def __init__(self, c_image, depth_image_class: type):
+        super().__init__(primary=bool(c_image.primary), bit_depth=int(c_image.bit_depth))
+        save_colorspace_chroma(c_image, self)
+        self._c_image = c_image
+        self._depth_image_class = depth_image_class
+        self._options = (options.THUMBNAILS, options.DEPTH_IMAGES, options.AUX_IMAGES)
+        self._pending = list(dict.fromkeys(self._KEY_GROUPS.values()))
+        self._lock = Lock()
+
+    def _load_group(self, group: str) -> None:
+        if group in self._pending:
+            with self._lock:
+                if group in self._pending:
+                    super().update(getattr(self, f"_read_{group}")(self._c_image))
+                    self._pending.remove(group)
+                    if not self._pending:
+                        self._c_image = None  # everything is read, the image is not needed anymore
+
+    def _load_key(self, key) -> None:
+        group = self._KEY_GROUPS.get(key) if isinstance(key, str) else None
+        if group is not None:
+            self._load_group(group)
+
+    def _load_all(self) -> None:
+        for group in tuple(self._pending):
+            self._load_group(group)
+
+    @staticmethod
+    def _read_metadata(c_image) -> dict:
+        metadata: list[dict] = c_image.metadata
+        r = {"exif": _retrieve_exif(metadata), "metadata": metadata}
+        xmp = _retrieve_xmp(metadata)
+        if xmp:
+            r["xmp"] = xmp
+        return r
+
+    def _read_thumbnails(self, c_image) -> dict:
+        thumbnails: list[int | None] = [i for i in c_image.thumbnails if i is not None] if self._options[0] else []
+        return {"thumbnails": thumbnails}
+
+    def _read_depth_images(self, c_image) -> dict:
+        depth_images: list = (
+            [self._depth_image_class(i) for i in c_image.depth_image_list if i is not None] if self._options[1] else []
+        )
+        return {"depth_images": depth_images}
+
+    def _read_aux(self, c_image) -> dict:
+        if not self._options[2]:
+            return {}
+        ctx_aux_info: dict[str, list[int]] = {}
+        for aux_id in c_image.aux_image_ids:
+            aux_type = c_image.get_aux_type(aux_id)
+            if aux_type not in ctx_aux_info:
+                ctx_aux_info[aux_type] = []
+            ctx_aux_info[aux_type].append(aux_id)
+        return {"aux": ctx_aux_info}
+
+    @staticmethod
+    def _read_heif(c_image) -> dict:
+        heif_meta = _get_heif_meta(c_image)
+        return {"heif": heif_meta} if heif_meta else {}
+
+    @staticmethod
+    def _read_pixel_aspect_ratio(c_image) -> dict:
+        pixel_aspect_ratio = c_image.pixel_aspect_ratio
+        return {"pixel_aspect_ratio": pixel_aspect_ratio} if pixel_aspect_ratio else {}
+
+    @staticmethod
+    def _read_hdr(c_image) -> dict:
+        r = {}
+        for key in ("content_light_level", "mastering_display_colour_volume", "ambient_viewing_environment"):
+            value = getattr(c_image, key)
+            if value:
+                r[key] = value
+        return r
+
+    @staticmethod
+    def _read_tiling(c_image) -> dict:
+        tiling = c_image.tiling
+        return {"tiling": tiling} if tiling else {}
+
+    @staticmethod
+    def _read_color_profile(c_image) -> dict:
+        color_profile: dict[str, Any] = c_image.color_profile
+        if not color_profile:
+            return {}
+        if color_profile["type"] in ("rICC", "prof"):
+            return {"icc_profile": color_profile["data"], "icc_profile_type": color_profile["type"]}
+        return {"nclx_profile": color_profile["data"]}
+
+    def __getitem__(self, key):
+        self._load_key(key)
+        return super().__getitem__(key)
+
+    def get(self, key, default=None):
+        self._load_key(key)
+        return super().get(key, default)
+
+    def __contains__(self, key):
+        self._load_key(key)
+        return super().__contains__(key)
+
+    def __setitem__(self, key, value):
+        self._load_key(key)
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        self._load_key(key)
+        super().__delitem__(key)
+
+    def pop(self, key, *args):
+        self._load_key(key)
+        return super().pop(key, *args)
+
+    def setdefault(self, key, default=None):
+        self._load_key(key)
+        return super().setdefault(key, default)
+
+    def popitem(self):
+        self._load_all()
+        return super().popitem()
+
+    def update(self, *args, **kwargs):
+        self._load_all()
+        super().update(*args, **kwargs)
+
+    def clear(self):
+        self._load_all()
+        super().clear()
+
+    def __iter__(self):
+        self._load_all()
+        return super().__iter__()
+
+    def __reversed__(self):
+        self._load_all()
+        return super().__reversed__()
+
+    def __len__(self):
+        self._load_all()
+        return super().__len__()
+
+    def keys(self):
+        self._load_all()
+        return super().keys()
+
+    def values(self):
+        self._load_all()
+        return super().values()
+
+    def items(self):
+        self._load_all()
+        return super().items()
+
+    def copy(self) -> dict:
+        self._load_all()
+        return dict(super().items())
+
+    def __eq__(self, other):
+        self._load_all()
+        return super().__eq__(other)
+
+    def __ne__(self, other):
+        self._load_all()
+        return super().__ne__(other)
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __or__(self, other):
+        self._load_all()
+        return super().__or__(other)
+
+    def __ror__(self, other):
+        self._load_all()
+        return super().__ror__(other)
+
+    def __ior__(self, other):
+        self._load_all()
+        return super().__ior__(other)
+
+    def __repr__(self):
+        self._load_all()
+        return super().__repr__()
+
+    def __reduce_ex__(self, protocol):
+        # copies and pickles are plain dictionaries
+        return dict, (self.copy(),)
+
+
+class _FrameCache:
+    """Keeps the decoded data of the most recently used images of a container, unloading the least recently used.
+
+    A limit of ``0`` means no limit. The most recently used image always stays decoded.
+    Images whose data is still in use can not be unloaded, they stay decoded and in the cache,
+    and unloading them is tried again when the limits are exceeded next time.
+    """
+
+    def __init__(self, max_frames: int, max_bytes: int):
+        self.max_frames = max_frames
+        self.max_bytes = max_bytes
+        self._frames: OrderedDict[Any, int] = OrderedDict()  # image -> size of decoded data
+        self._lock = Lock()
+
+    def touch(self, image) -> None:
+        with self._lock:
+            self._frames[image] = len(image._data) if image._data else 0  # pylint: disable=protected-access
+            self._frames.move_to_end(image)
+            evicted = []
+            n_frames, n_bytes = len(self._frames), sum(self._frames.values())
+            for evicted_image, size in self._frames.items():
+                if n_frames <= 1 or not (
+                    (self.max_frames and n_frames > self.max_frames) or (self.max_bytes and n_bytes > self.max_bytes)
+                ):
+                    break
+                evicted.append(evicted_image)
+                n_frames -= 1
+                n_bytes -= size
+        # outside the lock: `unload` waits for the image's own lock, which can be held by a thread calling `touch`
+        for evicted_image in evicted:
+            try:
+                evicted_image.unload()
+            except BufferError:
+                continue  # still in use: it stays in the cache
+            self.discard(evicted_image)
+
+    def discard(self, image) -> None:
+        with self._lock:
+            self._frames.pop(image, None)
+
+
+def _region_inside(box: tuple[int, int, int, int], size: tuple[int, int]) -> bool:
+    x, y, width, height = box
+    return width > 0 and height > 0 and 0 <= x <= size[0] - width and 0 <= y <= size[1] - height
+
+
+def _crop_region(data, stride: int, mode: str, box: tuple[int, int, int, int]) -> bytes:
+    x, y, width, height = box
+    bytes_per_pixel = MODE_INFO[mode][0] * ceil(MODE_INFO[mode][1] / 8)
+    src = memoryview(data).cast("B")
+    offset = y * stride + x * bytes_per_pixel
+    return b"".join(src[offset + i * stride : offset + i * stride + width * bytes_per_pixel] for i in range(height))
+
+
+def _tile_boxes(tiling: dict, size: tuple[int, int]) -> Iterator[tuple[int, int, int, int]]:
+    # the top left tile of rotated, mirrored or cropped grids starts at a negative position
+    for row in range(tiling["num_rows"]):
+        y = max(row * tiling["tile_height"] - tiling["top_offset"], 0)
+        height = min((row + 1) * tiling["tile_height"] - tiling["top_offset"], size[1]) - y
+        for column in range(tiling["num_columns"]):
+            x = max(column * tiling["tile_width"] - tiling["left_offset"], 0)
+            width = min((column + 1) * tiling["tile_width"] - tiling["left_offset"], size[0]) - x
+            yield x, y, width, height
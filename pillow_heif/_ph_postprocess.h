@@ -1,105 +1,10 @@
 /* =========== Decode postprocess stuff ======== */
 
-void postprocess__bgr__byte(int width, int height, uint8_t* data, int stride, int channels) {
-    uint8_t tmp;
-    if (channels == 3) {
-        for (int i = 0; i < height; i++) {
-            for (int i2 = 0; i2 < width; i2++) {
-                tmp = data[i2 * 3 + 0];
-                data[i2 * 3 + 0] = data[i2 * 3 + 2];
-                data[i2 * 3 + 2] = tmp;
-            }
-            data += stride;
-        }
-    }
-    else {
-        for (int i = 0; i < height; i++) {
-            for (int i2 = 0; i2 < width; i2++) {
-                tmp = data[i2 * 4 + 0];
-                data[i2 * 4 + 0] = data[i2 * 4 + 2];
-                data[i2 * 4 + 2] = tmp;
-            }
-            data += stride;
-        }
-    }
-}
-
-void postprocess__bgr__word(int width, int height, uint16_t* data, int stride, int channels, int shift_size) {
-    uint16_t tmp;
-    if (channels == 3) {
-        if (shift_size == 4) {
-            for (int i = 0; i < height; i++) {
-                for (int i2 = 0; i2 < width; i2++) {
-                    tmp = data[i2 * 3 + 0];
-                    data[i2 * 3 + 0] = data[i2 * 3 + 2] << 4;
-                    data[i2 * 3 + 1] = data[i2 * 3 + 1] << 4;
-                    data[i2 * 3 + 2] = tmp << 4;
-                }
-                data += stride / 2;
-            }
-        }
-        else if (shift_size == 6) {
-            for (int i = 0; i < height; i++) {
-                for (int i2 = 0; i2 < width; i2++) {
-                    tmp = data[i2 * 3 + 0];
-                    data[i2 * 3 + 0] = data[i2 * 3 + 2] << 6;
-                    data[i2 * 3 + 1] = data[i2 * 3 + 1] << 6;
-                    data[i2 * 3 + 2] = tmp << 6;
-                }
-                data += stride / 2;
-            }
-        }
-        else {
-            for (int i = 0; i < height; i++) {
-                for (int i2 = 0; i2 < width; i2++) {
-                    tmp = data[i2 * 3 + 0];
-                    data[i2 * 3 + 0] = data[i2 * 3 + 2];
-                    data[i2 * 3 + 2] = tmp;
-                }
-                data += stride / 2;
-            }
-        }
-    }
-    else {
-        if (shift_size == 4) {
-            for (int i = 0; i < height; i++) {
-                for (int i2 = 0; i2 < width; i2++) {
-                    tmp = data[i2 * 4 + 0];
-                    data[i2 * 4 + 0] = data[i2 * 4 + 2] << 4;
-                    data[i2 * 4 + 1] = data[i2 * 4 + 1] << 4;
-                    data[i2 * 4 + 2] = tmp << 4;
-                    data[i2 * 4 + 3] = data[i2 * 4 + 3] << 4;
-                }
-                data += stride / 2;
-            }
-        }
-        else if (shift_size == 6) {
-            for (int i = 0; i < height; i++) {
-                for (int i2 = 0; i2 < width; i2++) {
-                    tmp = data[i2 * 4 + 0];
-                    data[i2 * 4 + 0] = data[i2 * 4 + 2] << 6;
-                    data[i2 * 4 + 1] = data[i2 * 4 + 1] << 6;
-                    data[i2 * 4 + 2] = tmp << 6;
-                    data[i2 * 4 + 3] = data[i2 * 4 + 3] << 6;
-                }
-                data += stride / 2;
-            }
-        }
-        else {
-            for (int i = 0; i < height; i++) {
-                for (int i2 = 0; i2 < width; i2++) {
-                    tmp = data[i2 * 4 + 0];
-                    data[i2 * 4 + 0] = data[i2 * 4 + 2];
-                    data[i2 * 4 + 2] = tmp;
-                }
-                data += stride / 2;
-            }
-        }
-    }
-}
+#include "_ph_simd.h"
 
-void postprocess__bgr_stride__byte(int width, int height, uint8_t* data, int stride_in, int stride_out, int channels) {
-    uint8_t *data_in = data, *data_out = data, tmp;
+void postprocess__bgr_stride__byte(int width, int height, uint8_t* data_in, uint8_t* data_out,
+                                   int stride_in, int stride_out, int channels) {
+    uint8_t tmp;
     if (channels == 3) {
         for (int i = 0; i < height; i++) {
             for (int i2 = 0; i2 < width; i2++) {
@@ -127,9 +32,9 @@ void postprocess__bgr_stride__byte(int width, int height, uint8_t* data, int str
     }
 }
 
-void postprocess__bgr_stride__word(int width, int height, uint16_t* data, int stride_in, int stride_out,
-                                   int channels, int shift_size) {
-    uint16_t *data_in = data, *data_out = data, tmp;
+void postprocess__bgr_stride__word(int width, int height, uint16_t* data_in, uint16_t* data_out,
+                                   int stride_in, int stride_out, int channels, int shift_size) {
+    uint16_t tmp;
     if (channels == 3) {
         if (shift_size == 4) {
             for (int i = 0; i < height; i++) {
@@ -211,88 +116,21 @@ void postprocess__bgr_stride__word(int width, int height, uint16_t* data, int st
     }
 }
 
-void postprocess__word(int width, int height, uint16_t* data, int stride_elements, int channels, int shift_size) {
-    if (channels == 1) {
-        if (shift_size == 4) {
-            for (int i = 0; i < height; i++) {
-                for (int i2 = 0; i2 < width; i2++) {
-                    data[i2 * 1 + 0] = data[i2 * 1 + 0] << 4;
-                }
-                data += stride_elements;
-            }
-        }
-        else {
-            for (int i = 0; i < height; i++) {
-                for (int i2 = 0; i2 < width; i2++) {
-                    data[i2 * 1 + 0] = data[i2 * 1 + 0] << 6;
-                }
-                data += stride_elements;
-            }
-        }
-    }
-    else if (channels == 3) {
-        if (shift_size == 4) {
-            for (int i = 0; i < height; i++) {
-                for (int i2 = 0; i2 < width; i2++) {
-                    data[i2 * 3 + 0] = data[i2 * 3 + 0] << 4;
-                    data[i2 * 3 + 1] = data[i2 * 3 + 1] << 4;
-                    data[i2 * 3 + 2] = data[i2 * 3 + 2] << 4;
-                }
-                data += stride_elements;
-            }
-        }
-        else {
-            for (int i = 0; i < height; i++) {
-                for (int i2 = 0; i2 < width; i2++) {
-                    data[i2 * 3 + 0] = data[i2 * 3 + 0] << 6;
-                    data[i2 * 3 + 1] = data[i2 * 3 + 1] << 6;
-                    data[i2 * 3 + 2] = data[i2 * 3 + 2] << 6;
-                }
-                data += stride_elements;
-            }
-        }
-    }
-    else {
-        if (shift_size == 4) {
-            for (int i = 0; i < height; i++) {
-                for (int i2 = 0; i2 < width; i2++) {
-                    data[i2 * 4 + 0] = data[i2 * 4 + 0] << 4;
-                    data[i2 * 4 + 1] = data[i2 * 4 + 1] << 4;
-                    data[i2 * 4 + 2] = data[i2 * 4 + 2] << 4;
-                    data[i2 * 4 + 3] = data[i2 * 4 + 3] << 4;
-                }
-                data += stride_elements;
-            }
-        }
-        else {
-            for (int i = 0; i < height; i++) {
-                for (int i2 = 0; i2 < width; i2++) {
-                    data[i2 * 4 + 0] = data[i2 * 4 + 0] << 6;
-                    data[i2 * 4 + 1] = data[i2 * 4 + 1] << 6;
-                    data[i2 * 4 + 2] = data[i2 * 4 + 2] << 6;
-                    data[i2 * 4 + 3] = data[i2 * 4 + 3] << 6;
-                }
-                data += stride_elements;
-            }
-        }
-    }
-}
-
-void postprocess__stride__byte(int width, int height, uint8_t* data, int stride_in, int stride_out) {
-    uint8_t *data_in = data, *data_out = data;
+void postprocess__stride__byte(int width, int height, uint8_t* data_in, uint8_t* data_out,
+                               int stride_in, int stride_out, int channels) {
     for (int i = 0; i < height; i++) {
-        memmove(data_out, data_in, stride_out); // possible will change to memcpy and set -D_FORTIFY_SOURCE=0
+        memmove(data_out, data_in, width * channels); // possible will change to memcpy and set -D_FORTIFY_SOURCE=0
         data_in += stride_in;
         data_out += stride_out;
     }
 }
 
-void postprocess__stride__word(int width, int height, uint16_t* data, int stride_in, int stride_out,
-                               int channels, int shift_size) {
-    uint16_t *data_in = data, *data_out = data;
+void postprocess__stride__word(int width, int height, uint16_t* data_in, uint16_t* data_out,
+                               int stride_in, int stride_out, int channels, int shift_size) {
     if (shift_size == 0) {
+        int row_size = width * channels * 2;
         for (int i = 0; i < height; i++) {
-            memmove(data_out, data_in, stride_out); // possible will change to memcpy and set -D_FORTIFY_SOURCE=0
+            memmove(data_out, data_in, row_size); // possible will change to memcpy and set -D_FORTIFY_SOURCE=0
             data_in += stride_in / 2;
             data_out += stride_out / 2;
         }
@@ -371,43 +209,173 @@ void postprocess__stride__word(int width, int height, uint16_t* data, int stride
     }
 }
 
+// Kernels with the same signature for both scalar and SIMD versions
+
+typedef void (*ph_postprocess_func)(int width, int height, uint8_t* data_in, uint8_t* data_out,
+                                    int stride_in, int stride_out, int bytes_in_cc, int channels, int shift_size);
+
+static void ph_postprocess__bgr(int width, int height, uint8_t* data_in, uint8_t* data_out,
+                                int stride_in, int stride_out, int bytes_in_cc, int channels, int shift_size) {
+    if (ph_simd_level != PH_SIMD_SCALAR)
+        postprocess__simd(
+            width, height, data_in, data_out, stride_in, stride_out, bytes_in_cc, channels, shift_size, 1);
+    else if (bytes_in_cc == 1)
+        postprocess__bgr_stride__byte(width, height, data_in, data_out, stride_in, stride_out, channels);
+    else
+        postprocess__bgr_stride__word(
+            width, height, (uint16_t*)data_in, (uint16_t*)data_out, stride_in, stride_out, channels, shift_size);
+}
+
+static void ph_postprocess(int width, int height, uint8_t* data_in, uint8_t* data_out,
+                           int stride_in, int stride_out, int bytes_in_cc, int channels, int shift_size) {
+    if (bytes_in_cc == 1)
+        postprocess__stride__byte(width, height, data_in, data_out, stride_in, stride_out, channels);
+    else if ((ph_simd_level != PH_SIMD_SCALAR) && (shift_size != 0))
+        postprocess__simd(
+            width, height, data_in, data_out, stride_in, stride_out, bytes_in_cc, channels, shift_size, 0);
+    else
+        postprocess__stride__word(
+            width, height, (uint16_t*)data_in, (uint16_t*)data_out, stride_in, stride_out, channels, shift_size);
+}
+
+// Splitting of large images in bands of rows processed in parallel
+
+#define PH_BANDS_MIN_SIZE (3840 * 2160 * 3)     // images with fewer bytes are processed in the calling thread
+#define PH_BANDS_MIN_ROWS 64                    // minimum number of rows in one band
+#define PH_BANDS_MAX 16
+
+// band threads running in the process, they are taken from the thread budget of the decodes that start them
+static PyThread_type_lock ph_bands_lock = NULL;
+static int ph_bands_running = 0;
+
+static int ph_bands_init(void) {
+    if (!ph_bands_lock)
+        ph_bands_lock = PyThread_allocate_lock();
+    return ph_bands_lock != NULL;
+}
+
+static int ph_bands_reserve(int wanted, int budget) {
+    /* Reserves up to `wanted` band threads, so that with the ones already running in the process there are no more
+       than `budget` - 1 of them: concurrent decodes share one budget instead of each starting its own threads. */
+    PyThread_acquire_lock(ph_bands_lock, WAIT_LOCK);
+    int available = budget - 1 - ph_bands_running;
+    int reserved = wanted < available ? wanted : (available > 0 ? available : 0);
+    ph_bands_running += reserved;
+    PyThread_release_lock(ph_bands_lock);
+    return reserved;
+}
+
+static void ph_bands_release(int reserved) {
+    PyThread_acquire_lock(ph_bands_lock, WAIT_LOCK);
+    ph_bands_running -= reserved;
+    PyThread_release_lock(ph_bands_lock);
+}
+
+struct ph_band {
+    ph_postprocess_func func;
+    int width, height;
+    uint8_t *data_in, *data_out;
+    int stride_in, stride_out, bytes_in_cc, channels, shift_size;
+    PyThread_type_lock done;                    // released by the thread when the band is processed
+};
+
+static void ph_band_run(struct ph_band* band) {
+    band->func(band->width, band->height, band->data_in, band->data_out, band->stride_in, band->stride_out,
+               band->bytes_in_cc, band->channels, band->shift_size);
+}
+
+static void ph_band_thread(void* arg) {
+    struct ph_band* band = (struct ph_band*)arg;
+    ph_band_run(band);
+    PyThread_release_lock(band->done);
+}
+
+static void ph_run_bands(ph_postprocess_func func, int width, int height, uint8_t* data_in, uint8_t* data_out,
+                         int stride_in, int stride_out, int bytes_in_cc, int channels, int shift_size, int threads) {
+    /* Must be called without the GIL. Bands are processed by `threads` threads including the calling one.
+       In-place stride removal moves rows towards the start of the buffer: a band could overwrite rows
+       of the previous band before they are read, so it is always processed in one thread.
+       Band threads are started for each call and are not kept between decodes: starting a native thread
+       costs tens of microseconds, while postprocess of an image above PH_BANDS_MIN_SIZE takes milliseconds,
+       and no idle threads are left in processes that decode only a few images.
+       Band threads of all calls running at the same time are limited by `threads` of each call,
+       so concurrent decodes do not multiply the number of threads. */
+    int n_bands = threads < PH_BANDS_MAX ? threads : PH_BANDS_MAX;
+    if (n_bands > height / PH_BANDS_MIN_ROWS)
+        n_bands = height / PH_BANDS_MIN_ROWS;
+    if (((int64_t)stride_in * height < PH_BANDS_MIN_SIZE) || ((data_in == data_out) && (stride_in != stride_out)))
+        n_bands = 1;
+    int n_reserved = n_bands > 1 ? ph_bands_reserve(n_bands - 1, threads) : 0;
+    n_bands = n_reserved + 1;
+
+    struct ph_band bands[PH_BANDS_MAX];
+    int rows_per_band = n_bands > 1 ? (height + n_bands - 1) / n_bands : height;
+    int n_filled = 0, n_started = 0;
+    for (int row = 0; (n_filled < n_bands) && (row < height); row += rows_per_band, n_filled++)
+        bands[n_filled] = (struct ph_band){
+            func, width, height - row < rows_per_band ? height - row : rows_per_band,
+            data_in + (int64_t)row * stride_in, data_out + (int64_t)row * stride_out,
+            stride_in, stride_out, bytes_in_cc, channels, shift_size, NULL};
+    n_bands = n_filled;
+    // band 0 and bands for which a thread could not be started are processed in the calling thread
+    for (int i = 1; i < n_bands; i++) {
+        bands[i].done = PyThread_allocate_lock();
+        if (!bands[i].done)
+            break;
+        PyThread_acquire_lock(bands[i].done, WAIT_LOCK);
+        if (PyThread_start_new_thread(ph_band_thread, &bands[i]) == PYTHREAD_INVALID_THREAD_ID) {
+            PyThread_release_lock(bands[i].done);
+            PyThread_free_lock(bands[i].done);
+            break;
+        }
+        n_started = i;
+    }
+    for (int i = 0; i < n_bands; i++)
+        if ((i == 0) || (i > n_started))
+            ph_band_run(&bands[i]);
+    for (int i = 1; i <= n_started; i++) {
+        PyThread_acquire_lock(bands[i].done, WAIT_LOCK);
+        PyThread_release_lock(bands[i].done);
+        PyThread_free_lock(bands[i].done);
+    }
+    if (n_reserved)
+        ph_bands_release(n_reserved);
+}
+
 // Top Level Postprocess Functions
 
 void postprocess__bgr(int width, int height, void* data, int stride,
-                      int bytes_in_cc, int channels, int shift_size) {
+                      int bytes_in_cc, int channels, int shift_size, int threads) {
     Py_BEGIN_ALLOW_THREADS
-    if (bytes_in_cc == 1)
-        postprocess__bgr__byte(width, height, (uint8_t*)data, stride, channels);
-    else
-        postprocess__bgr__word(width, height, (uint16_t*)data, stride, channels, shift_size);
+    ph_run_bands(ph_postprocess__bgr, width, height, (uint8_t*)data, (uint8_t*)data, stride, stride,
+                 bytes_in_cc, channels, shift_size, threads);
     Py_END_ALLOW_THREADS
 }
 
-void postprocess__bgr_stride(int width, int height, void* data, int stride_in, int stride_out,
-                             int bytes_in_cc, int channels, int shift_size) {
+void postprocess__bgr_stride(int width, int height, void* data_in, void* data_out, int stride_in, int stride_out,
+                             int bytes_in_cc, int channels, int shift_size, int threads) {
+    // `data_out` can be the same as `data_in` when `stride_out` <= `stride_in`
     Py_BEGIN_ALLOW_THREADS
-    if (bytes_in_cc == 1)
-        postprocess__bgr_stride__byte(width, height, (uint8_t*)data, stride_in, stride_out, channels);
-    else
-        postprocess__bgr_stride__word(width, height, (uint16_t*)data, stride_in, stride_out, channels, shift_size);
+    ph_run_bands(ph_postprocess__bgr, width, height, (uint8_t*)data_in, (uint8_t*)data_out, stride_in, stride_out,
+                 bytes_in_cc, channels, shift_size, threads);
     Py_END_ALLOW_THREADS
 }
 
 void postprocess(int width, int height, void* data, int stride,
-                 int bytes_in_cc, int channels, int shift_size) {
+                 int bytes_in_cc, int channels, int shift_size, int threads) {
     if ((bytes_in_cc == 1) || (shift_size == 0))
         return;
     Py_BEGIN_ALLOW_THREADS
-    postprocess__word(width, height, (uint16_t*)data, stride / 2, channels, shift_size);
+    ph_run_bands(ph_postprocess, width, height, (uint8_t*)data, (uint8_t*)data, stride, stride,
+                 bytes_in_cc, channels, shift_size, threads);
     Py_END_ALLOW_THREADS
 }
 
-void postprocess__stride(int width, int height, void* data, int stride_in, int stride_out,
-                         int bytes_in_cc, int channels, int shift_size) {
-   Py_BEGIN_ALLOW_THREADS
-    if (bytes_in_cc == 1)
-        postprocess__stride__byte(width, height, (uint8_t*)data, stride_in, stride_out);
-    else
-        postprocess__stride__word(width, height, (uint16_t*)data, stride_in, stride_out, channels, shift_size);
+void postprocess__stride(int width, int height, void* data_in, void* data_out, int stride_in, int stride_out,
+                         int bytes_in_cc, int channels, int shift_size, int threads) {
+    // `data_out` can be the same as `data_in` when `stride_out` <= `stride_in`
+    Py_BEGIN_ALLOW_THREADS
+    ph_run_bands(ph_postprocess, width, height, (uint8_t*)data_in, (uint8_t*)data_out, stride_in, stride_out,
+                 bytes_in_cc, channels, shift_size, threads);
     Py_END_ALLOW_THREADS
 }
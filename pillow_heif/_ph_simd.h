@@ -0,0 +1,355 @@
+/* =========== SIMD versions of decode postprocess kernels ======== */
+
+/* Row kernels: a vector body and a scalar tail for the last pixels of the row.
+   Rows are processed from the start and kernels never store past the bytes they have already loaded,
+   so `out` can be the same as `in` or point before it (stride removal in place).
+   SSE2 is always available on x86-64, SSSE3 and AVX2 are selected at runtime with GCC and Clang.
+   NEON is always available on AArch64. */
+
+#if defined(__x86_64__) || defined(_M_X64) || (defined(__i386__) && defined(__SSE2__))
+    #define PH_SIMD_X86 1
+    #include <emmintrin.h>
+    #if defined(__GNUC__) || defined(__clang__)
+        #define PH_SIMD_X86_DISPATCH 1
+        #include <immintrin.h>
+        #include <tmmintrin.h>
+    #endif
+#elif defined(__aarch64__) || defined(_M_ARM64)
+    #define PH_SIMD_NEON 1
+    #include <arm_neon.h>
+#endif
+
+enum ph_simd_level {
+    PH_SIMD_SCALAR = 0,
+    PH_SIMD_SSE2 = 1,
+    PH_SIMD_SSSE3 = 2,
+    PH_SIMD_AVX2 = 3,
+    PH_SIMD_NEON = 4,
+};
+
+static const char* ph_simd_names[] = {"scalar", "sse2", "ssse3", "avx2", "neon"};
+
+static int ph_simd_level = PH_SIMD_SCALAR;   // kernels to use, set during module initialization
+
+static int ph_simd_detect(void) {
+#if defined(PH_SIMD_X86_DISPATCH)
+    __builtin_cpu_init();
+    if (__builtin_cpu_supports("avx2"))
+        return PH_SIMD_AVX2;
+    if (__builtin_cpu_supports("ssse3"))
+        return PH_SIMD_SSSE3;
+    return PH_SIMD_SSE2;
+#elif defined(PH_SIMD_X86)
+    return PH_SIMD_SSE2;
+#elif defined(PH_SIMD_NEON)
+    return PH_SIMD_NEON;
+#else
+    return PH_SIMD_SCALAR;
+#endif
+}
+
+// Scalar tails
+
+static void ph_shift_u16_tail(const uint16_t* in, uint16_t* out, int start, int n, int shift) {
+    for (int i = start; i < n; i++)
+        out[i] = in[i] << shift;
+}
+
+static void ph_swap_rb_u8_tail(const uint8_t* in, uint8_t* out, int start, int width, int channels) {
+    uint8_t tmp;
+    for (int i = start; i < width; i++) {
+        tmp = in[i * channels + 0];
+        out[i * channels + 0] = in[i * channels + 2];
+        out[i * channels + 1] = in[i * channels + 1];
+        out[i * channels + 2] = tmp;
+        if (channels == 4)
+            out[i * 4 + 3] = in[i * 4 + 3];
+    }
+}
+
+static void ph_swap_rb_u16_tail(const uint16_t* in, uint16_t* out, int start, int width, int channels, int shift) {
+    uint16_t tmp;
+    for (int i = start; i < width; i++) {
+        tmp = in[i * channels + 0];
+        out[i * channels + 0] = in[i * channels + 2] << shift;
+        out[i * channels + 1] = in[i * channels + 1] << shift;
+        out[i * channels + 2] = tmp << shift;
+        if (channels == 4)
+            out[i * 4 + 3] = in[i * 4 + 3] << shift;
+    }
+}
+
+#if defined(PH_SIMD_X86)
+
+static int ph_shift_u16_sse2(const uint16_t* in, uint16_t* out, int n, int shift) {
+    __m128i count = _mm_cvtsi32_si128(shift);
+    int i = 0;
+    for (; i + 8 <= n; i += 8) {
+        __m128i v = _mm_loadu_si128((const __m128i*)(in + i));
+        _mm_storeu_si128((__m128i*)(out + i), _mm_sll_epi16(v, count));
+    }
+    return i;
+}
+
+static int ph_swap_rb_u8x4_sse2(const uint8_t* in, uint8_t* out, int width) {
+    // swaps bytes 0 and 2 of each 32-bit pixel
+    __m128i mask_ga = _mm_set1_epi32((int)0xFF00FF00);
+    int i = 0;
+    for (; i + 4 <= width; i += 4) {
+        __m128i v = _mm_loadu_si128((const __m128i*)(in + i * 4));
+        __m128i rb = _mm_andnot_si128(mask_ga, v);
+        rb = _mm_or_si128(_mm_slli_epi32(rb, 16), _mm_srli_epi32(rb, 16));
+        _mm_storeu_si128((__m128i*)(out + i * 4), _mm_or_si128(_mm_and_si128(v, mask_ga), rb));
+    }
+    return i;
+}
+
+static int ph_swap_rb_u16x4_sse2(const uint16_t* in, uint16_t* out, int width, int shift) {
+    __m128i count = _mm_cvtsi32_si128(shift);
+    int i = 0;
+    for (; i + 2 <= width; i += 2) {
+        __m128i v = _mm_loadu_si128((const __m128i*)(in + i * 4));
+        v = _mm_shufflelo_epi16(v, _MM_SHUFFLE(3, 0, 1, 2));
+        v = _mm_shufflehi_epi16(v, _MM_SHUFFLE(3, 0, 1, 2));
+        _mm_storeu_si128((__m128i*)(out + i * 4), _mm_sll_epi16(v, count));
+    }
+    return i;
+}
+
+#endif
+
+#if defined(PH_SIMD_X86_DISPATCH)
+
+__attribute__((target("ssse3")))
+static int ph_swap_rb_u8x3_ssse3(const uint8_t* in, uint8_t* out, int width) {
+    // five pixels in each 16 bytes, the last byte is stored unchanged and processed with the next pixels
+    const __m128i shuffle = _mm_setr_epi8(2, 1, 0, 5, 4, 3, 8, 7, 6, 11, 10, 9, 14, 13, 12, 15);
+    int i = 0;
+    for (; (i + 5) * 3 + 1 <= width * 3; i += 5) {
+        __m128i v = _mm_loadu_si128((const __m128i*)(in + i * 3));
+        _mm_storeu_si128((__m128i*)(out + i * 3), _mm_shuffle_epi8(v, shuffle));
+    }
+    return i;
+}
+
+__attribute__((target("ssse3")))
+static int ph_swap_rb_u16x3_ssse3(const uint16_t* in, uint16_t* out, int width, int shift) {
+    // two pixels in each 8 words, only their 6 words are stored: with in place stride removal `out` can be
+    // one word before `in`, and storing all 8 words would overwrite the next pixel before it is loaded
+    const __m128i shuffle = _mm_setr_epi8(4, 5, 2, 3, 0, 1, 10, 11, 8, 9, 6, 7, 12, 13, 14, 15);
+    __m128i count = _mm_cvtsi32_si128(shift);
+    int i = 0;
+    for (; (i + 2) * 3 + 2 <= width * 3; i += 2) {
+        __m128i v = _mm_shuffle_epi8(_mm_loadu_si128((const __m128i*)(in + i * 3)), shuffle);
+        v = _mm_sll_epi16(v, count);
+        int32_t last_words = _mm_cvtsi128_si32(_mm_srli_si128(v, 8));
+        _mm_storel_epi64((__m128i*)(out + i * 3), v);
+        memcpy(out + i * 3 + 4, &last_words, sizeof(last_words));
+    }
+    return i;
+}
+
+__attribute__((target("avx2")))
+static int ph_shift_u16_avx2(const uint16_t* in, uint16_t* out, int n, int shift) {
+    __m128i count = _mm_cvtsi32_si128(shift);
+    int i = 0;
+    for (; i + 16 <= n; i += 16) {
+        __m256i v = _mm256_loadu_si256((const __m256i*)(in + i));
+        _mm256_storeu_si256((__m256i*)(out + i), _mm256_sll_epi16(v, count));
+    }
+    return i;
+}
+
+__attribute__((target("avx2")))
+static int ph_swap_rb_u8x4_avx2(const uint8_t* in, uint8_t* out, int width) {
+    const __m256i shuffle = _mm256_setr_epi8(
+        2, 1, 0, 3, 6, 5, 4, 7, 10, 9, 8, 11, 14, 13, 12, 15,
+        2, 1, 0, 3, 6, 5, 4, 7, 10, 9, 8, 11, 14, 13, 12, 15);
+    int i = 0;
+    for (; i + 8 <= width; i += 8) {
+        __m256i v = _mm256_loadu_si256((const __m256i*)(in + i * 4));
+        _mm256_storeu_si256((__m256i*)(out + i * 4), _mm256_shuffle_epi8(v, shuffle));
+    }
+    return i;
+}
+
+__attribute__((target("avx2")))
+static int ph_swap_rb_u16x4_avx2(const uint16_t* in, uint16_t* out, int width, int shift) {
+    __m128i count = _mm_cvtsi32_si128(shift);
+    int i = 0;
+    for (; i + 4 <= width; i += 4) {
+        __m256i v = _mm256_loadu_si256((const __m256i*)(in + i * 4));
+        v = _mm256_shufflelo_epi16(v, _MM_SHUFFLE(3, 0, 1, 2));
+        v = _mm256_shufflehi_epi16(v, _MM_SHUFFLE(3, 0, 1, 2));
+        _mm256_storeu_si256((__m256i*)(out + i * 4), _mm256_sll_epi16(v, count));
+    }
+    return i;
+}
+
+#endif
+
+#if defined(PH_SIMD_NEON)
+
+static int ph_shift_u16_neon(const uint16_t* in, uint16_t* out, int n, int shift) {
+    int16x8_t count = vdupq_n_s16((int16_t)shift);
+    int i = 0;
+    for (; i + 8 <= n; i += 8)
+        vst1q_u16(out + i, vshlq_u16(vld1q_u16(in + i), count));
+    return i;
+}
+
+static int ph_swap_rb_u8_neon(const uint8_t* in, uint8_t* out, int width, int channels) {
+    uint8x16_t tmp;
+    int i = 0;
+    if (channels == 3) {
+        for (; i + 16 <= width; i += 16) {
+            uint8x16x3_t v = vld3q_u8(in + i * 3);
+            tmp = v.val[0];
+            v.val[0] = v.val[2];
+            v.val[2] = tmp;
+            vst3q_u8(out + i * 3, v);
+        }
+    }
+    else {
+        for (; i + 16 <= width; i += 16) {
+            uint8x16x4_t v = vld4q_u8(in + i * 4);
+            tmp = v.val[0];
+            v.val[0] = v.val[2];
+            v.val[2] = tmp;
+            vst4q_u8(out + i * 4, v);
+        }
+    }
+    return i;
+}
+
+static int ph_swap_rb_u16_neon(const uint16_t* in, uint16_t* out, int width, int channels, int shift) {
+    int16x8_t count = vdupq_n_s16((int16_t)shift);
+    uint16x8_t tmp;
+    int i = 0;
+    if (channels == 3) {
+        for (; i + 8 <= width; i += 8) {
+            uint16x8x3_t v = vld3q_u16(in + i * 3);
+            tmp = v.val[0];
+            v.val[0] = vshlq_u16(v.val[2], count);
+            v.val[1] = vshlq_u16(v.val[1], count);
+            v.val[2] = vshlq_u16(tmp, count);
+            vst3q_u16(out + i * 3, v);
+        }
+    }
+    else {
+        for (; i + 8 <= width; i += 8) {
+            uint16x8x4_t v = vld4q_u16(in + i * 4);
+            tmp = v.val[0];
+            v.val[0] = vshlq_u16(v.val[2], count);
+            v.val[1] = vshlq_u16(v.val[1], count);
+            v.val[2] = vshlq_u16(tmp, count);
+            v.val[3] = vshlq_u16(v.val[3], count);
+            vst4q_u16(out + i * 4, v);
+        }
+    }
+    return i;
+}
+
+#endif
+
+// Row kernels with dispatch
+
+static void ph_shift_u16_row(const uint16_t* in, uint16_t* out, int n, int shift) {
+    int done = 0;
+    switch (ph_simd_level) {
+#if defined(PH_SIMD_X86_DISPATCH)
+        case PH_SIMD_AVX2:
+            done = ph_shift_u16_avx2(in, out, n, shift);
+            break;
+#endif
+#if defined(PH_SIMD_X86)
+        case PH_SIMD_SSSE3:
+        case PH_SIMD_SSE2:
+            done = ph_shift_u16_sse2(in, out, n, shift);
+            break;
+#endif
+#if defined(PH_SIMD_NEON)
+        case PH_SIMD_NEON:
+            done = ph_shift_u16_neon(in, out, n, shift);
+            break;
+#endif
+        default:
+            break;
+    }
+    ph_shift_u16_tail(in, out, done, n, shift);
+}
+
+static void ph_swap_rb_u8_row(const uint8_t* in, uint8_t* out, int width, int channels) {
+    int done = 0;
+    switch (ph_simd_level) {
+#if defined(PH_SIMD_X86_DISPATCH)
+        case PH_SIMD_AVX2:
+            done = channels == 3 ? ph_swap_rb_u8x3_ssse3(in, out, width) : ph_swap_rb_u8x4_avx2(in, out, width);
+            break;
+        case PH_SIMD_SSSE3:
+            done = channels == 3 ? ph_swap_rb_u8x3_ssse3(in, out, width) : ph_swap_rb_u8x4_sse2(in, out, width);
+            break;
+#endif
+#if defined(PH_SIMD_X86)
+        case PH_SIMD_SSE2:
+            done = channels == 3 ? 0 : ph_swap_rb_u8x4_sse2(in, out, width);
+            break;
+#endif
+#if defined(PH_SIMD_NEON)
+        case PH_SIMD_NEON:
+            done = ph_swap_rb_u8_neon(in, out, width, channels);
+            break;
+#endif
+        default:
+            break;
+    }
+    ph_swap_rb_u8_tail(in, out, done, width, channels);
+}
+
+static void ph_swap_rb_u16_row(const uint16_t* in, uint16_t* out, int width, int channels, int shift) {
+    int done = 0;
+    switch (ph_simd_level) {
+#if defined(PH_SIMD_X86_DISPATCH)
+        case PH_SIMD_AVX2:
+            done = channels == 3 ? ph_swap_rb_u16x3_ssse3(in, out, width, shift)
+                                 : ph_swap_rb_u16x4_avx2(in, out, width, shift);
+            break;
+        case PH_SIMD_SSSE3:
+            done = channels == 3 ? ph_swap_rb_u16x3_ssse3(in, out, width, shift)
+                                 : ph_swap_rb_u16x4_sse2(in, out, width, shift);
+            break;
+#endif
+#if defined(PH_SIMD_X86)
+        case PH_SIMD_SSE2:
+            done = channels == 3 ? 0 : ph_swap_rb_u16x4_sse2(in, out, width, shift);
+            break;
+#endif
+#if defined(PH_SIMD_NEON)
+        case PH_SIMD_NEON:
+            done = ph_swap_rb_u16_neon(in, out, width, channels, shift);
+            break;
+#endif
+        default:
+            break;
+    }
+    ph_swap_rb_u16_tail(in, out, done, width, channels, shift);
+}
+
+void postprocess__simd(int width, int height, uint8_t* data_in, uint8_t* data_out, int stride_in, int stride_out,
+                       int bytes_in_cc, int channels, int shift_size, int swap_rb) {
+    // `swap_rb` converts RGB(A) to BGR(A), `shift_size` converts 10/12 bit values to 16 bit
+    for (int i = 0; i < height; i++) {
+        if (bytes_in_cc == 1) {
+            if (swap_rb)
+                ph_swap_rb_u8_row(data_in, data_out, width, channels);
+            else
+                memmove(data_out, data_in, width * channels);
+        }
+        else if (swap_rb)
+            ph_swap_rb_u16_row((uint16_t*)data_in, (uint16_t*)data_out, width, channels, shift_size);
+        else
+            ph_shift_u16_row((uint16_t*)data_in, (uint16_t*)data_out, width * channels, shift_size);
+        data_in += stride_in;
+        data_out += stride_out;
+    }
+}
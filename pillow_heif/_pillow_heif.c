@@ -9,6 +9,30 @@
 #include "libheif/heif_properties.h"
 #include "_ph_postprocess.h"
 
+#include <errno.h>
+#include <limits.h>
+#include <sys/stat.h>
+#include <fcntl.h>
+#ifdef _WIN32
+    #include <io.h>
+    #define ph_path_char wchar_t
+    #define ph_open_write(path) _wopen(path, _O_WRONLY | _O_CREAT | _O_TRUNC | _O_BINARY, _S_IREAD | _S_IWRITE)
+    #define ph_dup _dup
+    #define ph_close _close
+    #define ph_fstat _fstat64
+    #define ph_stat_t struct _stat64
+    #define ph_write(fd, data, size) _write(fd, data, (size) > INT_MAX ? INT_MAX : (unsigned int)(size))
+#else
+    #include <unistd.h>
+    #define ph_path_char char
+    #define ph_open_write(path) open(path, O_WRONLY | O_CREAT | O_TRUNC | O_CLOEXEC, 0666)
+    #define ph_dup dup
+    #define ph_close close
+    #define ph_fstat fstat
+    #define ph_stat_t struct stat
+    #define ph_write write
+#endif
+
 /* =========== Free-threading support ======== */
 
 #ifdef Py_GIL_DISABLED
@@ -21,6 +45,13 @@
 
 /* =========== Common stuff ======== */
 
+// the image handle is released by `release_input`, methods that need it raise an error after that
+#define CHECK_INPUT(self)                                                                   \
+    if (!(self)->handle) {                                                                  \
+        PyErr_SetString(PyExc_ValueError, "Input of the image was released.");             \
+        return NULL;                                                                        \
+    }
+
 #define MAX_ENCODERS 20
 #define MAX_DECODERS 20
 
@@ -105,13 +136,16 @@ typedef struct {
     int bgr_mode;                               // private. decode option.
     int remove_stride;                          // private. decode option.
     int hdr_to_16bit;                           // private. decode option.
+    int postprocess_threads;                    // private. decode option.
     char decoder_id[64];                        // private. decode option. optional
     struct heif_image_handle *handle;           // private
     struct heif_image *heif_image;              // private
     const struct heif_depth_representation_info* depth_metadata; // only for image_type == 2
     uint8_t *data;                              // pointer to data after decoding
     int stride;                                 // time when it get filled depends on `remove_stride` value
-    PyObject *file_bytes;                       // private
+    int exports;                                // number of buffer views of `data`
+    int busy;                                   // number of decodes running without the GIL
+    PyObject *file_bytes;                       // private, `None` after `release_input`
 #ifdef Py_GIL_DISABLED
     PyMutex decode_mutex;                       // protects lazy decode in free-threaded builds
 #endif
@@ -119,6 +153,24 @@ typedef struct {
 
 static PyTypeObject CtxImage_Type;
 
+typedef struct {
+    PyObject_HEAD
+    int fd;                                     // duplicated file descriptor of the input file
+    int64_t size;                               // size of the input file
+    int64_t position;                           // current reading position
+} CtxReaderObject;
+
+static PyTypeObject CtxReader_Type;
+
+typedef struct {
+    PyObject_HEAD
+    PyObject *owner;                            // capsule with the decoded `heif_image` the plane belongs to
+    uint8_t *data;                              // start of the plane
+    Py_ssize_t size;                            // stride * height
+} CtxPlaneObject;
+
+static PyTypeObject CtxPlane_Type;
+
 int get_stride(CtxImageObject *ctx_image) {
     int stride = ctx_image->width * ctx_image->n_channels;
     if ((ctx_image->bits > 8) && (!ctx_image->hdr_to_8bit))
@@ -138,9 +190,37 @@ static void _CtxWriteImage_destructor(CtxWriteImageObject* self) {
     PyObject_Del(self);
 }
 
+static void replicate_plane_edges(
+        uint8_t *plane, int stride, int pixel_size, int src_width, int src_height, int width, int height) {
+    // fills the part of the plane outside of `src_width`x`src_height` with copies of its last column and row,
+    // padding with zeros would bleed into the visible pixels through chroma subsampling
+    if (src_width < width)
+        for (int i = 0; i < src_height; i++) {
+            uint8_t *row = plane + (size_t)stride * i;
+            uint8_t *edge = row + (size_t)(src_width - 1) * pixel_size;
+            for (int i2 = src_width; i2 < width; i2++)
+                memcpy(row + (size_t)i2 * pixel_size, edge, pixel_size);
+        }
+    for (int i = src_height; i < height; i++)
+        memcpy(plane + (size_t)stride * i, plane + (size_t)stride * (src_height - 1), (size_t)width * pixel_size);
+}
+
+static int parse_src_size(int width, int height, int *src_width, int *src_height) {
+    if (*src_width < 0) {
+        *src_width = width;
+        *src_height = height;
+    }
+    if ((*src_width <= 0) || (*src_height <= 0) || (*src_width > width) || (*src_height > height)) {
+        PyErr_SetString(PyExc_ValueError, "source size does not fit into the image plane");
+        return 0;
+    }
+    return 1;
+}
+
 static PyObject* _CtxWriteImage_add_plane(CtxWriteImageObject* self, PyObject* args) {
-    /* (size), depth: int, depth_in: int, data: bytes, bgr_mode: int */
+    /* (size), depth: int, depth_in: int, data: bytes, bgr_mode: int, stride: int, (src_size) */
     int width, height, depth, depth_in, stride_out, stride_in, real_stride, bgr_mode;
+    int src_width = -1, src_height = -1;
     Py_buffer buffer;
     uint8_t* plane_data;
 
@@ -148,21 +228,26 @@ static PyObject* _CtxWriteImage_add_plane(CtxWriteImageObject* self, PyObject* a
         PyErr_SetString(PyExc_ValueError, "image has no pixel data");
         return NULL;
     }
-    if (!PyArg_ParseTuple(args, "(ii)iiy*ii", &width, &height, &depth, &depth_in, &buffer, &bgr_mode, &stride_in))
+    if (!PyArg_ParseTuple(args, "(ii)iiy*ii|(ii)",
+                          &width, &height, &depth, &depth_in, &buffer, &bgr_mode, &stride_in, &src_width, &src_height))
         return NULL;
+    if (!parse_src_size(width, height, &src_width, &src_height)) {
+        PyBuffer_Release(&buffer);
+        return NULL;
+    }
 
     int with_alpha = 0;
     if ((self->chroma == heif_chroma_interleaved_RGBA) || (self->chroma == heif_chroma_interleaved_RRGGBBAA_LE)) {
-        real_stride = width * 4;
+        real_stride = src_width * 4;
         with_alpha = 1;
     }
     else
-        real_stride = width * 3;
+        real_stride = src_width * 3;
     if (depth > 8)
         real_stride = real_stride * 2;
     if (stride_in == 0)
         stride_in = real_stride;
-    if ((Py_ssize_t)stride_in * height > buffer.len) {
+    if ((Py_ssize_t)stride_in * (src_height - 1) + real_stride > buffer.len) {
         PyBuffer_Release(&buffer);
         PyErr_SetString(PyExc_ValueError, "image plane does not contain enough data");
         return NULL;
@@ -188,13 +273,13 @@ static PyObject* _CtxWriteImage_add_plane(CtxWriteImageObject* self, PyObject* a
     uint16_t *in_word = (uint16_t *)buffer.buf;
     if (!bgr_mode) {
         if ((depth_in == depth) && (stride_in == stride_out))
-            memcpy(out, in, stride_out * height);
+            memcpy(out, in, (size_t)stride_out * (src_height - 1) + real_stride);
         else if ((depth_in == depth) && (stride_in != stride_out))
-            for (int i = 0; i < height; i++)
+            for (int i = 0; i < src_height; i++)
                 memcpy(out + stride_out * i, in + stride_in * i, real_stride);
         else if ((depth_in == 16) && (depth == 12) && (!with_alpha))
-            for (int i = 0; i < height; i++) {
-                for (int i2 = 0; i2 < width; i2++) {
+            for (int i = 0; i < src_height; i++) {
+                for (int i2 = 0; i2 < src_width; i2++) {
                     out_word[i2 * 3 + 0] = in_word[i2 * 3 + 0] >> 4;
                     out_word[i2 * 3 + 1] = in_word[i2 * 3 + 1] >> 4;
                     out_word[i2 * 3 + 2] = in_word[i2 * 3 + 2] >> 4;
@@ -203,8 +288,8 @@ static PyObject* _CtxWriteImage_add_plane(CtxWriteImageObject* self, PyObject* a
                 out_word += stride_out / 2;
             }
         else if ((depth_in == 16) && (depth == 12) && (with_alpha))
-            for (int i = 0; i < height; i++) {
-                for (int i2 = 0; i2 < width; i2++) {
+            for (int i = 0; i < src_height; i++) {
+                for (int i2 = 0; i2 < src_width; i2++) {
                     out_word[i2 * 4 + 0] = in_word[i2 * 4 + 0] >> 4;
                     out_word[i2 * 4 + 1] = in_word[i2 * 4 + 1] >> 4;
                     out_word[i2 * 4 + 2] = in_word[i2 * 4 + 2] >> 4;
@@ -214,8 +299,8 @@ static PyObject* _CtxWriteImage_add_plane(CtxWriteImageObject* self, PyObject* a
                 out_word += stride_out / 2;
             }
         else if ((depth_in == 16) && (depth == 10) && (!with_alpha))
-            for (int i = 0; i < height; i++) {
-                for (int i2 = 0; i2 < width; i2++) {
+            for (int i = 0; i < src_height; i++) {
+                for (int i2 = 0; i2 < src_width; i2++) {
                     out_word[i2 * 3 + 0] = in_word[i2 * 3 + 0] >> 6;
                     out_word[i2 * 3 + 1] = in_word[i2 * 3 + 1] >> 6;
                     out_word[i2 * 3 + 2] = in_word[i2 * 3 + 2] >> 6;
@@ -224,8 +309,8 @@ static PyObject* _CtxWriteImage_add_plane(CtxWriteImageObject* self, PyObject* a
                 out_word += stride_out / 2;
             }
         else if ((depth_in == 16) && (depth == 10) && (with_alpha))
-            for (int i = 0; i < height; i++) {
-                for (int i2 = 0; i2 < width; i2++) {
+            for (int i = 0; i < src_height; i++) {
+                for (int i2 = 0; i2 < src_width; i2++) {
                     out_word[i2 * 4 + 0] = in_word[i2 * 4 + 0] >> 6;
                     out_word[i2 * 4 + 1] = in_word[i2 * 4 + 1] >> 6;
                     out_word[i2 * 4 + 2] = in_word[i2 * 4 + 2] >> 6;
@@ -239,8 +324,8 @@ static PyObject* _CtxWriteImage_add_plane(CtxWriteImageObject* self, PyObject* a
     }
     else {
         if ((depth <= 8) && (depth_in == depth) && (!with_alpha))
-            for (int i = 0; i < height; i++) {
-                for (int i2 = 0; i2 < width; i2++) {
+            for (int i = 0; i < src_height; i++) {
+                for (int i2 = 0; i2 < src_width; i2++) {
                     out[i2 * 3 + 0] = in[i2 * 3 + 2];
                     out[i2 * 3 + 1] = in[i2 * 3 + 1];
                     out[i2 * 3 + 2] = in[i2 * 3 + 0];
@@ -249,8 +334,8 @@ static PyObject* _CtxWriteImage_add_plane(CtxWriteImageObject* self, PyObject* a
                 out += stride_out;
             }
         else if ((depth <= 8) && (depth_in == depth) && (with_alpha))
-            for (int i = 0; i < height; i++) {
-                for (int i2 = 0; i2 < width; i2++) {
+            for (int i = 0; i < src_height; i++) {
+                for (int i2 = 0; i2 < src_width; i2++) {
                     out[i2 * 4 + 0] = in[i2 * 4 + 2];
                     out[i2 * 4 + 1] = in[i2 * 4 + 1];
                     out[i2 * 4 + 2] = in[i2 * 4 + 0];
@@ -260,8 +345,8 @@ static PyObject* _CtxWriteImage_add_plane(CtxWriteImageObject* self, PyObject* a
                 out += stride_out;
             }
         else if ((depth_in == depth) && (!with_alpha))
-            for (int i = 0; i < height; i++) {
-                for (int i2 = 0; i2 < width; i2++) {
+            for (int i = 0; i < src_height; i++) {
+                for (int i2 = 0; i2 < src_width; i2++) {
                     out_word[i2 * 3 + 0] = in_word[i2 * 3 + 2];
                     out_word[i2 * 3 + 1] = in_word[i2 * 3 + 1];
                     out_word[i2 * 3 + 2] = in_word[i2 * 3 + 0];
@@ -270,8 +355,8 @@ static PyObject* _CtxWriteImage_add_plane(CtxWriteImageObject* self, PyObject* a
                 out_word += stride_out / 2;
             }
         else if ((depth_in == depth) && (with_alpha))
-            for (int i = 0; i < height; i++) {
-                for (int i2 = 0; i2 < width; i2++) {
+            for (int i = 0; i < src_height; i++) {
+                for (int i2 = 0; i2 < src_width; i2++) {
                     out_word[i2 * 4 + 0] = in_word[i2 * 4 + 2];
                     out_word[i2 * 4 + 1] = in_word[i2 * 4 + 1];
                     out_word[i2 * 4 + 2] = in_word[i2 * 4 + 0];
@@ -281,8 +366,8 @@ static PyObject* _CtxWriteImage_add_plane(CtxWriteImageObject* self, PyObject* a
                 out_word += stride_out / 2;
             }
         else if ((depth_in == 16) && (depth == 10) && (!with_alpha))
-            for (int i = 0; i < height; i++) {
-                for (int i2 = 0; i2 < width; i2++) {
+            for (int i = 0; i < src_height; i++) {
+                for (int i2 = 0; i2 < src_width; i2++) {
                     out_word[i2 * 3 + 0] = in_word[i2 * 3 + 2] >> 6;
                     out_word[i2 * 3 + 1] = in_word[i2 * 3 + 1] >> 6;
                     out_word[i2 * 3 + 2] = in_word[i2 * 3 + 0] >> 6;
@@ -291,8 +376,8 @@ static PyObject* _CtxWriteImage_add_plane(CtxWriteImageObject* self, PyObject* a
                 out_word += stride_out / 2;
             }
         else if ((depth_in == 16) && (depth == 10) && (with_alpha))
-            for (int i = 0; i < height; i++) {
-                for (int i2 = 0; i2 < width; i2++) {
+            for (int i = 0; i < src_height; i++) {
+                for (int i2 = 0; i2 < src_width; i2++) {
                     out_word[i2 * 4 + 0] = in_word[i2 * 4 + 2] >> 6;
                     out_word[i2 * 4 + 1] = in_word[i2 * 4 + 1] >> 6;
                     out_word[i2 * 4 + 2] = in_word[i2 * 4 + 0] >> 6;
@@ -302,8 +387,8 @@ static PyObject* _CtxWriteImage_add_plane(CtxWriteImageObject* self, PyObject* a
                 out_word += stride_out / 2;
             }
         else if ((depth_in == 16) && (depth == 12) && (!with_alpha))
-            for (int i = 0; i < height; i++) {
-                for (int i2 = 0; i2 < width; i2++) {
+            for (int i = 0; i < src_height; i++) {
+                for (int i2 = 0; i2 < src_width; i2++) {
                     out_word[i2 * 3 + 0] = in_word[i2 * 3 + 2] >> 4;
                     out_word[i2 * 3 + 1] = in_word[i2 * 3 + 1] >> 4;
                     out_word[i2 * 3 + 2] = in_word[i2 * 3 + 0] >> 4;
@@ -312,8 +397,8 @@ static PyObject* _CtxWriteImage_add_plane(CtxWriteImageObject* self, PyObject* a
                 out_word += stride_out / 2;
             }
         else if ((depth_in == 16) && (depth == 12) && (with_alpha))
-            for (int i = 0; i < height; i++) {
-                for (int i2 = 0; i2 < width; i2++) {
+            for (int i = 0; i < src_height; i++) {
+                for (int i2 = 0; i2 < src_width; i2++) {
                     out_word[i2 * 4 + 0] = in_word[i2 * 4 + 2] >> 4;
                     out_word[i2 * 4 + 1] = in_word[i2 * 4 + 1] >> 4;
                     out_word[i2 * 4 + 2] = in_word[i2 * 4 + 0] >> 4;
@@ -325,6 +410,8 @@ static PyObject* _CtxWriteImage_add_plane(CtxWriteImageObject* self, PyObject* a
         else
             invalid_mode = 1;
     }
+    if (!invalid_mode)
+        replicate_plane_edges(plane_data, stride_out, real_stride / src_width, src_width, src_height, width, height);
     Py_END_ALLOW_THREADS
     PyBuffer_Release(&buffer);
     if (invalid_mode) {
@@ -335,8 +422,9 @@ static PyObject* _CtxWriteImage_add_plane(CtxWriteImageObject* self, PyObject* a
 }
 
 static PyObject* _CtxWriteImage_add_plane_la(CtxWriteImageObject* self, PyObject* args) {
-    /* (size), depth: int, depth_in: int, data: bytes */
+    /* (size), depth: int, depth_in: int, data: bytes, stride: int, (src_size) */
     int width, height, depth, depth_in, stride_y, stride_alpha, stride_in, real_stride;
+    int src_width = -1, src_height = -1;
     Py_buffer buffer;
     uint8_t *plane_data_y, *plane_data_alpha;
 
@@ -344,15 +432,20 @@ static PyObject* _CtxWriteImage_add_plane_la(CtxWriteImageObject* self, PyObject
         PyErr_SetString(PyExc_ValueError, "image has no pixel data");
         return NULL;
     }
-    if (!PyArg_ParseTuple(args, "(ii)iiy*i", &width, &height, &depth, &depth_in, &buffer, &stride_in))
+    if (!PyArg_ParseTuple(args, "(ii)iiy*i|(ii)",
+                          &width, &height, &depth, &depth_in, &buffer, &stride_in, &src_width, &src_height))
         return NULL;
+    if (!parse_src_size(width, height, &src_width, &src_height)) {
+        PyBuffer_Release(&buffer);
+        return NULL;
+    }
 
-    real_stride = width * 2;
+    real_stride = src_width * 2;
     if (depth > 8)
         real_stride = real_stride * 2;
     if (stride_in == 0)
         stride_in = real_stride;
-    if ((Py_ssize_t)stride_in * height > buffer.len) {
+    if ((Py_ssize_t)stride_in * (src_height - 1) + real_stride > buffer.len) {
         PyBuffer_Release(&buffer);
         PyErr_SetString(PyExc_ValueError, "image plane does not contain enough data");
         return NULL;
@@ -391,8 +484,8 @@ static PyObject* _CtxWriteImage_add_plane_la(CtxWriteImageObject* self, PyObject
         uint8_t *out_y = plane_data_y;
         uint8_t *out_alpha = plane_data_alpha;
         uint8_t *in = buffer.buf;
-        for (int i = 0; i < height; i++) {
-            for (int i2 = 0; i2 < width; i2++) {
+        for (int i = 0; i < src_height; i++) {
+            for (int i2 = 0; i2 < src_width; i2++) {
                 out_y[i2] = in[i2 * 2 + 0];
                 out_alpha[i2] = in[i2 * 2 + 1];
             }
@@ -402,8 +495,8 @@ static PyObject* _CtxWriteImage_add_plane_la(CtxWriteImageObject* self, PyObject
         }
     }
     else if (depth_in == depth) {
-        for (int i = 0; i < height; i++) {
-            for (int i2 = 0; i2 < width; i2++) {
+        for (int i = 0; i < src_height; i++) {
+            for (int i2 = 0; i2 < src_width; i2++) {
                 out_word_y[i2] = in_word[i2 * 2 + 0];
                 out_word_alpha[i2] = in_word[i2 * 2 + 1];
             }
@@ -413,8 +506,8 @@ static PyObject* _CtxWriteImage_add_plane_la(CtxWriteImageObject* self, PyObject
         }
     }
     else if ((depth_in == 16) && (depth == 10))
-        for (int i = 0; i < height; i++) {
-            for (int i2 = 0; i2 < width; i2++) {
+        for (int i = 0; i < src_height; i++) {
+            for (int i2 = 0; i2 < src_width; i2++) {
                 out_word_y[i2] = in_word[i2 * 2 + 0] >> 6;
                 out_word_alpha[i2] = in_word[i2 * 2 + 1] >> 6;
             }
@@ -423,8 +516,8 @@ static PyObject* _CtxWriteImage_add_plane_la(CtxWriteImageObject* self, PyObject
             out_word_alpha += stride_alpha / 2;
         }
     else if ((depth_in == 16) && (depth == 12))
-        for (int i = 0; i < height; i++) {
-            for (int i2 = 0; i2 < width; i2++) {
+        for (int i = 0; i < src_height; i++) {
+            for (int i2 = 0; i2 < src_width; i2++) {
                 out_word_y[i2] = in_word[i2 * 2 + 0] >> 4;
                 out_word_alpha[i2] = in_word[i2 * 2 + 1] >> 4;
             }
@@ -434,6 +527,11 @@ static PyObject* _CtxWriteImage_add_plane_la(CtxWriteImageObject* self, PyObject
         }
     else
         invalid_mode = 1;
+    if (!invalid_mode) {
+        int pixel_size = depth > 8 ? 2 : 1;
+        replicate_plane_edges(plane_data_y, stride_y, pixel_size, src_width, src_height, width, height);
+        replicate_plane_edges(plane_data_alpha, stride_alpha, pixel_size, src_width, src_height, width, height);
+    }
     Py_END_ALLOW_THREADS
     PyBuffer_Release(&buffer);
     if (invalid_mode) {
@@ -444,8 +542,9 @@ static PyObject* _CtxWriteImage_add_plane_la(CtxWriteImageObject* self, PyObject
 }
 
 static PyObject* _CtxWriteImage_add_plane_l(CtxWriteImageObject* self, PyObject* args) {
-    /* (size), depth: int, depth_in: int, data: bytes */
+    /* (size), depth: int, depth_in: int, data: bytes, stride: int, channel: int, (src_size) */
     int width, height, depth, depth_in, stride_out, stride_in, real_stride, target_heif_channel;
+    int src_width = -1, src_height = -1;
     Py_buffer buffer;
     uint8_t *plane_data;
 
@@ -453,15 +552,20 @@ static PyObject* _CtxWriteImage_add_plane_l(CtxWriteImageObject* self, PyObject*
         PyErr_SetString(PyExc_ValueError, "image has no pixel data");
         return NULL;
     }
-    if (!PyArg_ParseTuple(args, "(ii)iiy*ii", &width, &height, &depth, &depth_in, &buffer, &stride_in, &target_heif_channel))
+    if (!PyArg_ParseTuple(args, "(ii)iiy*ii|(ii)", &width, &height, &depth, &depth_in, &buffer, &stride_in,
+                          &target_heif_channel, &src_width, &src_height))
         return NULL;
+    if (!parse_src_size(width, height, &src_width, &src_height)) {
+        PyBuffer_Release(&buffer);
+        return NULL;
+    }
 
-    real_stride = width;
+    real_stride = src_width;
     if (depth > 8)
         real_stride = real_stride * 2;
     if (stride_in == 0)
         stride_in = real_stride;
-    if ((Py_ssize_t)stride_in * height > buffer.len) {
+    if ((Py_ssize_t)stride_in * (src_height - 1) + real_stride > buffer.len) {
         PyBuffer_Release(&buffer);
         PyErr_SetString(PyExc_ValueError, "image plane does not contain enough data");
         return NULL;
@@ -486,26 +590,28 @@ static PyObject* _CtxWriteImage_add_plane_l(CtxWriteImageObject* self, PyObject*
     uint16_t *out_word = (uint16_t *)plane_data;
     uint16_t *in_word = (uint16_t *)buffer.buf;
     if ((depth_in == depth) && (stride_in == stride_out))
-        memcpy(out, in, stride_out * height);
+        memcpy(out, in, (size_t)stride_out * (src_height - 1) + real_stride);
     else if ((depth_in == depth) && (stride_in != stride_out))
-        for (int i = 0; i < height; i++)
+        for (int i = 0; i < src_height; i++)
             memcpy(out + stride_out * i, in + stride_in * i, real_stride);
     else if ((depth_in == 16) && (depth == 10))
-        for (int i = 0; i < height; i++) {
-            for (int i2 = 0; i2 < width; i2++)
+        for (int i = 0; i < src_height; i++) {
+            for (int i2 = 0; i2 < src_width; i2++)
                 out_word[i2] = in_word[i2] >> 6;
             in_word += stride_in / 2;
             out_word += stride_out / 2;
         }
     else if ((depth_in == 16) && (depth == 12))
-        for (int i = 0; i < height; i++) {
-            for (int i2 = 0; i2 < width; i2++)
+        for (int i = 0; i < src_height; i++) {
+            for (int i2 = 0; i2 < src_width; i2++)
                 out_word[i2] = in_word[i2] >> 4;
             in_word += stride_in / 2;
             out_word += stride_out / 2;
         }
     else
         invalid_mode = 1;
+    if (!invalid_mode)
+        replicate_plane_edges(plane_data, stride_out, real_stride / src_width, src_width, src_height, width, height);
     Py_END_ALLOW_THREADS
     PyBuffer_Release(&buffer);
     if (invalid_mode) {
@@ -782,9 +888,90 @@ static struct PyMethodDef _CtxWriteImage_methods[] = {
 
 /* =========== CtxWrite ======== */
 
+#define PH_WRITE_CHUNK_SIZE (1024 * 1024)
+
+typedef struct {
+    int fd;                 // destination file descriptor or -1
+    const ph_path_char* path;   // destination file opened on the first write, so failed writes leave it untouched
+    PyObject* writer;       // destination object with `write` method or NULL
+    void* data;             // copy of the whole output, when there is no destination
+    size_t size;            // number of bytes in `data`
+    int write_errno;        // `errno` of the failed write to `fd`
+} ph_write_dest;
+
+static struct heif_error heif_error_write = {
+    .code = heif_error_Encoding_error, .subcode = 0, .message = "Cannot write output data" };
+
+static int ph_write_fd(int fd, const char* data, size_t size) {
+    // returns 0 on success or `errno` of the failed write, does not need the GIL
+    while (size > 0) {
+        Py_ssize_t n = ph_write(fd, data, size > PH_WRITE_CHUNK_SIZE ? PH_WRITE_CHUNK_SIZE : size);
+        if (n < 0 && errno == EINTR)
+            continue;
+        if (n <= 0)
+            return n < 0 ? errno : EIO;
+        data += n;
+        size -= (size_t)n;
+    }
+    return 0;
+}
+
+static int ph_write_object(PyObject* writer, const char* data, size_t size) {
+    /* feeds the output by `bytes` chunks, so the whole file is never copied at once.
+       Writers can keep the chunks they got, e.g. to queue them or to send them later. */
+    while (size > 0) {
+        Py_ssize_t chunk_size = size > PH_WRITE_CHUNK_SIZE ? PH_WRITE_CHUNK_SIZE : (Py_ssize_t)size;
+        PyObject* chunk = PyBytes_FromStringAndSize(data, chunk_size);
+        if (!chunk)
+            return 0;
+        PyObject* n_obj = PyObject_CallMethod(writer, "write", "O", chunk);
+        Py_DECREF(chunk);
+        if (!n_obj)
+            return 0;
+        // raw files can write less than requested, `None` means everything for objects which do not report it
+        Py_ssize_t n = n_obj == Py_None ? chunk_size : PyLong_AsSsize_t(n_obj);
+        Py_DECREF(n_obj);
+        if (n == -1 && PyErr_Occurred())
+            return 0;
+        if (n <= 0 || n > chunk_size) {
+            PyErr_SetString(PyExc_OSError, "`write` method did not write the data.");
+            return 0;
+        }
+        data += n;
+        size -= (size_t)n;
+    }
+    return 1;
+}
+
 static struct heif_error ctx_write_callback(struct heif_context* ctx, const void* data, size_t size, void* userdata) {
-    *((PyObject**)userdata) = PyBytes_FromStringAndSize((char*)data, size);
-    return heif_error_no;
+    // called by `heif_context_write` without the GIL, it is taken only to call the Python `write` method
+    ph_write_dest* dest = (ph_write_dest*)userdata;
+    int ok;
+    if (dest->path && dest->fd < 0) {
+        dest->fd = ph_open_write(dest->path);
+        if (dest->fd < 0) {
+            dest->write_errno = errno;
+            return heif_error_write;
+        }
+    }
+    if (dest->fd >= 0) {
+        dest->write_errno = ph_write_fd(dest->fd, data, size);
+        ok = !dest->write_errno;
+    }
+    else if (dest->writer) {
+        PyGILState_STATE gil_state = PyGILState_Ensure();
+        ok = ph_write_object(dest->writer, data, size);
+        PyGILState_Release(gil_state);
+    }
+    else {
+        dest->data = malloc(size ? size : 1);
+        ok = dest->data != NULL;
+        if (ok) {
+            memcpy(dest->data, data, size);
+            dest->size = size;
+        }
+    }
+    return ok ? heif_error_no : heif_error_write;
 }
 
 static struct heif_writer ctx_writer = { .writer_api_version = 1, .write = &ctx_write_callback };
@@ -922,15 +1109,73 @@ static PyObject* _CtxWrite_add_tile(CtxWriteObject* self, PyObject* args) {
     Py_RETURN_NONE;
 }
 
-static PyObject* _CtxWrite_finalize(CtxWriteObject* self) {
-    PyObject *ret = NULL;
-    struct heif_error error = heif_context_write(self->ctx, &ctx_writer, &ret);
-    if (!check_error(error)) {
-        if (ret != NULL)
-            return ret;
-        PyErr_SetString(PyExc_RuntimeError, "Unknown runtime or memory error");
+static PyObject* _CtxWrite_finalize(CtxWriteObject* self, PyObject* args) {
+    /* Writes the encoded file to the destination: a path, a file descriptor or an object with `write` method.
+       Without a destination returns the encoded file as `bytes`. */
+    PyObject* destination = Py_None;
+#ifdef _WIN32
+    wchar_t* path = NULL;
+#else
+    PyObject* path = NULL;
+#endif
+    if (!PyArg_ParseTuple(args, "|O", &destination))
+        return NULL;
+
+    ph_write_dest dest = { .fd = -1, .path = NULL, .writer = NULL, .data = NULL, .size = 0, .write_errno = 0 };
+    if (PyUnicode_Check(destination)) {
+#ifdef _WIN32
+        path = PyUnicode_AsWideCharString(destination, NULL);
+        if (!path)
+            return NULL;
+        dest.path = path;
+#else
+        if (!PyUnicode_FSConverter(destination, &path))
+            return NULL;
+        dest.path = PyBytes_AS_STRING(path);
+#endif
+    }
+    else if (PyLong_Check(destination)) {
+        dest.fd = PyLong_AsLong(destination);
+        if (dest.fd == -1 && PyErr_Occurred())
+            return NULL;
+        if (dest.fd < 0) {
+            PyErr_SetString(PyExc_ValueError, "Invalid file descriptor.");
+            return NULL;
+        }
     }
-    return NULL;
+    else if (destination != Py_None)
+        dest.writer = destination;
+
+    struct heif_error error;
+    Py_BEGIN_ALLOW_THREADS
+    error = heif_context_write(self->ctx, &ctx_writer, &dest);
+    if ((dest.path) && (dest.fd >= 0) && (ph_close(dest.fd) != 0) && (!dest.write_errno))
+        dest.write_errno = errno;
+    Py_END_ALLOW_THREADS
+#ifdef _WIN32
+    PyMem_Free(path);
+#else
+    Py_XDECREF(path);
+#endif
+    if (dest.write_errno) {
+        errno = dest.write_errno;
+        if (dest.path)
+            PyErr_SetFromErrnoWithFilenameObject(PyExc_OSError, destination);
+        else
+            PyErr_SetFromErrno(PyExc_OSError);
+    }
+    // the error of writing to the destination is more useful than the error from libheif
+    if (PyErr_Occurred() || check_error(error)) {
+        free(dest.data);
+        return NULL;
+    }
+    if (destination != Py_None)
+        Py_RETURN_NONE;
+    if (!dest.data)
+        return PyErr_NoMemory();
+    PyObject* result = PyBytes_FromStringAndSize((char*)dest.data, dest.size);
+    free(dest.data);
+    return result;
 }
 
 static struct PyMethodDef _CtxWrite_methods[] = {
@@ -938,10 +1183,92 @@ static struct PyMethodDef _CtxWrite_methods[] = {
     {"create_image", (PyCFunction)_CtxWriteImage_create, METH_VARARGS},
     {"create_grid", (PyCFunction)_CtxWrite_create_grid, METH_VARARGS},
     {"add_tile", (PyCFunction)_CtxWrite_add_tile, METH_VARARGS},
-    {"finalize", (PyCFunction)_CtxWrite_finalize, METH_NOARGS},
+    {"finalize", (PyCFunction)_CtxWrite_finalize, METH_VARARGS},
     {NULL, NULL}
 };
 
+/* =========== CtxReader ======== */
+
+static int ph_read_at(int fd, void* data, size_t size, int64_t position) {
+    // reads without moving the file offset on POSIX, as it is shared with the descriptor of the caller
+    uint8_t* out = data;
+#ifdef _WIN32
+    if (_lseeki64(fd, position, SEEK_SET) != position)
+        return 1;
+#endif
+    while (size > 0) {
+#ifdef _WIN32
+        int n = _read(fd, out, size > INT_MAX ? INT_MAX : (unsigned int)size);
+#else
+        ssize_t n = pread(fd, out, size, (off_t)position);
+#endif
+        if (n < 0 && errno == EINTR)
+            continue;
+        if (n <= 0)
+            return 1;
+        out += n;
+        size -= (size_t)n;
+        position += n;
+    }
+    return 0;
+}
+
+static int64_t ctx_reader_get_position(void* userdata) {
+    return ((CtxReaderObject*)userdata)->position;
+}
+
+static int ctx_reader_read(void* data, size_t size, void* userdata) {
+    CtxReaderObject* reader = (CtxReaderObject*)userdata;
+    if (ph_read_at(reader->fd, data, size, reader->position))
+        return 1;
+    reader->position += size;
+    return 0;
+}
+
+static int ctx_reader_seek(int64_t position, void* userdata) {
+    ((CtxReaderObject*)userdata)->position = position;
+    return 0;
+}
+
+static enum heif_reader_grow_status ctx_reader_wait_for_file_size(int64_t target_size, void* userdata) {
+    if (target_size > ((CtxReaderObject*)userdata)->size)
+        return heif_reader_grow_status_size_beyond_eof;
+    return heif_reader_grow_status_size_reached;
+}
+
+static struct heif_reader ctx_reader = {
+    .reader_api_version = 1,
+    .get_position = &ctx_reader_get_position,
+    .read = &ctx_reader_read,
+    .seek = &ctx_reader_seek,
+    .wait_for_file_size = &ctx_reader_wait_for_file_size,
+};
+
+static void _CtxReader_destructor(CtxReaderObject* self) {
+    ph_close(self->fd);
+    PyObject_Del(self);
+}
+
+static PyObject* _CtxReader(int fd) {
+    /* libheif reads only the needed parts of the file, during parsing and later during decoding */
+    ph_stat_t st;
+    if (ph_fstat(fd, &st))
+        return PyErr_SetFromErrno(PyExc_OSError);
+    int fd_reader = ph_dup(fd);
+    if (fd_reader == -1)
+        return PyErr_SetFromErrno(PyExc_OSError);
+
+    CtxReaderObject* reader = PyObject_New(CtxReaderObject, &CtxReader_Type);
+    if (!reader) {
+        ph_close(fd_reader);
+        return NULL;
+    }
+    reader->fd = fd_reader;
+    reader->size = (int64_t)st.st_size;
+    reader->position = 0;
+    return (PyObject*)reader;
+}
+
 /* =========== CtxAuxImage ======== */
 
 static const char* _colorspace_to_str(enum heif_colorspace colorspace) {
@@ -1025,6 +1352,9 @@ PyObject* _CtxAuxImage(struct heif_image_handle* main_handle, heif_item_id aux_i
     ctx_image->data = NULL;
     ctx_image->remove_stride = remove_stride;
     ctx_image->hdr_to_16bit = hdr_to_16bit;
+    ctx_image->postprocess_threads = 1;
+    ctx_image->exports = 0;
+    ctx_image->busy = 0;
     ctx_image->file_bytes = file_bytes;
     ctx_image->stride = get_stride(ctx_image);
     strcpy(ctx_image->decoder_id, decoder_id);
@@ -1078,6 +1408,9 @@ PyObject* _CtxDepthImage(struct heif_image_handle* main_handle, heif_item_id dep
     ctx_image->data = NULL;
     ctx_image->remove_stride = remove_stride;
     ctx_image->hdr_to_16bit = hdr_to_16bit;
+    ctx_image->postprocess_threads = 1;
+    ctx_image->exports = 0;
+    ctx_image->busy = 0;
     ctx_image->file_bytes = file_bytes;
     ctx_image->stride = get_stride(ctx_image);
     strcpy(ctx_image->decoder_id, decoder_id);
@@ -1101,6 +1434,41 @@ static void _CtxImage_destructor(CtxImageObject* self) {
     PyObject_Del(self);
 }
 
+static int get_mode(struct heif_image_handle* handle, enum heif_colorspace colorspace, enum heif_chroma chroma,
+                    int bits, int alpha, int hdr_to_8bit, int bgr_mode, int hdr_to_16bit, char* mode) {
+    // fills the `mode` of the decoded image and returns the number of channels in it
+    if ((chroma == heif_chroma_monochrome) && (colorspace == heif_colorspace_monochrome) && (!alpha)) {
+        strcpy(mode, "L");
+        if (bits > 8) {
+            if (hdr_to_16bit) {
+                strcpy(mode, "I;16");
+            }
+            else if (bits == 10) {
+                strcpy(mode, "I;10");
+            }
+            else {
+                strcpy(mode, "I;12");
+            }
+        }
+        return 1;
+    }
+    strcpy(mode, bgr_mode ? "BGR" : "RGB");
+    if (alpha)
+        strcat(mode, heif_image_handle_is_premultiplied_alpha(handle) ? "a" : "A");
+    if ((bits > 8) && (!hdr_to_8bit)) {
+        if (hdr_to_16bit) {
+            strcat(mode, ";16");
+        }
+        else if (bits == 10) {
+            strcat(mode, ";10");
+        }
+        else {
+            strcat(mode, ";12");
+        }
+    }
+    return alpha ? 4 : 3;
+}
+
 PyObject* _CtxImage(struct heif_image_handle* handle, int hdr_to_8bit,
                     int bgr_mode, int remove_stride, int hdr_to_16bit,
                     int primary, PyObject* file_bytes,
@@ -1118,40 +1486,12 @@ PyObject* _CtxImage(struct heif_image_handle* handle, int hdr_to_8bit,
     ctx_image->height = heif_image_handle_get_height(handle);
     ctx_image->alpha = heif_image_handle_has_alpha_channel(handle);
     ctx_image->bits = heif_image_handle_get_luma_bits_per_pixel(handle);
-    if ((chroma == heif_chroma_monochrome) && (colorspace == heif_colorspace_monochrome) && (!ctx_image->alpha)) {
-        strcpy(ctx_image->mode, "L");
-        if (ctx_image->bits > 8) {
-            if (hdr_to_16bit) {
-                strcpy(ctx_image->mode, "I;16");
-            }
-            else if (ctx_image->bits == 10) {
-                strcpy(ctx_image->mode, "I;10");
-            }
-            else {
-                strcpy(ctx_image->mode, "I;12");
-            }
-        }
-        ctx_image->n_channels = 1;
+    ctx_image->n_channels = get_mode(
+        handle, colorspace, chroma, ctx_image->bits, ctx_image->alpha, hdr_to_8bit, bgr_mode, hdr_to_16bit,
+        ctx_image->mode);
+    if (ctx_image->n_channels == 1) {
         bgr_mode = 0;
         hdr_to_8bit = 0;
-    } else {
-        strcpy(ctx_image->mode, bgr_mode ? "BGR" : "RGB");
-        ctx_image->n_channels = 3;
-        if (ctx_image->alpha) {
-            strcat(ctx_image->mode, heif_image_handle_is_premultiplied_alpha(handle) ? "a" : "A");
-            ctx_image->n_channels += 1;
-        }
-        if ((ctx_image->bits > 8) && (!hdr_to_8bit)) {
-            if (hdr_to_16bit) {
-                strcat(ctx_image->mode, ";16");
-            }
-            else if (ctx_image->bits == 10) {
-                strcat(ctx_image->mode, ";10");
-            }
-            else {
-                strcat(ctx_image->mode, ";12");
-            }
-        }
     }
     ctx_image->hdr_to_8bit = hdr_to_8bit;
     ctx_image->bgr_mode = bgr_mode;
@@ -1160,6 +1500,9 @@ PyObject* _CtxImage(struct heif_image_handle* handle, int hdr_to_8bit,
     ctx_image->data = NULL;
     ctx_image->remove_stride = remove_stride;
     ctx_image->hdr_to_16bit = hdr_to_16bit;
+    ctx_image->postprocess_threads = 1;
+    ctx_image->exports = 0;
+    ctx_image->busy = 0;
     ctx_image->primary = primary;
     ctx_image->colorspace = colorspace;
     ctx_image->chroma = chroma;
@@ -1194,6 +1537,7 @@ static PyObject* _CtxImage_chroma(CtxImageObject* self, void* closure) {
 }
 
 static PyObject* _CtxImage_color_profile(CtxImageObject* self, void* closure) {
+    CHECK_INPUT(self);
     enum heif_color_profile_type profile_type = heif_image_handle_get_color_profile_type(self->handle);
     if (profile_type == heif_color_profile_type_not_present)
         return PyDict_New();
@@ -1262,6 +1606,7 @@ static PyObject* _CtxImage_color_profile(CtxImageObject* self, void* closure) {
 }
 
 static PyObject* _CtxImage_metadata(CtxImageObject* self, void* closure) {
+    CHECK_INPUT(self);
     if (self->image_type == PhHeifImage) {
         PyObject *meta_item_info;
         const char *type, *content_type;
@@ -1349,6 +1694,7 @@ static PyObject* _CtxImage_metadata(CtxImageObject* self, void* closure) {
 }
 
 static PyObject* _CtxImage_thumbnails(CtxImageObject* self, void* closure) {
+    CHECK_INPUT(self);
     int n_images = heif_image_handle_get_number_of_thumbnails(self->handle);
     if (n_images == 0)
         return PyList_New(0);
@@ -1380,13 +1726,20 @@ static PyObject* _CtxImage_thumbnails(CtxImageObject* self, void* closure) {
     return images_list;
 }
 
-int decode_image(CtxImageObject* self) {
+static int decode_heif_image(CtxImageObject* self, struct heif_image** heif_image, void** plane, int* stride,
+                             int* bytes_in_cc, int tile_x, int tile_y) {
+    /* decodes the image into a new `heif_image`, returns the interleaved (or luma) plane of it.
+       When `tile_x` >= 0 only one tile of the tiled image is decoded. Must be called with `decode_mutex` held. */
     struct heif_error error;
-    int bytes_in_cc;
     enum heif_colorspace colorspace;
     enum heif_chroma chroma;
     enum heif_channel channel;
 
+    if (!self->handle) {
+        PyErr_SetString(PyExc_ValueError, "Input of the image was released.");
+        return 0;
+    }
+    self->busy++;
     Py_BEGIN_ALLOW_THREADS
     struct heif_decoding_options *decode_options = heif_decoding_options_alloc();
     decode_options->convert_hdr_to_8bit = self->hdr_to_8bit;
@@ -1406,57 +1759,289 @@ int decode_image(CtxImageObject* self) {
         }
     }
     if ((self->bits == 8) || (self->hdr_to_8bit)) {
-        bytes_in_cc = 1;
+        *bytes_in_cc = 1;
     }
     else {
-        bytes_in_cc = 2;
+        *bytes_in_cc = 2;
     }
 
     if (strlen(self->decoder_id) > 0) {
         decode_options->decoder_id = self->decoder_id;
     }
-    error = heif_decode_image(self->handle, &self->heif_image, colorspace, chroma, decode_options);
+    if (tile_x < 0)
+        error = heif_decode_image(self->handle, heif_image, colorspace, chroma, decode_options);
+    else
+        error = heif_image_handle_decode_image_tile(
+            self->handle, heif_image, colorspace, chroma, decode_options, tile_x, tile_y);
     heif_decoding_options_free(decode_options);
     Py_END_ALLOW_THREADS
+    self->busy--;
     if (check_error(error))
         return 0;
 
-    int stride;
-    self->data = heif_image_get_plane(self->heif_image, channel, &stride);
-    if (!self->data) {
-        heif_image_release(self->heif_image);
-        self->heif_image = NULL;
+    *plane = heif_image_get_plane(*heif_image, channel, stride);
+    if (!*plane) {
+        heif_image_release(*heif_image);
+        *heif_image = NULL;
         PyErr_SetString(PyExc_RuntimeError, "heif_image_get_plane failed");
         return 0;
     }
 
-    self->width = heif_image_get_primary_width(self->heif_image);
-    self->height = heif_image_get_primary_height(self->heif_image);
+    if (tile_x < 0) {
+        self->width = heif_image_get_primary_width(*heif_image);
+        self->height = heif_image_get_primary_height(*heif_image);
+    }
+    return 1;
+}
+
+static int get_shift_size(CtxImageObject* self) {
+    return ((self->hdr_to_16bit) && (self->bits > 8) && (!self->hdr_to_8bit)) ? 16 - self->bits : 0;
+}
+
+static void postprocess_into(CtxImageObject* self, int width, int height, void* data_in, int stride_in,
+                             void* data_out, int stride_out, int bytes_in_cc) {
+    // postprocess of the decoded pixels, writing them to another place
+    if (self->bgr_mode)
+        postprocess__bgr_stride(width, height, data_in, data_out, stride_in, stride_out,
+                                bytes_in_cc, self->n_channels, get_shift_size(self), self->postprocess_threads);
+    else
+        postprocess__stride(width, height, data_in, data_out, stride_in, stride_out,
+                            bytes_in_cc, self->n_channels, get_shift_size(self), self->postprocess_threads);
+}
+
+int decode_image(CtxImageObject* self) {
+    int stride, bytes_in_cc;
+    if (!decode_heif_image(self, &self->heif_image, (void**)&self->data, &stride, &bytes_in_cc, -1, -1))
+        return 0;
 
     self->stride = self->remove_stride ? get_stride(self) : stride;
 
     int remove_stride = ((self->remove_stride) && (self->stride != stride));
-    int shift_size = ((self->hdr_to_16bit) && (self->bits > 8) && (!self->hdr_to_8bit)) ? 16 - self->bits : 0;
+    int shift_size = get_shift_size(self);
 
+    self->busy++;
     if ((self->bgr_mode) && (!remove_stride))
         postprocess__bgr(self->width, self->height, self->data, stride,
-                         bytes_in_cc, self->n_channels, shift_size);
+                         bytes_in_cc, self->n_channels, shift_size, self->postprocess_threads);
     else if ((self->bgr_mode) && (remove_stride))
-        postprocess__bgr_stride(self->width, self->height, self->data, stride, self->stride,
-                                bytes_in_cc, self->n_channels, shift_size);
+        postprocess__bgr_stride(self->width, self->height, self->data, self->data, stride, self->stride,
+                                bytes_in_cc, self->n_channels, shift_size, self->postprocess_threads);
     else if ((!self->bgr_mode) && (!remove_stride))
         postprocess(self->width, self->height, self->data, stride,
-                    bytes_in_cc, self->n_channels, shift_size);
+                    bytes_in_cc, self->n_channels, shift_size, self->postprocess_threads);
     else if ((!self->bgr_mode) && (remove_stride))
-        postprocess__stride(self->width, self->height, self->data, stride, self->stride,
-                            bytes_in_cc, self->n_channels, shift_size);
+        postprocess__stride(self->width, self->height, self->data, self->data, stride, self->stride,
+                            bytes_in_cc, self->n_channels, shift_size, self->postprocess_threads);
     else {
+        self->busy--;
         PyErr_SetString(PyExc_ValueError, "internal error, invalid postprocess condition");
         return 0;
     }
+    self->busy--;
     return 1;
 }
 
+static PyObject* _CtxImage_decode_into(CtxImageObject* self, PyObject* args) {
+    /* Decodes the image into the writable buffer with rows placed `stride` bytes apart (0 - packed rows).
+       Postprocessing goes from the libheif plane straight into the buffer, the decoded image is not kept. */
+    Py_buffer buffer;
+    int stride, stride_in, bytes_in_cc;
+    void* plane;
+    struct heif_image* heif_image = NULL;
+
+    if (!PyArg_ParseTuple(args, "w*i", &buffer, &stride))
+        return NULL;
+
+    MUTEX_LOCK(&self->decode_mutex);
+    if (self->data) {
+        // already decoded and postprocessed, only the rows need to be copied
+        plane = self->data;
+        stride_in = self->stride;
+        bytes_in_cc = ((self->bits == 8) || (self->hdr_to_8bit)) ? 1 : 2;
+    }
+    else if (!decode_heif_image(self, &heif_image, &plane, &stride_in, &bytes_in_cc, -1, -1)) {
+        MUTEX_UNLOCK(&self->decode_mutex);
+        PyBuffer_Release(&buffer);
+        return NULL;
+    }
+
+    int row_size = self->width * self->n_channels * bytes_in_cc;
+    if (!stride)
+        stride = row_size;
+    const char* error_text = NULL;
+    if ((stride < row_size) || (stride % bytes_in_cc))
+        error_text = "Invalid stride for the image.";
+    else if (buffer.len < (Py_ssize_t)stride * (self->height - 1) + row_size)
+        error_text = "Buffer is too small for the image.";
+    if (error_text) {
+        if (heif_image)
+            heif_image_release(heif_image);
+        MUTEX_UNLOCK(&self->decode_mutex);
+        PyBuffer_Release(&buffer);
+        PyErr_SetString(PyExc_ValueError, error_text);
+        return NULL;
+    }
+
+    self->busy++;
+    if (!heif_image)
+        postprocess__stride(self->width, self->height, plane, buffer.buf, stride_in, stride,
+                            bytes_in_cc, self->n_channels, 0, self->postprocess_threads);
+    else {
+        postprocess_into(self, self->width, self->height, plane, stride_in, buffer.buf, stride, bytes_in_cc);
+        heif_image_release(heif_image);
+    }
+    self->busy--;
+    MUTEX_UNLOCK(&self->decode_mutex);
+    PyBuffer_Release(&buffer);
+    Py_RETURN_NONE;
+}
+
+static struct heif_error get_image_tiling(struct heif_image_handle* handle, struct heif_image_tiling* tiling) {
+    /* Tiling in the display space, like `heif_image_handle_get_image_tiling` with transformations processed.
+       libheif starts the hidden part of the partial right and bottom tiles from the visible width of them,
+       so for rotated or mirrored grids `left_offset` and `top_offset` are computed here from the transformations. */
+    struct heif_error error = heif_image_handle_get_image_tiling(handle, 1, tiling);
+    struct heif_image_tiling raw;
+    if ((error.code != heif_error_Ok) || !tiling->tile_width || !tiling->tile_height)
+        return error;
+    error = heif_image_handle_get_image_tiling(handle, 0, &raw);
+    if (error.code != heif_error_Ok)
+        return error;
+
+    int width = raw.image_width, height = raw.image_height, tmp;
+    int left = 0, top = 0;
+    int right = (raw.tile_width - raw.image_width % raw.tile_width) % raw.tile_width;
+    int bottom = (raw.tile_height - raw.image_height % raw.tile_height) % raw.tile_height;
+    heif_property_id properties[16];
+    struct heif_context* ctx = heif_image_handle_get_context(handle);
+    heif_item_id item_id = heif_image_handle_get_item_id(handle);
+    int n_properties = heif_item_get_transformation_properties(ctx, item_id, properties, 16);
+    for (int i = 0; i < n_properties; i++)
+        switch (heif_item_get_property_type(ctx, item_id, properties[i])) {
+            case heif_item_property_type_transform_rotation:
+                switch (heif_item_get_property_transform_rotation_ccw(ctx, item_id, properties[i])) {
+                    case 90:
+                        tmp = top; top = right; right = bottom; bottom = left; left = tmp;
+                        tmp = width; width = height; height = tmp;
+                        break;
+                    case 180:
+                        tmp = left; left = right; right = tmp;
+                        tmp = top; top = bottom; bottom = tmp;
+                        break;
+                    case 270:
+                        tmp = top; top = left; left = bottom; bottom = right; right = tmp;
+                        tmp = width; width = height; height = tmp;
+                        break;
+                }
+                break;
+            case heif_item_property_type_transform_mirror:
+                if (heif_item_get_property_transform_mirror(ctx, item_id, properties[i]) ==
+                    heif_transform_mirror_direction_horizontal) {
+                    tmp = left; left = right; right = tmp;
+                }
+                else {
+                    tmp = top; top = bottom; bottom = tmp;
+                }
+                break;
+            case heif_item_property_type_transform_crop: {
+                int crop_left, crop_top, crop_right, crop_bottom;
+                heif_item_get_property_transform_crop_borders(ctx, item_id, properties[i], width, height,
+                                                              &crop_left, &crop_top, &crop_right, &crop_bottom);
+                left += crop_left;
+                top += crop_top;
+                right += crop_right;
+                bottom += crop_bottom;
+                width -= crop_left + crop_right;
+                height -= crop_top + crop_bottom;
+                break;
+            }
+            default:
+                break;
+        }
+    heif_context_free(ctx);
+    tiling->left_offset = left;
+    tiling->top_offset = top;
+    return error;
+}
+
+static PyObject* _CtxImage_decode_region(CtxImageObject* self, PyObject* args) {
+    /* Decodes only the tiles of a tiled image that intersect with the region and copies the needed parts of them
+       into new bytes with packed rows. Images without tiles are decoded as one tile.
+       Returns the bytes and the number of decoded tiles. */
+    CHECK_INPUT(self);
+    int x, y, width, height, stride_in, bytes_in_cc;
+    void* plane;
+    struct heif_image* heif_image;
+    struct heif_image_tiling tiling;
+
+    if (!PyArg_ParseTuple(args, "(iiii)", &x, &y, &width, &height))
+        return NULL;
+
+    if ((x < 0) || (y < 0) || (width <= 0) || (height <= 0) || (x + width > self->width) ||
+        (y + height > self->height)) {
+        PyErr_SetString(PyExc_ValueError, "Region is outside of the image.");
+        return NULL;
+    }
+
+    bytes_in_cc = ((self->bits == 8) || (self->hdr_to_8bit)) ? 1 : 2;
+    int pixel_size = self->n_channels * bytes_in_cc;
+    PyObject* result = PyBytes_FromStringAndSize(NULL, (Py_ssize_t)width * height * pixel_size);
+    if (!result)
+        return NULL;
+    uint8_t* data_out = (uint8_t*)PyBytes_AS_STRING(result);
+    int stride_out = width * pixel_size;
+    int n_decoded = 0;
+
+    MUTEX_LOCK(&self->decode_mutex);
+    if (self->data) {
+        // already decoded, only crop is needed
+        self->busy++;
+        postprocess__stride(width, height, self->data + (Py_ssize_t)y * self->stride + x * pixel_size, data_out,
+                            self->stride, stride_out, bytes_in_cc, self->n_channels, 0, self->postprocess_threads);
+        self->busy--;
+        MUTEX_UNLOCK(&self->decode_mutex);
+        return Py_BuildValue("(Ni)", result, n_decoded);
+    }
+
+    struct heif_error error = get_image_tiling(self->handle, &tiling);
+    if ((error.code != heif_error_Ok) || (tiling.num_columns * tiling.num_rows <= 1)) {
+        tiling.num_columns = tiling.num_rows = 1;
+        tiling.tile_width = self->width;
+        tiling.tile_height = self->height;
+        tiling.left_offset = tiling.top_offset = 0;
+    }
+    // for rotated, mirrored or cropped grids the top left tile starts at (-left_offset, -top_offset)
+    int left = (int)tiling.left_offset, top = (int)tiling.top_offset;
+
+    for (int tile_y = (y + top) / (int)tiling.tile_height; tile_y <= (y + height - 1 + top) / (int)tiling.tile_height;
+         tile_y++)
+        for (int tile_x = (x + left) / (int)tiling.tile_width;
+             tile_x <= (x + width - 1 + left) / (int)tiling.tile_width; tile_x++) {
+            if (!decode_heif_image(self, &heif_image, &plane, &stride_in, &bytes_in_cc,
+                                   tiling.num_columns * tiling.num_rows > 1 ? tile_x : -1, tile_y)) {
+                MUTEX_UNLOCK(&self->decode_mutex);
+                Py_DECREF(result);
+                return NULL;
+            }
+            n_decoded++;
+            // edge tiles of a grid can be larger than the visible part of them
+            int tile_x0 = tile_x * tiling.tile_width - left, tile_y0 = tile_y * tiling.tile_height - top;
+            int tile_x1 = tile_x0 + heif_image_get_primary_width(heif_image);
+            int tile_y1 = tile_y0 + heif_image_get_primary_height(heif_image);
+            int x0 = x > tile_x0 ? x : tile_x0, y0 = y > tile_y0 ? y : tile_y0;
+            int x1 = x + width < tile_x1 ? x + width : tile_x1, y1 = y + height < tile_y1 ? y + height : tile_y1;
+            if ((x1 > x0) && (y1 > y0))
+                postprocess_into(self, x1 - x0, y1 - y0,
+                                 (uint8_t*)plane + (Py_ssize_t)(y0 - tile_y0) * stride_in + (x0 - tile_x0) * pixel_size,
+                                 stride_in,
+                                 data_out + (Py_ssize_t)(y0 - y) * stride_out + (x0 - x) * pixel_size,
+                                 stride_out, bytes_in_cc);
+            heif_image_release(heif_image);
+        }
+    MUTEX_UNLOCK(&self->decode_mutex);
+    return Py_BuildValue("(Ni)", result, n_decoded);
+}
+
 static PyObject* _CtxImage_stride(CtxImageObject* self, void* closure) {
     MUTEX_LOCK(&self->decode_mutex);
     if (!self->data) {
@@ -1478,8 +2063,57 @@ static int _CtxImage_getbuffer(CtxImageObject* self, Py_buffer* view, int flags)
             return -1;
         }
     }
+    Py_ssize_t size = (Py_ssize_t)self->stride * self->height;
+    int result = PyBuffer_FillInfo(view, (PyObject*)self, self->data, size, 1, flags);
+    if (!result)
+        self->exports++;
     MUTEX_UNLOCK(&self->decode_mutex);
-    return PyBuffer_FillInfo(view, (PyObject*)self, self->data, (Py_ssize_t)self->stride * self->height, 1, flags);
+    return result;
+}
+
+static void _CtxImage_releasebuffer(CtxImageObject* self, Py_buffer* view) {
+    MUTEX_LOCK(&self->decode_mutex);
+    self->exports--;
+    MUTEX_UNLOCK(&self->decode_mutex);
+}
+
+static PyObject* _CtxImage_unload(CtxImageObject* self) {
+    // releases the decoded image, it will be decoded again on the next access to `data`
+    MUTEX_LOCK(&self->decode_mutex);
+    if (self->exports || self->busy) {
+        MUTEX_UNLOCK(&self->decode_mutex);
+        PyErr_SetString(PyExc_BufferError, "Image data is in use and can not be unloaded.");
+        return NULL;
+    }
+    if (self->heif_image) {
+        heif_image_release(self->heif_image);
+        self->heif_image = NULL;
+    }
+    self->data = NULL;
+    self->stride = get_stride(self);
+    MUTEX_UNLOCK(&self->decode_mutex);
+    Py_RETURN_NONE;
+}
+
+static PyObject* _CtxImage_release_input(CtxImageObject* self) {
+    /* releases the handle and the reference to the input, the decoded image stays.
+       The input is freed when the last image that references it releases it or is deleted. */
+    MUTEX_LOCK(&self->decode_mutex);
+    if (self->busy) {
+        MUTEX_UNLOCK(&self->decode_mutex);
+        PyErr_SetString(PyExc_BufferError, "Image is being decoded and its input can not be released.");
+        return NULL;
+    }
+    if (self->handle) {
+        heif_image_handle_release(self->handle);
+        self->handle = NULL;
+    }
+    PyObject* file_bytes = self->file_bytes;
+    Py_INCREF(Py_None);
+    self->file_bytes = Py_None;
+    MUTEX_UNLOCK(&self->decode_mutex);
+    Py_DECREF(file_bytes);
+    Py_RETURN_NONE;
 }
 
 static PyObject* _CtxImage_data(CtxImageObject* self, void* closure) {
@@ -1489,6 +2123,7 @@ static PyObject* _CtxImage_data(CtxImageObject* self, void* closure) {
 }
 
 static PyObject* _CtxImage_depth_image_list(CtxImageObject* self, void* closure) {
+    CHECK_INPUT(self);
     int n_images = heif_image_handle_get_number_of_depth_images(self->handle);
     if (n_images == 0)
         return PyList_New(0);
@@ -1519,6 +2154,7 @@ static PyObject* _CtxImage_depth_image_list(CtxImageObject* self, void* closure)
 }
 
 static PyObject* _CtxImage_aux_image_ids(CtxImageObject* self, void* closure) {
+    CHECK_INPUT(self);
     int aux_filter = LIBHEIF_AUX_IMAGE_FILTER_OMIT_ALPHA | LIBHEIF_AUX_IMAGE_FILTER_OMIT_DEPTH;
     int n_images = heif_image_handle_get_number_of_auxiliary_images(self->handle, aux_filter);
     if (n_images == 0)
@@ -1541,6 +2177,7 @@ static PyObject* _CtxImage_aux_image_ids(CtxImageObject* self, void* closure) {
 }
 
 static PyObject* _CtxImage_get_aux_image(CtxImageObject* self, PyObject* arg_image_id) {
+    CHECK_INPUT(self);
     heif_item_id aux_image_id = (heif_item_id)PyLong_AsUnsignedLong(arg_image_id);
     return _CtxAuxImage(
         self->handle, aux_image_id, self->remove_stride, self->hdr_to_16bit, self->file_bytes,
@@ -1559,6 +2196,7 @@ static PyObject* _get_aux_type(const struct heif_image_handle* aux_handle) {
 }
 
 static PyObject* _CtxImage_get_aux_type(CtxImageObject* self, PyObject* arg_image_id) {
+    CHECK_INPUT(self);
     heif_item_id aux_image_id = (heif_item_id)PyLong_AsUnsignedLong(arg_image_id);
     struct heif_image_handle* aux_handle;
     if (check_error(heif_image_handle_get_auxiliary_image_handle(self->handle, aux_image_id, &aux_handle)))
@@ -1570,7 +2208,159 @@ static PyObject* _CtxImage_get_aux_type(CtxImageObject* self, PyObject* arg_imag
     return aux_type;
 }
 
+static void _release_heif_image_capsule(PyObject* capsule) {
+    heif_image_release((struct heif_image*)PyCapsule_GetPointer(capsule, "heif_image"));
+}
+
+static void _CtxPlane_destructor(CtxPlaneObject* self) {
+    Py_DECREF(self->owner);
+    PyObject_Del(self);
+}
+
+static int _CtxPlane_getbuffer(CtxPlaneObject* self, Py_buffer* view, int flags) {
+    return PyBuffer_FillInfo(view, (PyObject*)self, self->data, self->size, 0, flags);
+}
+
+static PyObject* _CtxImage_decode_ycbcr(CtxImageObject* self, PyObject* arg_chroma) {
+    /* decodes the image without conversion to RGB, returns a list of (plane, stride, width, height, bits)
+       for Y, Cb, Cr planes or only for Y plane for monochrome. Planes are views of the decoded image. */
+    int chroma_value = PyLong_AsLong(arg_chroma);
+    if (chroma_value == -1 && PyErr_Occurred())
+        return NULL;
+
+    enum heif_colorspace colorspace = heif_colorspace_YCbCr;
+    enum heif_chroma chroma;
+    if (chroma_value == 0) {
+        if (self->colorspace == heif_colorspace_monochrome) {
+            colorspace = heif_colorspace_monochrome;
+            chroma = heif_chroma_monochrome;
+        }
+        else if (self->chroma == heif_chroma_420 || self->chroma == heif_chroma_422)
+            chroma = self->chroma;
+        else
+            chroma = heif_chroma_444;
+    }
+    else if (chroma_value == 420)
+        chroma = heif_chroma_420;
+    else if (chroma_value == 422)
+        chroma = heif_chroma_422;
+    else if (chroma_value == 444)
+        chroma = heif_chroma_444;
+    else {
+        PyErr_SetString(PyExc_ValueError, "Chroma must be one of: 420, 422, 444.");
+        return NULL;
+    }
+
+    struct heif_image* heif_image;
+    struct heif_error error;
+    MUTEX_LOCK(&self->decode_mutex);
+    if (!self->handle) {
+        MUTEX_UNLOCK(&self->decode_mutex);
+        PyErr_SetString(PyExc_ValueError, "Input of the image was released.");
+        return NULL;
+    }
+    self->busy++;
+    MUTEX_UNLOCK(&self->decode_mutex);
+    Py_BEGIN_ALLOW_THREADS
+    struct heif_decoding_options *decode_options = heif_decoding_options_alloc();
+    decode_options->convert_hdr_to_8bit = self->hdr_to_8bit;
+    if (strlen(self->decoder_id) > 0) {
+        decode_options->decoder_id = self->decoder_id;
+    }
+    error = heif_decode_image(self->handle, &heif_image, colorspace, chroma, decode_options);
+    heif_decoding_options_free(decode_options);
+    Py_END_ALLOW_THREADS
+    MUTEX_LOCK(&self->decode_mutex);
+    self->busy--;
+    MUTEX_UNLOCK(&self->decode_mutex);
+    if (check_error(error))
+        return NULL;
+
+    PyObject* owner = PyCapsule_New(heif_image, "heif_image", _release_heif_image_capsule);
+    if (!owner) {
+        heif_image_release(heif_image);
+        return NULL;
+    }
+
+    enum heif_channel channels[3] = {heif_channel_Y, heif_channel_Cb, heif_channel_Cr};
+    int n_planes = colorspace == heif_colorspace_monochrome ? 1 : 3;
+    PyObject* planes_list = PyList_New(n_planes);
+    if (!planes_list) {
+        Py_DECREF(owner);
+        return NULL;
+    }
+    for (int i = 0; i < n_planes; i++) {
+        int stride;
+        uint8_t* data = heif_image_get_plane(heif_image, channels[i], &stride);
+        if (!data) {
+            Py_DECREF(planes_list);
+            Py_DECREF(owner);
+            PyErr_SetString(PyExc_RuntimeError, "heif_image_get_plane failed");
+            return NULL;
+        }
+        int width = heif_image_get_width(heif_image, channels[i]);
+        int height = heif_image_get_height(heif_image, channels[i]);
+        int bits = heif_image_get_bits_per_pixel_range(heif_image, channels[i]);
+
+        CtxPlaneObject* plane = PyObject_New(CtxPlaneObject, &CtxPlane_Type);
+        if (!plane) {
+            Py_DECREF(planes_list);
+            Py_DECREF(owner);
+            return NULL;
+        }
+        Py_INCREF(owner);
+        plane->owner = owner;
+        plane->data = data;
+        plane->size = (Py_ssize_t)stride * height;
+        PyObject* plane_info = Py_BuildValue("(Niiii)", (PyObject*)plane, stride, width, height, bits);
+        if (!plane_info) {
+            Py_DECREF(planes_list);
+            Py_DECREF(owner);
+            return NULL;
+        }
+        PyList_SET_ITEM(planes_list, i, plane_info);
+    }
+    Py_DECREF(owner);
+    return planes_list;
+}
+
+static PyObject* _CtxImage_get_thumbnail(CtxImageObject* self, PyObject* arg_index) {
+    // thumbnail with the index from the `thumbnails` list, decoded with the same options as this image
+    CHECK_INPUT(self);
+    int index = PyLong_AsLong(arg_index);
+    if (index == -1 && PyErr_Occurred())
+        return NULL;
+    int n_images = heif_image_handle_get_number_of_thumbnails(self->handle);
+    if (index < 0 || index >= n_images) {
+        PyErr_SetString(PyExc_IndexError, "thumbnail index out of range");
+        return NULL;
+    }
+    heif_item_id* images_ids = (heif_item_id*)malloc(n_images * sizeof(heif_item_id));
+    if (!images_ids)
+        return PyErr_NoMemory();
+    heif_image_handle_get_list_of_thumbnail_IDs(self->handle, images_ids, n_images);
+    heif_item_id thumbnail_id = images_ids[index];
+    free(images_ids);
+
+    struct heif_image_handle* handle;
+    enum heif_colorspace colorspace;
+    enum heif_chroma chroma;
+    if (check_error(heif_image_handle_get_thumbnail(self->handle, thumbnail_id, &handle)))
+        return NULL;
+    if (check_error(heif_image_handle_get_preferred_decoding_colorspace(handle, &colorspace, &chroma))) {
+        heif_image_handle_release(handle);
+        return NULL;
+    }
+    PyObject* thumbnail = _CtxImage(
+        handle, self->hdr_to_8bit, self->bgr_mode, self->remove_stride, self->hdr_to_16bit, 0, self->file_bytes,
+        self->decoder_id, colorspace, chroma);
+    if (thumbnail)
+        ((CtxImageObject*)thumbnail)->postprocess_threads = self->postprocess_threads;
+    return thumbnail;
+}
+
 static PyObject* _CtxImage_pixel_aspect_ratio(CtxImageObject* self, void* closure) {
+    CHECK_INPUT(self);
     uint32_t aspect_h, aspect_v;
     int has_pasp = heif_image_handle_get_pixel_aspect_ratio(self->handle, &aspect_h, &aspect_v);
     if (has_pasp) {
@@ -1580,6 +2370,7 @@ static PyObject* _CtxImage_pixel_aspect_ratio(CtxImageObject* self, void* closur
 }
 
 static PyObject* _CtxImage_content_light_level(CtxImageObject* self, void* closure) {
+    CHECK_INPUT(self);
     struct heif_content_light_level clli;
     if (!heif_image_handle_get_content_light_level(self->handle, &clli))
         Py_RETURN_NONE;
@@ -1589,6 +2380,7 @@ static PyObject* _CtxImage_content_light_level(CtxImageObject* self, void* closu
 }
 
 static PyObject* _CtxImage_mastering_display_colour_volume(CtxImageObject* self, void* closure) {
+    CHECK_INPUT(self);
     struct heif_mastering_display_colour_volume mdcv;
     if (!heif_image_handle_get_mastering_display_colour_volume(self->handle, &mdcv))
         Py_RETURN_NONE;
@@ -1602,6 +2394,7 @@ static PyObject* _CtxImage_mastering_display_colour_volume(CtxImageObject* self,
 }
 
 static PyObject* _CtxImage_ambient_viewing_environment(CtxImageObject* self, void* closure) {
+    CHECK_INPUT(self);
     struct heif_ambient_viewing_environment amve;
     if (!heif_image_handle_get_ambient_viewing_environment(self->handle, &amve))
         Py_RETURN_NONE;
@@ -1612,25 +2405,29 @@ static PyObject* _CtxImage_ambient_viewing_environment(CtxImageObject* self, voi
 }
 
 static PyObject* _CtxImage_tiling(CtxImageObject* self, void* closure) {
+    CHECK_INPUT(self);
     struct heif_image_tiling tiling;
-    /* process_image_transformations=1: report display space values, like all other dimensions we expose */
-    struct heif_error error = heif_image_handle_get_image_tiling(self->handle, 1, &tiling);
+    /* report display space values, like all other dimensions we expose */
+    struct heif_error error = get_image_tiling(self->handle, &tiling);
     if (error.code != heif_error_Ok || (tiling.num_columns <= 1 && tiling.num_rows <= 1)) {
         Py_RETURN_NONE;
     }
-    return Py_BuildValue("{sIsIsIsIsIsI}",
+    return Py_BuildValue("{sIsIsIsIsIsIsIsI}",
         "num_columns", tiling.num_columns,
         "num_rows", tiling.num_rows,
         "tile_width", tiling.tile_width,
         "tile_height", tiling.tile_height,
         "image_width", tiling.image_width,
-        "image_height", tiling.image_height
+        "image_height", tiling.image_height,
+        "top_offset", tiling.top_offset,
+        "left_offset", tiling.left_offset
     );
 }
 
 /* =========== CtxImage Experimental Part ======== */
 
 static PyObject* _CtxImage_camera_intrinsic_matrix(CtxImageObject* self, void* closure) {
+    CHECK_INPUT(self);
     struct heif_camera_intrinsic_matrix camera_intrinsic_matrix;
 
     if (!heif_image_handle_has_camera_intrinsic_matrix(self->handle)) {
@@ -1650,6 +2447,7 @@ static PyObject* _CtxImage_camera_intrinsic_matrix(CtxImageObject* self, void* c
 }
 
 static PyObject* _CtxImage_camera_extrinsic_matrix_rot(CtxImageObject* self, void* closure) {
+    CHECK_INPUT(self);
     struct heif_camera_extrinsic_matrix* camera_extrinsic_matrix;
     double rot[9];
     struct heif_error error;
@@ -1696,6 +2494,12 @@ static struct PyGetSetDef _CtxImage_getseters[] = {
 static struct PyMethodDef _CtxImage_methods[] = {
     {"get_aux_image", (PyCFunction)_CtxImage_get_aux_image, METH_O},
     {"get_aux_type", (PyCFunction)_CtxImage_get_aux_type, METH_O},
+    {"decode_into", (PyCFunction)_CtxImage_decode_into, METH_VARARGS},
+    {"decode_region", (PyCFunction)_CtxImage_decode_region, METH_VARARGS},
+    {"get_thumbnail", (PyCFunction)_CtxImage_get_thumbnail, METH_O},
+    {"decode_ycbcr", (PyCFunction)_CtxImage_decode_ycbcr, METH_O},
+    {"unload", (PyCFunction)_CtxImage_unload, METH_NOARGS},
+    {"release_input", (PyCFunction)_CtxImage_release_input, METH_NOARGS},
     {NULL, NULL}
 };
 
@@ -1750,14 +2554,49 @@ static PyObject* _CtxWrite(PyObject* self, PyObject* args) {
     return (PyObject*)ctx_write;
 }
 
+static PyObject* _read_heif_input(struct heif_context* heif_ctx, PyObject* heif_input) {
+    /* Returns an object that keeps the input alive for as long as any CtxImage needs it:
+       the file reader for a file descriptor or the buffer view for everything else. */
+    PyObject* heif_bytes;
+    struct heif_error error;
+
+    if (PyLong_Check(heif_input)) {
+        int fd = PyLong_AsLong(heif_input);
+        if (fd == -1 && PyErr_Occurred())
+            return NULL;
+        heif_bytes = _CtxReader(fd);
+        if (!heif_bytes)
+            return NULL;
+        error = heif_context_read_from_reader(heif_ctx, &ctx_reader, heif_bytes, NULL);
+    }
+    else {
+        // any object with the buffer protocol, the memoryview holds the export so the memory cannot go away
+        heif_bytes = PyMemoryView_FromObject(heif_input);
+        if (!heif_bytes)
+            return NULL;
+        Py_buffer* view = PyMemoryView_GET_BUFFER(heif_bytes);
+        if (!PyBuffer_IsContiguous(view, 'C')) {
+            PyErr_SetString(PyExc_ValueError, "Input buffer must be C-contiguous.");
+            Py_DECREF(heif_bytes);
+            return NULL;
+        }
+        error = heif_context_read_from_memory_without_copy(heif_ctx, view->buf, view->len, NULL);
+    }
+    if (check_error(error)) {
+        Py_DECREF(heif_bytes);
+        return NULL;
+    }
+    return heif_bytes;
+}
+
 static PyObject* _load_file(PyObject* self, PyObject* args) {
     int hdr_to_8bit, threads_count, bgr_mode, remove_stride, hdr_to_16bit, disable_security_limits;
-    PyObject *heif_bytes;
+    PyObject *heif_input, *heif_bytes;
     const char *decoder_id;
 
     if (!PyArg_ParseTuple(args,
                           "Oiiiiisi",
-                          &heif_bytes,
+                          &heif_input,
                           &threads_count,
                           &hdr_to_8bit,
                           &bgr_mode,
@@ -1773,8 +2612,8 @@ static PyObject* _load_file(PyObject* self, PyObject* args) {
         heif_context_set_security_limits(heif_ctx, heif_get_disabled_security_limits());
     }
 
-    if (check_error(heif_context_read_from_memory_without_copy(
-                        heif_ctx, (void*)PyBytes_AS_STRING(heif_bytes), PyBytes_GET_SIZE(heif_bytes), NULL))) {
+    heif_bytes = _read_heif_input(heif_ctx, heif_input);
+    if (!heif_bytes) {
         heif_context_free(heif_ctx);
         return NULL;
     }
@@ -1784,6 +2623,7 @@ static PyObject* _load_file(PyObject* self, PyObject* args) {
     heif_item_id primary_image_id;
     if (check_error(heif_context_get_primary_image_ID(heif_ctx, &primary_image_id))) {
         heif_context_free(heif_ctx);
+        Py_DECREF(heif_bytes);
         return NULL;
     }
 
@@ -1791,6 +2631,7 @@ static PyObject* _load_file(PyObject* self, PyObject* args) {
     heif_item_id* images_ids = (heif_item_id*)malloc(n_images * sizeof(heif_item_id));
     if (!images_ids) {
         heif_context_free(heif_ctx);
+        Py_DECREF(heif_bytes);
         return PyErr_NoMemory();
     }
     n_images = heif_context_get_list_of_top_level_image_IDs(heif_ctx, images_ids, n_images);
@@ -1798,13 +2639,14 @@ static PyObject* _load_file(PyObject* self, PyObject* args) {
     if (!images_list) {
         free(images_ids);
         heif_context_free(heif_ctx);
+        Py_DECREF(heif_bytes);
         return NULL;
     }
 
+    struct heif_error error;
     enum heif_colorspace colorspace;
     enum heif_chroma chroma;
     struct heif_image_handle* handle;
-    struct heif_error error;
     for (int i = 0; i < n_images; i++) {
         int primary = 0;
         if (images_ids[i] == primary_image_id) {
@@ -1824,8 +2666,10 @@ static PyObject* _load_file(PyObject* self, PyObject* args) {
                     heif_image_handle_release(handle);
                     free(images_ids);
                     heif_context_free(heif_ctx);
+                    Py_DECREF(heif_bytes);
                     return NULL;
                 }
+                ((CtxImageObject*)ctx_image)->postprocess_threads = threads_count > 1 ? threads_count : 1;
                 PyList_SET_ITEM(images_list, i, ctx_image);
             } else {
                 heif_image_handle_release(handle);
@@ -1838,6 +2682,96 @@ static PyObject* _load_file(PyObject* self, PyObject* args) {
     }
     free(images_ids);
     heif_context_free(heif_ctx);
+    Py_DECREF(heif_bytes);
+    return images_list;
+}
+
+static PyObject* _probe_file(PyObject* self, PyObject* args) {
+    /* Like `_load_file` but without creating CtxImage objects: returns a tuple with
+       (width, height, mode, bit_depth, alpha, primary) for each top-level image, or None if it is unreadable. */
+    int hdr_to_8bit, bgr_mode, hdr_to_16bit, disable_security_limits;
+    PyObject *heif_input, *heif_bytes;
+
+    if (!PyArg_ParseTuple(args, "Oiiii", &heif_input, &hdr_to_8bit, &bgr_mode, &hdr_to_16bit, &disable_security_limits))
+        return NULL;
+
+    struct heif_context* heif_ctx = heif_context_alloc();
+
+    if (disable_security_limits) {
+        heif_context_set_security_limits(heif_ctx, heif_get_disabled_security_limits());
+    }
+
+    heif_bytes = _read_heif_input(heif_ctx, heif_input);
+    if (!heif_bytes) {
+        heif_context_free(heif_ctx);
+        return NULL;
+    }
+
+    heif_item_id primary_image_id;
+    if (check_error(heif_context_get_primary_image_ID(heif_ctx, &primary_image_id))) {
+        heif_context_free(heif_ctx);
+        Py_DECREF(heif_bytes);
+        return NULL;
+    }
+
+    int n_images = heif_context_get_number_of_top_level_images(heif_ctx);
+    heif_item_id* images_ids = (heif_item_id*)malloc(n_images * sizeof(heif_item_id));
+    if (!images_ids) {
+        heif_context_free(heif_ctx);
+        Py_DECREF(heif_bytes);
+        return PyErr_NoMemory();
+    }
+    n_images = heif_context_get_list_of_top_level_image_IDs(heif_ctx, images_ids, n_images);
+    PyObject* images_list = PyList_New(n_images);
+    if (!images_list) {
+        free(images_ids);
+        heif_context_free(heif_ctx);
+        Py_DECREF(heif_bytes);
+        return NULL;
+    }
+
+    struct heif_error error;
+    enum heif_colorspace colorspace;
+    enum heif_chroma chroma;
+    struct heif_image_handle* handle;
+    char mode[8];
+    for (int i = 0; i < n_images; i++) {
+        PyObject* image_info = NULL;
+        error = heif_context_get_image_handle(heif_ctx, images_ids[i], &handle);
+        if (error.code == heif_error_Ok) {
+            error = heif_image_handle_get_preferred_decoding_colorspace(handle, &colorspace, &chroma);
+            if (error.code == heif_error_Ok) {
+                int bits = heif_image_handle_get_luma_bits_per_pixel(handle);
+                int alpha = heif_image_handle_has_alpha_channel(handle);
+                get_mode(handle, colorspace, chroma, bits, alpha, hdr_to_8bit, bgr_mode, hdr_to_16bit, mode);
+                image_info = Py_BuildValue(
+                    "(iisiii)",
+                    heif_image_handle_get_width(handle),
+                    heif_image_handle_get_height(handle),
+                    mode,
+                    bits,
+                    alpha,
+                    images_ids[i] == primary_image_id);
+                if (!image_info) {
+                    heif_image_handle_release(handle);
+                    Py_DECREF(images_list);
+                    free(images_ids);
+                    heif_context_free(heif_ctx);
+                    Py_DECREF(heif_bytes);
+                    return NULL;
+                }
+            }
+            heif_image_handle_release(handle);
+        }
+        if (!image_info) {
+            Py_INCREF(Py_None);
+            image_info = Py_None;
+        }
+        PyList_SET_ITEM(images_list, i, image_info);
+    }
+    free(images_ids);
+    heif_context_free(heif_ctx);
+    Py_DECREF(heif_bytes);
     return images_list;
 }
 
@@ -1887,6 +2821,41 @@ static PyObject* _get_lib_info(PyObject* self) {
     return lib_info_dict;
 }
 
+static PyObject* _set_simd(PyObject* self, PyObject* args) {
+    /* enables or disables vectorized postprocess kernels, returns the name of the used kernels */
+    int enabled;
+    if (!PyArg_ParseTuple(args, "p", &enabled))
+        return NULL;
+    ph_simd_level = enabled ? ph_simd_detect() : PH_SIMD_SCALAR;
+    return PyUnicode_FromString(ph_simd_names[ph_simd_level]);
+}
+
+static PyObject* _postprocess(PyObject* self, PyObject* args) {
+    /* data: writable buffer, (size), channels: int, bytes_in_cc: int, shift_size: int, bgr_mode: int,
+       stride_in: int, stride_out: int, threads: int -- runs the decode postprocess in place, used by tests */
+    int width, height, channels, bytes_in_cc, shift_size, bgr_mode, stride_in, stride_out, threads;
+    Py_buffer buffer;
+
+    if (!PyArg_ParseTuple(args, "w*(ii)iiipiii", &buffer, &width, &height, &channels, &bytes_in_cc,
+                          &shift_size, &bgr_mode, &stride_in, &stride_out, &threads))
+        return NULL;
+    if ((width <= 0) || (height <= 0) || (channels < 1) || (channels > 4) || (bytes_in_cc < 1) || (bytes_in_cc > 2) ||
+        (stride_out < width * channels * bytes_in_cc) || (stride_in < stride_out) ||
+        ((Py_ssize_t)stride_in * height > buffer.len)) {
+        PyBuffer_Release(&buffer);
+        PyErr_SetString(PyExc_ValueError, "invalid postprocess parameters");
+        return NULL;
+    }
+    if (bgr_mode)
+        postprocess__bgr_stride(width, height, buffer.buf, buffer.buf, stride_in, stride_out,
+                                bytes_in_cc, channels, shift_size, threads);
+    else
+        postprocess__stride(width, height, buffer.buf, buffer.buf, stride_in, stride_out,
+                            bytes_in_cc, channels, shift_size, threads);
+    PyBuffer_Release(&buffer);
+    Py_RETURN_NONE;
+}
+
 static PyObject* _load_plugins(PyObject* self, PyObject* args) {
     const char *plugins_directory;
     if (!PyArg_ParseTuple(args, "s", &plugins_directory))
@@ -1917,9 +2886,12 @@ static PyObject* _load_plugin(PyObject* self, PyObject* args) {
 static PyMethodDef heifMethods[] = {
     {"CtxWrite", (PyCFunction)_CtxWrite, METH_VARARGS},
     {"load_file", (PyCFunction)_load_file, METH_VARARGS},
+    {"probe_file", (PyCFunction)_probe_file, METH_VARARGS},
     {"get_lib_info", (PyCFunction)_get_lib_info, METH_NOARGS},
     {"load_plugins", (PyCFunction)_load_plugins, METH_VARARGS},
     {"load_plugin", (PyCFunction)_load_plugin, METH_VARARGS},
+    {"set_simd", (PyCFunction)_set_simd, METH_VARARGS},
+    {"postprocess", (PyCFunction)_postprocess, METH_VARARGS},
     {NULL, NULL}
 };
 
@@ -1933,6 +2905,29 @@ static PyTypeObject CtxWriteImage_Type = {
     .tp_methods = _CtxWriteImage_methods,
 };
 
+static PyTypeObject CtxReader_Type = {
+    PyVarObject_HEAD_INIT(NULL, 0)
+    .tp_name = "CtxReader",
+    .tp_basicsize = sizeof(CtxReaderObject),
+    .tp_itemsize = 0,
+    .tp_dealloc = (destructor)_CtxReader_destructor,
+    .tp_flags = Py_TPFLAGS_DEFAULT,
+};
+
+static PyBufferProcs _CtxPlane_as_buffer = {
+    .bf_getbuffer = (getbufferproc)_CtxPlane_getbuffer,
+};
+
+static PyTypeObject CtxPlane_Type = {
+    PyVarObject_HEAD_INIT(NULL, 0)
+    .tp_name = "CtxPlane",
+    .tp_basicsize = sizeof(CtxPlaneObject),
+    .tp_itemsize = 0,
+    .tp_dealloc = (destructor)_CtxPlane_destructor,
+    .tp_flags = Py_TPFLAGS_DEFAULT,
+    .tp_as_buffer = &_CtxPlane_as_buffer,
+};
+
 static PyTypeObject CtxWrite_Type = {
     PyVarObject_HEAD_INIT(NULL, 0)
     .tp_name = "CtxWrite",
@@ -1945,6 +2940,7 @@ static PyTypeObject CtxWrite_Type = {
 
 static PyBufferProcs _CtxImage_as_buffer = {
     .bf_getbuffer = (getbufferproc)_CtxImage_getbuffer,
+    .bf_releasebuffer = (releasebufferproc)_CtxImage_releasebuffer,
 };
 
 static PyTypeObject CtxImage_Type = {
@@ -1969,7 +2965,19 @@ static int setup_module(PyObject* m) {
     if (PyType_Ready(&CtxImage_Type) < 0)
         return -1;
 
+    if (PyType_Ready(&CtxReader_Type) < 0)
+        return -1;
+
+    if (PyType_Ready(&CtxPlane_Type) < 0)
+        return -1;
+
+    if (!ph_bands_init()) {
+        PyErr_NoMemory();
+        return -1;
+    }
+
     heif_init(NULL);
+    ph_simd_level = ph_simd_detect();
     return 0;
 }
 
@@ -8,7 +8,7 @@ from PIL import Image, ImageFile, ImageSequence
 
 from . import options
 from .constants import HeifCompressionFormat
-from .heif import HeifFile
+from .heif import HeifFile, HeifThumbnailImage
 from .misc import (
     CtxEncode,
     _exif_from_pillow,
@@ -37,6 +37,7 @@ class _LibHeifImageFile(ImageFile.ImageFile):
 
     def __init__(self, *args, **kwargs):
         self.__frame = 0
+        self.__draft_image: HeifThumbnailImage | None = None
         super().__init__(*args, **kwargs)
 
     def _open(self):
@@ -53,7 +54,7 @@ class _LibHeifImageFile(ImageFile.ImageFile):
 
     def load(self):
         if self._heif_file:
-            frame_heif = self._heif_file[self.tell()]
+            frame_heif = self.__draft_image or self._heif_file[self.tell()]
             try:
                 data = frame_heif.data  # Size of Image can change during decoding
                 self._size = frame_heif.size  # noqa
@@ -67,7 +68,10 @@ class _LibHeifImageFile(ImageFile.ImageFile):
             if self.fp and getattr(self, "_exclusive_fp", False) and hasattr(self.fp, "close"):
                 self.fp.close()
             self.fp = None
+            # the draft thumbnail stays in use until `seek`: `im` and `size` have its size now
             if not self.is_animated:
+                # `info` reads values lazily from the image, read them now so the decoded image can be freed
+                self.info = dict(self.info)
                 self._heif_file = None
         return super().load()
 
@@ -75,6 +79,8 @@ class _LibHeifImageFile(ImageFile.ImageFile):
         if not self._seek_check(frame):
             return
         self.__frame = frame
+        self.__draft_image = None
+        self.decoderconfig = ()
         self._init_from_heif_file(frame)
 
         # Pillow 11.0+
@@ -87,6 +93,35 @@ class _LibHeifImageFile(ImageFile.ImageFile):
         if exif is not None and getattr(exif, "_loaded", None):
             exif._loaded = False  # pylint: disable=protected-access
 
+    def draft(self, mode: str | None, size: tuple[int, int] | None):
+        """Configures the image to be loaded from the smallest embedded thumbnail that is not smaller than ``size``.
+
+        The requested ``mode`` is ignored, thumbnails are used only when they have the same mode as the image.
+        The chosen scale is stored in ``decoderconfig``.
+
+        :returns: ``None`` if there is no suitable thumbnail, otherwise a tuple with mode and box of the image.
+        """
+        if not self._heif_file or self.fp is None or size is None:
+            return None
+        frame_heif = self._heif_file[self.tell()]
+        if size[0] >= frame_heif.size[0] or size[1] >= frame_heif.size[1]:
+            return None
+        draft_image = None
+        for i, box in enumerate(frame_heif.info["thumbnails"]):
+            if box < max(size) or (draft_image and box >= max(draft_image.size)):
+                continue
+            thumbnail = frame_heif.get_thumbnail(i)
+            if thumbnail.mode != frame_heif.mode or thumbnail.size[0] < size[0] or thumbnail.size[1] < size[1]:
+                continue
+            draft_image = thumbnail
+        if draft_image is None:
+            return None
+        self.__draft_image = draft_image
+        self._size = draft_image.size  # noqa
+        self.decoderconfig = (frame_heif.size[0] / draft_image.size[0],)
+        self.im = Image.core.new(self._mode, self._size)  # pylint: disable=too-many-function-args
+        return self.mode, (0, 0, *self._size)
+
     def tell(self) -> int:
         return self.__frame
 
@@ -179,6 +214,10 @@ def __options_update(**kwargs):
             options.PREFERRED_DECODER = v
         elif k == "grid_tile_size":
             options.GRID_TILE_SIZE = v
+        elif k == "frame_cache_size":
+            options.FRAME_CACHE_SIZE = v
+        elif k == "frame_cache_bytes":
+            options.FRAME_CACHE_BYTES = v
         else:
             warn(f"Unknown option: {k}", stacklevel=1)
 
@@ -0,0 +1,86 @@
+"""Decoding of many files on a pool of threads."""
+
+from collections import deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from time import perf_counter
+from typing import Any
+
+from . import options
+from .heif import HeifFile
+
+
+@dataclass(frozen=True)
+class HeifDecodeResult:
+    """Result of decoding one source, yielded by :py:func:`~pillow_heif.decode_many`."""
+
+    index: int
+    """Position of the source in the ``sources``."""
+    source: Any
+    """The source itself."""
+    heif_file: HeifFile | None
+    """:py:class:`~pillow_heif.HeifFile` with all images decoded, ``None`` if an error occurred."""
+    error: Exception | None
+    """Exception raised during opening or decoding, ``None`` on success."""
+    open_time: float
+    """Seconds spent on opening the source."""
+    decode_time: float
+    """Seconds spent on decoding the images."""
+
+
+def decode_many(
+    sources: Iterable, workers: int = 0, ordered: bool = True, convert_hdr_to_8bit=True, bgr_mode=False, **kwargs
+) -> Iterator[HeifDecodeResult]:
+    """Opens and decodes many HEIF files on a pool of threads.
+
+    All files share one budget of :py:data:`~pillow_heif.options.DECODE_THREADS` threads: each file is decoded
+    with ``DECODE_THREADS // workers`` libheif threads, with zero meaning decoding in the worker thread itself.
+    Only ``2 * workers`` sources are scheduled at a time, so ``sources`` can be a lazy iterable.
+    Errors do not stop the processing, they are reported in the results.
+
+    :param sources: Iterable with the values for the ``fp`` parameter of :py:func:`~pillow_heif.open_heif`.
+    :param workers: Number of files to decode at the same time.
+        Default is :py:data:`~pillow_heif.options.DECODE_THREADS`.
+    :param ordered: Yield results in the order of ``sources``, otherwise in the order of completion.
+    :param convert_hdr_to_8bit: See parameter ``convert_hdr_to_8bit`` in :func:`open_heif`
+    :param bgr_mode: See parameter ``bgr_mode`` in :func:`open_heif`
+    :param kwargs: See parameter ``kwargs`` in :func:`open_heif`
+
+    :returns: Iterator with :py:class:`~pillow_heif.HeifDecodeResult` for each source.
+    """
+    workers = workers if workers > 0 else max(options.DECODE_THREADS, 1)
+    kwargs.setdefault("decode_threads", options.DECODE_THREADS // workers)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending: deque[Future] = deque()
+        for index, source in enumerate(sources):
+            pending.append(pool.submit(_decode_one, index, source, convert_hdr_to_8bit, bgr_mode, kwargs))
+            if len(pending) >= 2 * workers:
+                yield from _pop_decoded(pending, ordered)
+        while pending:
+            yield from _pop_decoded(pending, ordered)
+
+
+def _decode_one(index: int, source, convert_hdr_to_8bit: bool, bgr_mode: bool, kwargs: dict) -> HeifDecodeResult:
+    start_time = perf_counter()
+    try:
+        heif_file = HeifFile(source, convert_hdr_to_8bit, bgr_mode, **kwargs)
+    except Exception as e:  # noqa # pylint: disable=broad-except
+        return HeifDecodeResult(index, source, None, e, perf_counter() - start_time, 0.0)
+    open_time = perf_counter() - start_time
+    start_time = perf_counter()
+    try:
+        heif_file.load_all()
+    except Exception as e:  # noqa # pylint: disable=broad-except
+        return HeifDecodeResult(index, source, None, e, open_time, perf_counter() - start_time)
+    return HeifDecodeResult(index, source, heif_file, None, open_time, perf_counter() - start_time)
+
+
+def _pop_decoded(pending: deque, ordered: bool) -> Iterator[HeifDecodeResult]:
+    if ordered:
+        yield pending.popleft().result()
+        return
+    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+    for future in done:
+        pending.remove(future)
+        yield future.result()
@@ -0,0 +1,208 @@
+"""Cache of decoded images shared between opens of the same files."""
+
+import builtins
+import marshal
+import mmap
+import os
+import tempfile
+from collections import OrderedDict
+from contextlib import suppress
+from copy import deepcopy
+from hashlib import blake2b
+from io import SEEK_SET
+from pathlib import Path
+from threading import Lock
+
+from . import options
+from .heif import HeifFile, HeifImage
+from .misc import MimCImage, _get_bytes, _is_buffer
+
+_CACHED_IMAGE_ATTRS = (
+    "metadata",
+    "color_profile",
+    "primary",
+    "chroma",
+    "colorspace",
+    "pixel_aspect_ratio",
+    "content_light_level",
+    "mastering_display_colour_volume",
+    "ambient_viewing_environment",
+    "camera_intrinsic_matrix",
+    "camera_extrinsic_matrix_rot",
+    "tiling",
+)
+
+
+class HeifDecodeCache:  # pylint: disable=too-few-public-methods
+    """Cache of decoded images shared between opens of the same files.
+
+    Pass it as ``cache`` to :py:func:`~pillow_heif.open_heif` or :py:func:`~pillow_heif.read_heif`.
+    Entries are keyed by a hash of the file contents and the decoding options, so copies of a file are found too.
+    The whole file is read to calculate the hash.
+
+    Files are returned with all images decoded and with their ``info``, but without thumbnails, depth
+    and auxiliary images, also when they were just decoded and added to the cache.
+
+    :param max_bytes: Maximum size of the decoded pixels in the cache, least recently used files are evicted.
+    :param directory: Directory to keep the entries in, the pixels are memory-mapped when read from it.
+        By default, the entries are kept in memory.
+    """
+
+    hits: int
+    """Number of opens served from the cache."""
+
+    misses: int
+    """Number of opens that decoded the file."""
+
+    def __init__(self, max_bytes: int, directory: str | Path | None = None):
+        self.max_bytes = max_bytes
+        self.directory = None if directory is None else Path(directory)
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, tuple[int, tuple | None]] = OrderedDict()  # key -> (size, entry)
+        self._size = 0
+        self._lock = Lock()
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            for path in sorted(self.directory.glob("*.pixels"), key=lambda x: x.stat().st_mtime):
+                self._entries[path.stem] = (path.stat().st_size, None)
+                self._size += path.stat().st_size
+            self._evict()
+
+    def clear(self) -> None:
+        """Removes all entries from the cache."""
+        max_bytes, self.max_bytes = self.max_bytes, 0
+        try:
+            self._evict()
+        finally:
+            self.max_bytes = max_bytes
+
+    def _open(self, fp, convert_hdr_to_8bit: bool, bgr_mode: bool, **kwargs) -> HeifFile:
+        if not _is_buffer(fp) and not isinstance(fp, (str, Path)) and not hasattr(fp, "seek"):
+            fp = _get_bytes(fp)  # the file is read twice: for the hash and for decoding
+        metadata = kwargs.pop("metadata", True)
+        decode_options = (
+            convert_hdr_to_8bit,
+            bgr_mode,
+            kwargs.get("remove_stride", True),
+            kwargs.get("hdr_to_16bit", True),
+            options.PREFERRED_DECODER.get("AVIF", ""),
+            options.PREFERRED_DECODER.get("HEIF", ""),
+            options.DISABLE_SECURITY_LIMITS,
+        )
+        key = self._key(fp, decode_options)
+        entry = self._get(key)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if entry is None:
+            heif_file = HeifFile(fp, convert_hdr_to_8bit, bgr_mode, **kwargs)
+            heif_file.load_all()
+            images = tuple(
+                (
+                    im.mode,
+                    im.size,
+                    im.stride,
+                    im.info["bit_depth"],
+                    {k: getattr(im._c_image, k) for k in _CACHED_IMAGE_ATTRS},  # pylint: disable=protected-access
+                )
+                for im in heif_file
+            )
+            entry = (heif_file.mimetype, images, tuple(bytes(im.data) for im in heif_file))
+            self._put(key, entry)
+        return self._build(entry, metadata)
+
+    @staticmethod
+    def _key(fp, decode_options: tuple) -> str:
+        h = blake2b(repr(decode_options).encode())
+        if _is_buffer(fp):
+            with memoryview(fp) as view:
+                h.update(view if view.c_contiguous else view.tobytes())
+        elif isinstance(fp, (str, Path)):
+            with builtins.open(fp, "rb") as file:
+                while chunk := file.read(1 << 20):
+                    h.update(chunk)
+        else:
+            offset = fp.tell()
+            fp.seek(0, SEEK_SET)
+            while chunk := fp.read(1 << 20):
+                h.update(chunk)
+            fp.seek(offset, SEEK_SET)
+        return h.hexdigest()
+
+    def _get(self, key: str) -> tuple | None:
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            entry = self._entries[key][1]
+        if entry is not None or self.directory is None:
+            return entry
+        try:
+            with builtins.open(self.directory / f"{key}.info", "rb") as file:
+                # marshal does not run code on load, entries are values of the images only
+                mimetype, images, offsets = marshal.load(file)  # noqa: S302
+            with builtins.open(self.directory / f"{key}.pixels", "rb") as file:
+                pixels = memoryview(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if offsets[-1] else b"")
+        except (OSError, ValueError, EOFError, TypeError, IndexError):
+            return None
+        return mimetype, images, tuple(pixels[offsets[i] : offsets[i + 1]] for i in range(len(images)))
+
+    def _put(self, key: str, entry: tuple) -> None:
+        size = sum(len(i) for i in entry[2])
+        if size > self.max_bytes:
+            return
+        if self.directory is not None:
+            offsets = [0]
+            for data in entry[2]:
+                offsets.append(offsets[-1] + len(data))
+            self._write(f"{key}.info", marshal.dumps((entry[0], entry[1], tuple(offsets))))
+            self._write(f"{key}.pixels", *entry[2])
+        with self._lock:
+            if key in self._entries:
+                self._size -= self._entries.pop(key)[0]
+            self._entries[key] = (size, None if self.directory is not None else entry)
+            self._size += size
+        self._evict()
+
+    def _write(self, name: str, *chunks) -> None:
+        # written under a temporary name and renamed, so other processes never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory)
+        try:
+            with builtins.open(fd, "wb") as file:
+                file.writelines(chunks)
+            os.replace(tmp_path, self.directory / name)  # type: ignore[operator]
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def _evict(self) -> None:
+        evicted = []
+        with self._lock:
+            while self._size > self.max_bytes and self._entries:
+                key, (size, _) = self._entries.popitem(last=False)
+                self._size -= size
+                evicted.append(key)
+        if self.directory is not None:
+            for key in evicted:
+                for ext in ("pixels", "info"):
+                    with suppress(OSError):  # on Windows, the file can still be mapped by an opened image
+                        os.unlink(self.directory / f"{key}.{ext}")
+
+    @staticmethod
+    def _build(entry: tuple, metadata: bool) -> HeifFile:
+        mimetype, images, pixels = entry
+        heif_file = HeifFile()
+        heif_file.mimetype = mimetype
+        for index, ((mode, size, stride, bit_depth, attrs), data) in enumerate(zip(images, pixels, strict=True)):
+            c_image = MimCImage(mode, tuple(size), data, stride=stride)
+            for k, v in attrs.items():
+                setattr(c_image, k, deepcopy(v))  # reading of `info` changes some values in place
+            img = HeifImage(c_image, metadata)
+            img.info["bit_depth"] = bit_depth
+            heif_file._images.append(img)  # pylint: disable=protected-access
+            if attrs["primary"]:
+                heif_file.primary_index = index
+        return heif_file
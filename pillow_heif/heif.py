@@ -1,13 +1,18 @@
 """Functions and classes for heif images to read and write."""
 
+from collections.abc import Iterator
+from concurrent.futures import Executor, ThreadPoolExecutor
 from copy import copy, deepcopy
+from dataclasses import dataclass
 from io import SEEK_SET
+from math import ceil
 from threading import Lock
 from typing import Any
 
 from PIL import Image
 
 from . import options
+from ._images import _crop_region, _FrameCache, _LazyInfo, _region_inside, _tile_boxes
 from .constants import HeifCompressionFormat
 from .misc import (
     MODE_INFO,
@@ -15,13 +20,13 @@ from .misc import (
     MimCImage,
     _exif_from_pillow,
     _get_bytes,
-    _get_heif_meta,
     _get_orientation_for_encoder,
     _get_primary_index,
+    _heif_input,
+    _heif_input_mimetype,
     _pil_to_supported_mode,
-    _retrieve_exif,
-    _retrieve_xmp,
     _rotate_pil,
+    _run_async,
     _xmp_from_pillow,
     get_file_mimetype,
     save_colorspace_chroma,
@@ -36,6 +41,20 @@ except ImportError as ex:
     _pillow_heif = DeferredError(ex)
 
 
+@dataclass(frozen=True)
+class HeifPlane:
+    """One plane of the image, returned by :py:meth:`~pillow_heif.heif.BaseImage.decode_ycbcr`."""
+
+    data: memoryview
+    """Pixels of the plane, a view of the memory of the decoded image without a copy."""
+    stride: int
+    """Number of bytes in one row of ``data``, can be larger than ``width * bytes per sample``."""
+    size: tuple[int, int]
+    """Width and height of the plane."""
+    bit_depth: int
+    """Number of bits per sample, samples with more than 8 bits take two bytes in little-endian order."""
+
+
 class BaseImage:
     """Base class for :py:class:`HeifImage`, :py:class:`HeifDepthImage` and :py:class:`HeifAuxImage`."""
 
@@ -53,6 +72,7 @@ class BaseImage:
         self._c_image = c_image
         self._data = None
         self._load_lock = Lock()
+        self._frame_cache: _FrameCache | None = None
 
     @property
     def data(self):
@@ -104,6 +124,60 @@ class BaseImage:
             self.stride,
         )
 
+    def decode_ycbcr(self, chroma: int | None = None) -> tuple[HeifPlane, ...]:
+        """Decodes the image into separate ``Y``, ``Cb`` and ``Cr`` planes, without conversion to RGB.
+
+        The alpha channel is not returned. The decoded pixels of the image (:py:attr:`data`) are not affected.
+
+        :param chroma: Subsampling of the ``Cb`` and ``Cr`` planes: ``420``, ``422`` or ``444``.
+            By default, the subsampling of the encoded image is used, and monochrome images are decoded
+            only to the ``Y`` plane.
+
+        :returns: Tuple with :py:class:`~pillow_heif.HeifPlane` for ``Y``, ``Cb`` and ``Cr`` planes.
+        :exception ValueError: invalid ``chroma`` value or the image was not read from a file.
+        """
+        if isinstance(self._c_image, MimCImage):
+            raise ValueError("YCbCr planes are available only for images read from a file.")
+        return tuple(
+            HeifPlane(memoryview(plane).cast("B"), stride, (width, height), bits)
+            for plane, stride, width, height, bits in self._c_image.decode_ycbcr(chroma or 0)
+        )
+
+    def decode_into(self, buffer, stride: int = 0) -> None:
+        """Decodes image straight into the ``buffer``, without keeping a decoded copy in this object.
+
+        The pixels are written in the same format as :py:attr:`data`, rows are placed ``stride`` bytes apart.
+        To get a Pillow image without a copy, decode into a ``bytearray`` and use
+        :external:py:func:`~PIL.Image.frombuffer` with it.
+
+        .. note:: :py:attr:`size` can change after decoding, so ``buffer`` should be a bit larger for
+            images with transformations. The actual size is in :py:attr:`size` after the call.
+
+        :param buffer: A writable C-contiguous object with the buffer protocol, e.g. a slice of a numpy array.
+        :param stride: Distance between rows in bytes. Default is ``0``, meaning the stride of the first dimension
+            of ``buffer`` for multidimensional buffers, e.g. numpy arrays, and rows without padding otherwise.
+
+        :exception ValueError: ``buffer`` is too small or ``stride`` is invalid.
+        """
+        if not stride:
+            with memoryview(buffer) as view:
+                if view.ndim > 1 and view.strides:
+                    stride = view.strides[0]
+        if isinstance(self._c_image, MimCImage):
+            bytes_per_pixel = MODE_INFO[self.mode][0] * ceil(MODE_INFO[self.mode][1] / 8)
+            row_size = self.size[0] * bytes_per_pixel
+            stride = stride or row_size
+            with memoryview(buffer) as view:
+                out = view.cast("B")
+                if stride < row_size or len(out) < stride * (self.size[1] - 1) + row_size:
+                    raise ValueError("Buffer is too small for the image.")
+                src = memoryview(self.data).cast("B")
+                for i in range(self.size[1]):
+                    out[i * stride : i * stride + row_size] = src[i * self.stride : i * self.stride + row_size]
+            return
+        self._c_image.decode_into(buffer, stride)
+        self.size, _ = self._c_image.size_mode
+
     def load(self) -> None:
         """Method to decode image.
 
@@ -116,6 +190,40 @@ class BaseImage:
                     data = self._c_image.data
                     self.size, _ = self._c_image.size_mode
                     self._data = data
+            if self._frame_cache is not None:
+                self._frame_cache.touch(self)
+
+    def unload(self) -> None:
+        """Releases the decoded image data, it is decoded again on the next access to :py:attr:`data`.
+
+        Images that were not read from a file keep their data.
+
+        :exception BufferError: the data is still in use, e.g. by a ``memoryview`` or a numpy array created from it.
+        """
+        if isinstance(self._c_image, MimCImage):
+            return
+        with self._load_lock:
+            # `_data` is a view of the decoded image too, it is released first and restored if `unload` fails
+            data, self._data = self._data, None
+            if data is not None:
+                try:
+                    data.release()
+                except BufferError:
+                    self._data = data
+                    raise
+            try:
+                self._c_image.unload()
+            except BufferError:
+                if data is not None:
+                    self._data = self._c_image.data
+                raise
+
+    async def load_async(self) -> None:
+        """Coroutine version of :py:meth:`load`, decodes the image on a thread pool shared by all async functions.
+
+        The number of calls waiting for the thread pool is limited, so excess calls wait in the event loop.
+        """
+        await _run_async(self.load)
 
 
 class HeifDepthImage(BaseImage):
@@ -149,57 +257,31 @@ class HeifAuxImage(BaseImage):
         return f"<{self.__class__.__name__} {self.size[0]}x{self.size[1]} {self.mode}>"
 
 
+class HeifThumbnailImage(BaseImage):
+    """Class representing the thumbnail image associated with the :py:class:`~pillow_heif.HeifImage` class."""
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} {self.size[0]}x{self.size[1]} {self.mode}>"
+
+
 class HeifImage(BaseImage):
     """One image in a :py:class:`~pillow_heif.HeifFile` container."""
 
-    def __init__(self, c_image):
+    def __init__(self, c_image, metadata: bool = True):
         super().__init__(c_image)
-        metadata: list[dict] = c_image.metadata
-        exif = _retrieve_exif(metadata)
-        xmp = _retrieve_xmp(metadata)
-        thumbnails: list[int | None] = [i for i in c_image.thumbnails if i is not None] if options.THUMBNAILS else []
-        depth_images: list[HeifDepthImage | None] = (
-            [HeifDepthImage(i) for i in c_image.depth_image_list if i is not None] if options.DEPTH_IMAGES else []
-        )
-        self.info = {
-            "primary": bool(c_image.primary),
-            "bit_depth": int(c_image.bit_depth),
-            "exif": exif,
-            "metadata": metadata,
-            "thumbnails": thumbnails,
-            "depth_images": depth_images,
-        }
-        if options.AUX_IMAGES:
-            ctx_aux_info = {}
-            for aux_id in c_image.aux_image_ids:
-                aux_type = c_image.get_aux_type(aux_id)
-                if aux_type not in ctx_aux_info:
-                    ctx_aux_info[aux_type] = []
-                ctx_aux_info[aux_type].append(aux_id)
-            self.info["aux"] = ctx_aux_info
-        heif_meta = _get_heif_meta(c_image)
-        if xmp:
-            self.info["xmp"] = xmp
-        if heif_meta:
-            self.info["heif"] = heif_meta
-        pixel_aspect_ratio = c_image.pixel_aspect_ratio
-        if pixel_aspect_ratio:
-            self.info["pixel_aspect_ratio"] = pixel_aspect_ratio
-        for key in ("content_light_level", "mastering_display_colour_volume", "ambient_viewing_environment"):
-            value = getattr(c_image, key)
-            if value:
-                self.info[key] = value
-        tiling = c_image.tiling
-        if tiling:
-            self.info["tiling"] = tiling
-        save_colorspace_chroma(c_image, self.info)
-        color_profile: dict[str, Any] = c_image.color_profile
-        if color_profile:
-            if color_profile["type"] in ("rICC", "prof"):
-                self.info["icc_profile"] = color_profile["data"]
-                self.info["icc_profile_type"] = color_profile["type"]
-            else:
-                self.info["nclx_profile"] = color_profile["data"]
+        if metadata:
+            self.info: dict = _LazyInfo(c_image, HeifDepthImage)
+        else:
+            self.info = {"primary": bool(c_image.primary), "bit_depth": int(c_image.bit_depth)}
+
+    def _release_input(self) -> None:
+        if isinstance(self._c_image, MimCImage):
+            return
+        if isinstance(self.info, _LazyInfo):
+            self.info._load_all()  # pylint: disable=protected-access
+        for depth_image in self.info.get("depth_images", []):
+            depth_image._c_image.release_input()  # pylint: disable=protected-access
+        self._c_image.release_input()
 
     def __repr__(self):
         s_bytes = f"{len(self.data)} bytes" if self._data or isinstance(self._c_image, MimCImage) else "no"
@@ -241,6 +323,65 @@ class HeifImage(BaseImage):
         aux_image = self._c_image.get_aux_image(aux_id)
         return HeifAuxImage(aux_image)
 
+    def get_thumbnail(self, index: int) -> HeifThumbnailImage:
+        """Method to retrieve the thumbnail image at the given index of ``info["thumbnails"]``.
+
+        The thumbnail is decoded on first access to its data with the same options as this image.
+
+        :returns: a :py:class:`~pillow_heif.heif.HeifThumbnailImage` class instance.
+        :exception IndexError: there is no thumbnail with such index.
+        """
+        if isinstance(self._c_image, MimCImage):
+            raise IndexError("thumbnail index out of range")
+        return HeifThumbnailImage(self._c_image.get_thumbnail(index))
+
+    def decode_region(self, box: tuple[int, int, int, int]) -> "HeifImage":
+        """Decodes only the part of the image.
+
+        For tiled images (see ``info["tiling"]``) only the tiles intersecting with the region are decoded,
+        their number is stored in ``info["decoded_tiles"]`` of the returned image.
+        Other images are decoded fully and cropped. Nothing is decoded if the image was already decoded.
+
+        :param box: A tuple with the ``x``, ``y``, ``width`` and ``height`` of the region.
+
+        :returns: :py:class:`~pillow_heif.HeifImage` with the pixels of the region in the same mode.
+        :exception ValueError: region is not inside the image.
+        """
+        x, y, width, height = box
+        if isinstance(self._c_image, MimCImage):
+            if not _region_inside(box, self.size):
+                raise ValueError("Region is outside of the image.")
+            data = _crop_region(self.data, self.stride, self.mode, box)
+            decoded_tiles = 0
+        else:
+            data, decoded_tiles = self._c_image.decode_region((x, y, width, height))
+        region = HeifImage(MimCImage(self.mode, (width, height), data))
+        for key in ("exif", "xmp", "icc_profile", "icc_profile_type", "nclx_profile"):
+            if self.info.get(key):
+                region.info[key] = self.info[key]
+        region.info["decoded_tiles"] = decoded_tiles
+        return region
+
+    def iter_tiles(self) -> Iterator[tuple[int, int, BaseImage]]:
+        """Decodes the tiled image one tile at a time, without decoding the whole image.
+
+        Each tile is decoded only when the iteration reaches it, so only one decoded tile needs to be in memory.
+        Tiles at the edges are cropped to the image size, for rotated, mirrored or cropped grids also at
+        the left and top edges.
+        Images without tiles (see ``info["tiling"]``) are yielded as a single tile.
+
+        :returns: Iterator of ``(x, y, tile)`` tuples, where ``x`` and ``y`` are the position of the tile in the
+            image and ``tile`` is a :py:class:`~pillow_heif.heif.BaseImage` in the same mode as the image.
+        """
+        # read from the image itself: ``info`` has no "tiling" for files opened with ``metadata=False``
+        tiling = None if isinstance(self._c_image, MimCImage) else self._c_image.tiling
+        if not tiling:
+            yield 0, 0, self
+            return
+        for x, y, width, height in _tile_boxes(tiling, self.size):
+            data, _ = self._c_image.decode_region((x, y, width, height))
+            yield x, y, BaseImage(MimCImage(self.mode, (width, height), data))
+
 
 class HeifFile:
     """Representation of the :py:class:`~pillow_heif.HeifImage` classes container.
@@ -264,26 +405,34 @@ class HeifFile:
             images = []
             mimetype = ""
         else:
-            fp_bytes = _get_bytes(fp)
-            mimetype = get_file_mimetype(fp_bytes)
-            if mimetype.find("avif") != -1:
-                preferred_decoder = options.PREFERRED_DECODER.get("AVIF", "")
-            elif mimetype.find("heic") != -1 or mimetype.find("heif") != -1:
-                preferred_decoder = options.PREFERRED_DECODER.get("HEIF", "")
-            else:
-                preferred_decoder = ""
-            images = _pillow_heif.load_file(
-                fp_bytes,
-                options.DECODE_THREADS,
-                convert_hdr_to_8bit,
-                bgr_mode,
-                kwargs.get("remove_stride", True),
-                kwargs.get("hdr_to_16bit", True),
-                preferred_decoder,
-                options.DISABLE_SECURITY_LIMITS,
-            )
+            with _heif_input(fp) as heif_input:
+                mimetype = _heif_input_mimetype(heif_input, fp)
+                if mimetype.find("avif") != -1:
+                    preferred_decoder = options.PREFERRED_DECODER.get("AVIF", "")
+                elif mimetype.find("heic") != -1 or mimetype.find("heif") != -1:
+                    preferred_decoder = options.PREFERRED_DECODER.get("HEIF", "")
+                else:
+                    preferred_decoder = ""
+                images = _pillow_heif.load_file(
+                    heif_input,
+                    kwargs.get("decode_threads", options.DECODE_THREADS),
+                    convert_hdr_to_8bit,
+                    bgr_mode,
+                    kwargs.get("remove_stride", True),
+                    kwargs.get("hdr_to_16bit", True),
+                    preferred_decoder,
+                    options.DISABLE_SECURITY_LIMITS,
+                )
         self.mimetype = mimetype
-        self._images: list[HeifImage] = [HeifImage(i) for i in images if i is not None]
+        metadata = kwargs.get("metadata", True)
+        self._images: list[HeifImage] = [HeifImage(i, metadata) for i in images if i is not None]
+        self._frame_cache: _FrameCache | None = None
+        max_frames = kwargs.get("frame_cache_size", options.FRAME_CACHE_SIZE)
+        max_bytes = kwargs.get("frame_cache_bytes", options.FRAME_CACHE_BYTES)
+        if max_frames or max_bytes:
+            self._frame_cache = _FrameCache(max_frames, max_bytes)
+            for img in self._images:
+                img._frame_cache = self._frame_cache  # pylint: disable=protected-access
         self.primary_index = 0
         for index, _ in enumerate(self._images):
             if _.info.get("primary", False):
@@ -401,6 +550,10 @@ class HeifFile:
         """
         _encode_images(self._images, fp, **kwargs)
 
+    async def save_async(self, fp, **kwargs) -> None:
+        """Coroutine version of :py:meth:`save`, encodes images on a thread pool shared by all async functions."""
+        await _run_async(self.save, fp, **kwargs)
+
     def __repr__(self):
         return f"<{self.__class__.__name__} with {len(self)} images: {[str(i) for i in self]}>"
 
@@ -413,13 +566,65 @@ class HeifFile:
     def __getitem__(self, index):
         if index < 0 or index >= len(self._images):
             raise IndexError(f"invalid image index: {index}")
-        return self._images[index]
+        img = self._images[index]
+        if self._frame_cache is not None and img._data:  # pylint: disable=protected-access
+            self._frame_cache.touch(img)
+        return img
 
     def __delitem__(self, key):
         if key < 0 or key >= len(self._images):
             raise IndexError(f"invalid image index: {key}")
+        if self._frame_cache is not None:
+            self._frame_cache.discard(self._images[key])
         del self._images[key]
 
+    def load_all(self, workers: int = 1, executor: Executor | None = None) -> None:
+        """Decodes all images of the container.
+
+        Images are decoded concurrently when ``workers`` is greater than one or ``executor`` is specified.
+        Decoding releases the GIL, so threads are enough to use several CPU cores.
+
+        .. note:: Each image is decoded with the number of threads set by :py:data:`~pillow_heif.options.DECODE_THREADS`
+            at the moment of opening. Use :py:func:`~pillow_heif.read_heif` with ``workers`` to keep the total
+            number of threads within :py:data:`~pillow_heif.options.DECODE_THREADS`.
+
+        :param workers: Number of images to decode at the same time. Ignored when ``executor`` is specified.
+        :param executor: ``concurrent.futures.Executor`` with threads to decode images on.
+
+        :exception EOFError: corrupted image data.
+        :exception SyntaxError: unsupported feature.
+        :exception RuntimeError: some other error.
+        :exception OSError: out of memory.
+        """
+        if executor is None and (workers <= 1 or len(self._images) <= 1):
+            for img in self._images:
+                img.load()
+            return
+        if executor is not None:
+            list(executor.map(BaseImage.load, self._images))
+            return
+        with ThreadPoolExecutor(max_workers=min(workers, len(self._images))) as pool:
+            list(pool.map(BaseImage.load, self._images))
+
+    def release_input(self) -> None:
+        """Releases the encoded data of the file, only the decoded images and their ``info`` stay.
+
+        Call it after decoding the needed images, for example with :py:meth:`load_all`.
+        All values of ``info`` are read before the release.
+        The file descriptor or the buffer is released when no thumbnails or auxiliary images use it.
+
+        .. note:: Images that were not decoded, or were unloaded with :py:meth:`~pillow_heif.HeifImage.unload`,
+            can not be decoded anymore and raise ``ValueError`` on access to their data.
+            Thumbnails, auxiliary images and regions are not available after the release.
+
+        :exception BufferError: an image of the container is being decoded at the moment.
+        """
+        # images unloaded from now on could not be decoded again
+        self._frame_cache = None
+        for img in self._images:
+            img._frame_cache = None  # pylint: disable=protected-access
+            img._release_input()  # pylint: disable=protected-access
+
     def add_frombytes(self, mode: str, size: tuple[int, int], data, **kwargs):
         """Adds image from bytes to container.
 
@@ -529,15 +734,22 @@ class HeifFile:
         """
         return self._images[self.primary_index].get_aux_image(aux_id)
 
+    def decode_region(self, box: tuple[int, int, int, int]) -> HeifImage:
+        """`decode_region`` method of the primary :class:`~pillow_heif.HeifImage` in the container.
+
+        :exception IndexError: If there are no images.
+        """
+        return self._images[self.primary_index].decode_region(box)
+
     __copy__ = __copy
 
 
 def is_supported(fp) -> bool:
     """Checks if the given `fp` object contains a supported file type.
 
-    :param fp: A filename (string), pathlib.Path object or a file object.
-        The file object must implement ``file.read``, ``file.seek``, and ``file.tell`` methods,
-        and be opened in binary mode.
+    :param fp: A filename (string), pathlib.Path object, a file object or an object with the buffer protocol
+        (``bytes``, ``bytearray``, ``memoryview``, ``mmap.mmap``). The file object must implement ``file.read``,
+        ``file.seek``, and ``file.tell`` methods, and be opened in binary mode.
 
     :returns: A boolean indicating if the object can be opened.
     """
@@ -550,6 +762,9 @@ def is_supported(fp) -> bool:
 def open_heif(fp, convert_hdr_to_8bit=True, bgr_mode=False, **kwargs) -> HeifFile:
     """Opens the given HEIF image file.
 
+    .. note:: Objects with the buffer protocol are used without a copy and stay referenced while any image
+        of the returned :py:class:`~pillow_heif.HeifFile` is alive, so ``mmap.mmap`` cannot be closed until then.
+
     :param fp: See parameter ``fp`` in :func:`is_supported`
     :param convert_hdr_to_8bit: Boolean indicating should 10 bit or 12 bit images
         be converted to 8-bit images during decoding. Otherwise, they will open in 16-bit mode.
@@ -559,6 +774,15 @@ def open_heif(fp, convert_hdr_to_8bit=True, bgr_mode=False, **kwargs) -> HeifFil
         should be converted to 16-bit mode during decoding. `Has lower priority than convert_hdr_to_8bit`!
         Default = **True**
 
+        **frame_cache_size**, **frame_cache_bytes** limits of the decoded images kept in memory, see
+        :py:data:`~pillow_heif.options.FRAME_CACHE_SIZE` and :py:data:`~pillow_heif.options.FRAME_CACHE_BYTES`.
+
+        **cache** a :py:class:`~pillow_heif.HeifDecodeCache` to take the decoded images from.
+
+        **metadata** a boolean value, when ``False`` the ``info`` of images contains only ``primary`` and
+        ``bit_depth``: metadata, thumbnails, color profiles, depth and auxiliary images are never read.
+        Default = **True**
+
     :returns: :py:class:`~pillow_heif.HeifFile` object.
     :exception ValueError: invalid input data.
     :exception EOFError: corrupted image data.
@@ -566,9 +790,22 @@ def open_heif(fp, convert_hdr_to_8bit=True, bgr_mode=False, **kwargs) -> HeifFil
     :exception RuntimeError: some other error.
     :exception OSError: out of memory.
     """
+    cache = kwargs.pop("cache", None)
+    if cache is not None:
+        return cache._open(fp, convert_hdr_to_8bit, bgr_mode, **kwargs)  # pylint: disable=protected-access
     return HeifFile(fp, convert_hdr_to_8bit, bgr_mode, **kwargs)
 
 
+async def open_heif_async(fp, convert_hdr_to_8bit=True, bgr_mode=False, **kwargs) -> HeifFile:
+    """Coroutine version of :py:func:`open_heif`, opens the file on a thread pool shared by all async functions.
+
+    Use :py:meth:`~pillow_heif.HeifImage.load_async` to decode the images and
+    :py:meth:`~pillow_heif.HeifFile.save_async` to save them without blocking the event loop.
+    The number of calls waiting for the thread pool is limited, so excess calls wait in the event loop.
+    """
+    return await _run_async(HeifFile, fp, convert_hdr_to_8bit, bgr_mode, **kwargs)
+
+
 def read_heif(fp, convert_hdr_to_8bit=True, bgr_mode=False, **kwargs) -> HeifFile:
     """Opens the given HEIF image file and decodes all images.
 
@@ -584,6 +821,10 @@ def read_heif(fp, convert_hdr_to_8bit=True, bgr_mode=False, **kwargs) -> HeifFil
         should be converted to 16-bit mode during decoding. `Has lower priority than convert_hdr_to_8bit`!
         Default = **True**
 
+        **workers** number of images to decode at the same time. The total number of decoding threads
+        stays within :py:data:`~pillow_heif.options.DECODE_THREADS`: each image gets its share of them.
+        Default = **1**
+
     :returns: :py:class:`~pillow_heif.HeifFile` object.
     :exception ValueError: invalid input data.
     :exception EOFError: corrupted image data.
@@ -591,9 +832,14 @@ def read_heif(fp, convert_hdr_to_8bit=True, bgr_mode=False, **kwargs) -> HeifFil
     :exception RuntimeError: some other error.
     :exception OSError: out of memory.
     """
+    workers = kwargs.pop("workers", 1)
+    if workers > 1:
+        workers = min(workers, max(options.DECODE_THREADS, 1))
+        kwargs.setdefault("decode_threads", options.DECODE_THREADS // workers)
+    if kwargs.get("cache") is not None:
+        return open_heif(fp, convert_hdr_to_8bit, bgr_mode, **kwargs)
     ret = HeifFile(fp, convert_hdr_to_8bit, bgr_mode, **kwargs)
-    for img in ret:
-        img.load()
+    ret.load_all(workers)
     return ret
 
 
@@ -608,18 +854,47 @@ def encode(mode: str, size: tuple[int, int], data, fp, **kwargs) -> None:
     _encode_images([HeifImage(MimCImage(mode, size, data, **kwargs))], fp, **kwargs)
 
 
-def _encode_images(images: list[HeifImage], fp, **kwargs) -> None:
+def encode_tiles(mode: str, size: tuple[int, int], tiles, fp, **kwargs) -> None:
+    """Encodes an image supplied by tiles in a ``fp`` as a grid image, without the whole image in memory.
+
+    Tiles are requested in order from left to right and from top to bottom, only one of them is kept in memory.
+
+    :param mode: `BGR;16`, `RGB;16`, `L;16`, `I;16L`, `BGR`, `RGB`, `L`
+    :param size: tuple with ``width`` and ``height`` of an image.
+    :param tiles: callable receiving the ``x``, ``y``, ``width`` and ``height`` tuple of a tile and returning
+        bytes-like object with raw data of it, or an iterable yielding such objects in the order of the tiles.
+        Tiles at the right and bottom edges are smaller when the size is not divisible by ``tile_size``.
+    :param fp: A filename (string), pathlib.Path object or an object with ``write`` method.
+    :param tile_size: size of the grid tiles, :py:attr:`~pillow_heif.options.GRID_TILE_SIZE` by default.
+    :param thumbnail_source: tuple with ``size`` and raw ``data`` of a downscaled copy of the image in the same mode,
+        ``thumbnails`` are encoded from it. Required when ``thumbnails`` are requested.
+
+    :exception ValueError: mode with alpha channel, no ``tile_size`` or not enough tiles.
+    """
+    ctx_write = _create_encoder(**kwargs)
+    tile_size = kwargs.pop("tile_size", None) or options.GRID_TILE_SIZE
+    kwargs["primary"] = True
+    kwargs["image_orientation"] = _get_orientation_for_encoder(kwargs)
+    ctx_write.add_image_tiles(size, mode, tiles, tile_size, **kwargs)
+    ctx_write.save(fp)
+
+
+def _create_encoder(**kwargs) -> CtxEncode:
     compression = kwargs.get("format", "HEIF")
     compression_format = HeifCompressionFormat.AV1 if compression == "AVIF" else HeifCompressionFormat.HEVC
     if not _pillow_heif.get_lib_info()[compression]:
         raise RuntimeError(f"No {compression} encoder found.")
+    return CtxEncode(compression_format, **kwargs)
+
+
+def _encode_images(images: list[HeifImage], fp, **kwargs) -> None:
     images_to_save: list[HeifImage] = images + kwargs.get("append_images", [])
     if not kwargs.get("save_all", True):
         images_to_save = images_to_save[:1]
     if not images_to_save:
         raise ValueError("Cannot write file with no images as HEIF.")
     primary_index = _get_primary_index(images_to_save, kwargs.get("primary_index"))
-    ctx_write = CtxEncode(compression_format, **kwargs)
+    ctx_write = _create_encoder(**kwargs)
     tile_size = kwargs.pop("tile_size", None)
     for i, img in enumerate(images_to_save):
         img.load()
@@ -3,10 +3,18 @@
 Mostly for internal use, so prototypes can change between versions.
 """
 
+import asyncio
 import builtins
+import io
+import os
 import re
+import stat
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from dataclasses import dataclass
 from enum import IntEnum
+from functools import cache, partial
 from math import ceil
 from pathlib import Path
 from struct import pack, unpack
@@ -188,7 +196,11 @@ def get_file_mimetype(fp) -> str:
     :returns: "image/heic", "image/heif", "image/heic-sequence", "image/heif-sequence",
         "image/avif", "image/avif-sequence" or "".
     """
-    heif_brand = _get_bytes(fp, 12)[8:]
+    return _mimetype_from_header(_get_bytes(fp, 12))
+
+
+def _mimetype_from_header(header: bytes) -> str:
+    heif_brand = header[8:12]
     if heif_brand:
         if heif_brand == b"avif":
             return "image/avif"
@@ -215,9 +227,84 @@ def _get_bytes(fp, length=None) -> bytes:
         if offset is not None and hasattr(fp, "seek"):
             fp.seek(offset)
         return result
+    if length is not None:
+        with memoryview(fp) as view:
+            if view.c_contiguous:
+                return view.cast("B")[:length].tobytes()
     return bytes(fp)[:length]
 
 
+def _is_buffer(fp) -> bool:
+    try:
+        memoryview(fp).release()
+    except TypeError:
+        return False
+    return True
+
+
+def _is_regular_file(fp) -> bool:
+    try:
+        return stat.S_ISREG(os.fstat(fp.fileno()).st_mode)
+    except (OSError, ValueError):
+        return False
+
+
+@contextmanager
+def _heif_input(fp):
+    """Yields the input for ``load_file``: a file descriptor for regular files or an object with the buffer protocol.
+
+    With a file descriptor, libheif reads only the parts of the file it needs. The descriptor is duplicated on
+    the C side, so the file opened here can be closed when the context exits.
+    Buffers(``bytes``, ``bytearray``, ``memoryview``, ``mmap.mmap``, numpy arrays) are used without a copy.
+    """
+    if _is_buffer(fp):
+        yield fp
+        return
+    if isinstance(fp, (str, Path)):
+        with builtins.open(fp, "rb") as file:
+            yield file.fileno() if _is_regular_file(file) else file.read()
+        return
+    # without "pread" a duplicated descriptor shares the offset with the original one;
+    # libheif reads the descriptor from its start, so streams at other positions are read from the current one
+    if (
+        isinstance(fp, (io.BufferedReader, io.BufferedRandom, io.FileIO))
+        and hasattr(os, "pread")
+        and _is_regular_file(fp)
+        and fp.tell() == 0
+    ):
+        yield fp.fileno()
+        return
+    yield _get_bytes(fp)
+
+
+def _heif_input_mimetype(heif_input, fp) -> str:
+    """Gets the MIME type of the value yielded by :py:func:`_heif_input`, reading only the header of descriptors."""
+    if not isinstance(heif_input, int):
+        return get_file_mimetype(heif_input)
+    if hasattr(os, "pread"):
+        return _mimetype_from_header(os.pread(heif_input, 12, 0))
+    return get_file_mimetype(fp)
+
+
+_ASYNC_WORKERS = os.cpu_count() or 1
+_ASYNC_SEMAPHORES: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()  # event loop -> asyncio.Semaphore
+
+
+@cache
+def _async_executor() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=_ASYNC_WORKERS, thread_name_prefix="pillow_heif")
+
+
+async def _run_async(func, *args, **kwargs):
+    """Runs ``func`` on the shared executor, waiting when there are already too many calls in the queue."""
+    loop = asyncio.get_running_loop()
+    semaphore = _ASYNC_SEMAPHORES.get(loop)
+    if semaphore is None:
+        semaphore = _ASYNC_SEMAPHORES.setdefault(loop, asyncio.Semaphore(2 * _ASYNC_WORKERS))
+    async with semaphore:
+        return await loop.run_in_executor(_async_executor(), partial(func, *args, **kwargs))
+
+
 def _retrieve_exif(metadata: list[dict]) -> bytes | None:
     result = None
     purge = []
@@ -354,37 +441,32 @@ def _get_heif_meta(c_image) -> dict:
     return r
 
 
-def _extract_tile(
-    data, src_stride: int, bytes_per_pixel: int, tile_box: tuple[int, int, int, int], tile_wh: int
-) -> bytes:
-    x, y, w, h = tile_box
-    tile_stride = tile_wh * bytes_per_pixel
-    tile_data = bytearray(tile_stride * tile_wh)
-    src_row_bytes = w * bytes_per_pixel
-    for row in range(h):
-        src_offset = (y + row) * src_stride + x * bytes_per_pixel
-        dst_offset = row * tile_stride
-        tile_data[dst_offset : dst_offset + src_row_bytes] = data[src_offset : src_offset + src_row_bytes]
-        if w < tile_wh:  # replicate the edge pixel, padding with zeros bleeds into the image via chroma subsampling
-            edge_pixel = tile_data[dst_offset + src_row_bytes - bytes_per_pixel : dst_offset + src_row_bytes]
-            tile_data[dst_offset + src_row_bytes : dst_offset + tile_stride] = edge_pixel * (tile_wh - w)
-    if h < tile_wh:
-        edge_row = tile_data[(h - 1) * tile_stride : h * tile_stride]
-        for row in range(h, tile_wh):
-            tile_data[row * tile_stride : (row + 1) * tile_stride] = edge_row
-    return bytes(tile_data)
-
-
 def _add_planes(  # pylint: disable=too-many-arguments disable=too-many-positional-arguments
-    im_out, size: tuple[int, int], mode: str, data, stride: int, bit_depth_out: int
+    im_out, size: tuple[int, int], mode: str, data, stride: int, bit_depth_out: int, src_size=None
 ) -> None:
+    # `src_size` copies only that part of `data`, the rest of the planes is filled by replicating its edge pixels
     bit_depth_in = MODE_INFO[mode][1]
+    src_size = src_size or size
     if MODE_INFO[mode][0] == 1:
-        im_out.add_plane_l(size, bit_depth_out, bit_depth_in, data, stride, HeifChannel.CHANNEL_Y)
+        im_out.add_plane_l(size, bit_depth_out, bit_depth_in, data, stride, HeifChannel.CHANNEL_Y, src_size)
     elif MODE_INFO[mode][0] == 2:
-        im_out.add_plane_la(size, bit_depth_out, bit_depth_in, data, stride)
+        im_out.add_plane_la(size, bit_depth_out, bit_depth_in, data, stride, src_size)
     else:
-        im_out.add_plane(size, bit_depth_out, bit_depth_in, data, mode.find("BGR") != -1, stride)
+        im_out.add_plane(size, bit_depth_out, bit_depth_in, data, mode.find("BGR") != -1, stride, src_size)
+
+
+def _buffer_tile_source(size: tuple[int, int], mode: str, data, stride: int):
+    bytes_per_pixel = MODE_INFO[mode][0] * (2 if MODE_INFO[mode][1] > 8 else 1)
+    src_stride = stride or (size[0] * bytes_per_pixel)
+    if len(data) < src_stride * (size[1] - 1) + size[0] * bytes_per_pixel:
+        raise ValueError("Image plane does not contain enough data.")
+    data_view = memoryview(data).cast("B")
+
+    def tile_source(tile_box: tuple[int, int, int, int]):
+        # tiles are copied from the source buffer straight into the image planes, without intermediate copies
+        return data_view[tile_box[1] * src_stride + tile_box[0] * bytes_per_pixel :], src_stride
+
+    return tile_source
 
 
 def _output_bit_depth(mode: str, **kwargs) -> int:
@@ -466,17 +548,60 @@ class CtxEncode:
         # itself, so Apple's ImageIO renders tiled alpha images as fully opaque; it also cannot
         # mark grid items as premultiplied. Images with an alpha channel are encoded as a single image.
         has_alpha = mode.split(sep=";")[0][-1] in ("A", "a")
+        if (
+            tile_size > 0
+            and not has_alpha
+            and not self._miaf_invalid_grid(size, mode, tile_size)
+            and (size[0] > tile_size or size[1] > tile_size)
+        ):
+            stride = kwargs.get("stride", 0)
+            tile_source = _buffer_tile_source(size, mode, data, stride)
+            self._add_image_grid(size, mode, tile_source, tile_size, (size, data, stride), **kwargs)
+        else:
+            self._add_image_single(size, mode, data, **kwargs)
+
+    def add_image_tiles(  # pylint: disable=too-many-arguments disable=too-many-positional-arguments
+        self, size: tuple[int, int], mode: str, tiles, tile_size: int, thumbnail_source=None, **kwargs
+    ) -> None:
+        """Adds image supplied by tiles to the encoder, see :py:func:`~pillow_heif.encode_tiles`."""
+        if size[0] <= 0 or size[1] <= 0:
+            raise ValueError("Empty images are not supported.")
+        if tile_size <= 0:
+            raise ValueError("`tile_size` must be a positive value.")
+        if mode == "YCbCr" or mode.split(sep=";")[0][-1] in ("A", "a"):
+            raise ValueError(f"Images in `{mode}` mode cannot be encoded from tiles.")
+        if self._miaf_invalid_grid(size, mode, tile_size):
+            raise ValueError("Grid image does not satisfy MIAF requirements, check `tile_size` and the image size.")
+        thumbnails = [i for i in kwargs.get("thumbnails", []) if max(size) > i > 3]
+        if thumbnails and thumbnail_source is None:
+            raise ValueError("`thumbnail_source` is required to encode thumbnails of image supplied by tiles.")
+        bytes_per_pixel = MODE_INFO[mode][0] * (2 if MODE_INFO[mode][1] > 8 else 1)
+        tiles_iter = None if callable(tiles) else iter(tiles)
+
+        def tile_source(tile_box: tuple[int, int, int, int]):
+            if tiles_iter is None:
+                return tiles(tile_box), tile_box[2] * bytes_per_pixel
+            tile_data = next(tiles_iter, None)
+            if tile_data is None:
+                raise ValueError("Not enough tiles to fill the image.")
+            return tile_data, tile_box[2] * bytes_per_pixel
+
+        kwargs.pop("stride", None)
+        if size[0] <= tile_size and size[1] <= tile_size:
+            self._add_image_single(size, mode, tile_source((0, 0, size[0], size[1]))[0], **kwargs)
+            return
+        if thumbnail_source is not None:
+            thumbnail_source = (thumbnail_source[0], thumbnail_source[1], 0)
+        self._add_image_grid(size, mode, tile_source, tile_size, thumbnail_source, **kwargs)
+
+    def _miaf_invalid_grid(self, size: tuple[int, int], mode: str, tile_size: int) -> bool:
         # MIAF (ISO/IEC 23000-22) requires grid tiles of at least 64 pixels and, with subsampled
         # chroma, even image dimensions and tile offsets; libavif refuses to decode AVIF files
         # violating this entirely, so such images are also encoded as a single image.
-        miaf_invalid = self._compression_format == HeifCompressionFormat.AV1 and (
+        return self._compression_format == HeifCompressionFormat.AV1 and (
             tile_size < 64
-            or (MODE_INFO[mode][0] > 2 and self._chroma != "444" and (size[0] % 2 or size[1] % 2 or tile_size % 2))
+            or (MODE_INFO[mode][0] > 2 and self._chroma != "444" and bool(size[0] % 2 or size[1] % 2 or tile_size % 2))
         )
-        if tile_size > 0 and not has_alpha and not miaf_invalid and (size[0] > tile_size or size[1] > tile_size):
-            self._add_image_grid(size, mode, data, tile_size, **kwargs)
-        else:
-            self._add_image_single(size, mode, data, **kwargs)
 
     def _add_image_single(self, size: tuple[int, int], mode: str, data, **kwargs) -> None:
         premultiplied_alpha = int(mode.split(sep=";")[0][-1] == "a")
@@ -486,7 +611,9 @@ class CtxEncode:
         _add_planes(im_out, size, mode, data, kwargs.get("stride", 0), _output_bit_depth(mode, **kwargs))
         self._finish_add_image(im_out, size, mode, **kwargs)
 
-    def _add_image_grid(self, size: tuple[int, int], mode: str, data, tile_size: int, **kwargs) -> None:
+    def _add_image_grid(  # pylint: disable=too-many-arguments disable=too-many-positional-arguments
+        self, size: tuple[int, int], mode: str, tile_source, tile_size: int, thumbnail_source, **kwargs
+    ) -> None:
         tile_columns = ceil(size[0] / tile_size)
         tile_rows = ceil(size[1] / tile_size)
         if tile_columns > 256 or tile_rows > 256:  # the ISO grid payload stores tile counts as uint8
@@ -503,7 +630,7 @@ class CtxEncode:
             *_output_nclx_params(kwargs, kwargs.get("nclx_profile")),
             kwargs.get("image_orientation", 1),
         )
-        self._add_grid_tiles(grid_handle, size, mode, data, tile_size=tile_size, **kwargs)
+        self._add_grid_tiles(grid_handle, size, mode, tile_source, tile_size=tile_size, **kwargs)
         pixel_aspect_ratio = kwargs.get("pixel_aspect_ratio")
         if pixel_aspect_ratio:
             grid_handle.set_pixel_aspect_ratio(pixel_aspect_ratio[0], pixel_aspect_ratio[1])
@@ -512,24 +639,31 @@ class CtxEncode:
             grid_handle.set_primary(self.ctx_write)
         self._add_metadata(grid_handle, **kwargs)
         thumbnails = [i for i in kwargs.get("thumbnails", []) if max(size) > i > 3]
-        if thumbnails:
-            pixels_im = self.ctx_write.create_image(size, MODE_INFO[mode][2], MODE_INFO[mode][3], 0)
-            _add_planes(pixels_im, size, mode, data, kwargs.get("stride", 0), _output_bit_depth(mode, **kwargs))
+        if thumbnails and thumbnail_source is not None:
+            # thumbnails are scaled down from `thumbnail_source`, a smaller copy of the image can be used for them
+            thumb_size, thumb_data, thumb_stride = thumbnail_source
+            pixels_im = self.ctx_write.create_image(thumb_size, MODE_INFO[mode][2], MODE_INFO[mode][3], 0)
+            _add_planes(pixels_im, thumb_size, mode, thumb_data, thumb_stride, _output_bit_depth(mode, **kwargs))
             image_orientation = kwargs.get("image_orientation", 1)
+            thumbnails = [i for i in thumbnails if max(thumb_size) > i]  # libheif does not upscale thumbnails
             self._items_count += len(thumbnails)
             for thumb_box in thumbnails:
                 grid_handle.encode_thumbnail(self.ctx_write, thumb_box, image_orientation, pixels_im)
         self._grid_images.append(grid_handle)
 
-    def _add_grid_tiles(self, grid_handle, size: tuple[int, int], mode: str, data, **kwargs) -> None:
+    def _add_grid_tiles(self, grid_handle, size: tuple[int, int], mode: str, tile_source, **kwargs) -> None:
+        """Encodes the tiles of a grid image one by one.
+
+        Tiles can not be encoded concurrently: `libheif` encodes a tile and adds it to the file in one call that works
+        on the shared context, and there is no API to add a tile encoded elsewhere. Preparing the next tiles on other
+        threads would gain little, as tiles are copied to their planes in C without the GIL.
+        The encoder uses its own threads for each tile.
+        """
         tile_size = kwargs["tile_size"]
         bit_depth_out = _output_bit_depth(mode, **kwargs)
-        bytes_per_pixel = MODE_INFO[mode][0] * (2 if MODE_INFO[mode][1] > 8 else 1)
-        src_stride = kwargs.get("stride", 0) or (size[0] * bytes_per_pixel)
-        if len(data) < src_stride * (size[1] - 1) + size[0] * bytes_per_pixel:
-            raise ValueError("Image plane does not contain enough data.")
         icc_profile = kwargs.get("icc_profile")
         tile_wh = (tile_size, tile_size)
+        # tiles are requested from the source in order and encoded one by one, only one of them is kept in memory
         for row in range(ceil(size[1] / tile_size)):
             for col in range(ceil(size[0] / tile_size)):
                 tile_box = (
@@ -538,11 +672,11 @@ class CtxEncode:
                     min(tile_size, size[0] - col * tile_size),
                     min(tile_size, size[1] - row * tile_size),
                 )
-                tile_data = _extract_tile(data, src_stride, bytes_per_pixel, tile_box, tile_size)
+                tile_data, tile_stride = tile_source(tile_box)
                 tile_im = self.ctx_write.create_image(
                     tile_wh, MODE_INFO[mode][2], MODE_INFO[mode][3], int(mode.split(sep=";")[0][-1] == "a")
                 )
-                _add_planes(tile_im, tile_wh, mode, tile_data, 0, bit_depth_out)
+                _add_planes(tile_im, tile_wh, mode, tile_data, tile_stride, bit_depth_out, tile_box[2:])
                 if icc_profile is not None:
                     tile_im.set_icc_profile(kwargs.get("icc_profile_type", "prof"), icc_profile)
                 self.ctx_write.add_tile(grid_handle, col, row, tile_im)
@@ -637,14 +771,12 @@ class CtxEncode:
         """Ask encoder to produce output based on previously added images."""
         if self._grid_images and self._items_count > 1000:  # metadata of frames added after a grid
             raise ValueError(MAX_ITEMS_ERROR)
-        data = self.ctx_write.finalize()
-        self._grid_images.clear()
-        if isinstance(fp, (str, Path)):
-            Path(fp).write_bytes(data)
-        elif hasattr(fp, "write"):
-            fp.write(data)
-        else:
+        if not isinstance(fp, (str, Path)) and not hasattr(fp, "write"):
             raise TypeError("`fp` must be a path to file or an object with `write` method.")
+        # the encoded file is written by chunks straight from the libheif buffer, without a copy as `bytes`;
+        # files are opened only when the output is ready, so a failed `finalize` leaves an existing file untouched
+        self.ctx_write.finalize(os.fspath(fp) if isinstance(fp, (str, Path)) else fp)
+        self._grid_images.clear()
 
 
 @dataclass
@@ -77,6 +77,25 @@ You can get the available decoders IDs using ``libheif_info()`` function.
 When use pillow_heif as a plugin you can set this option with ``preferred_decoder`` key."""
 
 
+FRAME_CACHE_SIZE = 0
+"""Maximum number of decoded images kept in memory for each opened file.
+
+When more images of a :py:class:`~pillow_heif.HeifFile` are decoded, the least recently used ones are unloaded
+and decoded again on the next access. Also applies to frames of multi-frame images opened with Pillow.
+A value of 0 (default) keeps all decoded images.
+
+When use pillow_heif as a plugin you can set it with: `register_*_opener(frame_cache_size=8)`"""
+
+
+FRAME_CACHE_BYTES = 0
+"""Maximum size in bytes of the decoded images kept in memory for each opened file.
+
+Works like :py:data:`FRAME_CACHE_SIZE`, both limits can be set at once. The most recently used image
+always stays decoded, even when it is larger than the limit. A value of 0 (default) sets no limit.
+
+When use pillow_heif as a plugin you can set it with: `register_*_opener(frame_cache_bytes=512 * 1024 * 1024)`"""
+
+
 DISABLE_SECURITY_LIMITS = False
 """Option to completely disable libheif security limits.
 
@@ -0,0 +1,79 @@
+"""Reading of the header information of the images without preparing them for decoding."""
+
+from dataclasses import dataclass, field
+from io import SEEK_SET
+
+from . import options
+from .misc import _heif_input, _heif_input_mimetype
+
+try:
+    import _pillow_heif
+except ImportError as ex:
+    from ._deffered_error import DeferredError
+
+    _pillow_heif = DeferredError(ex)
+
+
+@dataclass(frozen=True)
+class HeifProbeImage:
+    """Header information of one top-level image, returned by :py:func:`~pillow_heif.probe_heif`."""
+
+    size: tuple[int, int]
+    """Width and height of the image."""
+    mode: str
+    """The image would be decoded in this mode, see :py:attr:`~pillow_heif.HeifImage.mode`."""
+    bit_depth: int
+    """Number of bits per channel in the encoded image."""
+    has_alpha: bool
+    """``True`` if the image has an alpha channel."""
+    primary: bool
+    """``True`` for the primary image."""
+
+
+@dataclass(frozen=True)
+class HeifProbe:
+    """Result of :py:func:`~pillow_heif.probe_heif`. ``len()`` returns the number of images."""
+
+    mimetype: str
+    """MIME type of the file, see :py:func:`~pillow_heif.get_file_mimetype`."""
+    primary_index: int
+    """Index of the primary image in :py:attr:`images`."""
+    images: list[HeifProbeImage] = field(default_factory=list)
+    """Header information of the top-level images."""
+
+    def __len__(self):
+        return len(self.images)
+
+
+def probe_heif(fp, convert_hdr_to_8bit=True, bgr_mode=False, **kwargs) -> HeifProbe:
+    """Reads only the header information of the images without preparing them for decoding.
+
+    Much cheaper than :py:func:`~pillow_heif.open_heif` when only sizes and modes are needed:
+    metadata, thumbnails, color profiles and auxiliary images are not read.
+
+    :param fp: See parameter ``fp`` in :func:`is_supported`
+    :param convert_hdr_to_8bit: See parameter ``convert_hdr_to_8bit`` in :func:`open_heif`, affects ``mode``.
+    :param bgr_mode: See parameter ``bgr_mode`` in :func:`open_heif`, affects ``mode``.
+    :param kwargs: **hdr_to_16bit**, see :func:`open_heif`, affects ``mode``.
+
+    :returns: :py:class:`~pillow_heif.HeifProbe` object.
+    :exception ValueError: invalid input data.
+    :exception EOFError: corrupted image data.
+    :exception SyntaxError: unsupported feature.
+    :exception RuntimeError: some other error.
+    :exception OSError: out of memory.
+    """
+    if hasattr(fp, "seek"):
+        fp.seek(0, SEEK_SET)
+    with _heif_input(fp) as heif_input:
+        mimetype = _heif_input_mimetype(heif_input, fp)
+        probed = _pillow_heif.probe_file(
+            heif_input,
+            convert_hdr_to_8bit,
+            bgr_mode,
+            kwargs.get("hdr_to_16bit", True),
+            options.DISABLE_SECURITY_LIMITS,
+        )
+    images = [HeifProbeImage((i[0], i[1]), i[2], i[3], bool(i[4]), bool(i[5])) for i in probed if i is not None]
+    primary_index = next((index for index, i in enumerate(images) if i.primary), 0)
+    return HeifProbe(mimetype, primary_index, images)
@@ -77,3 +77,59 @@ def test_numpy_disable_stride_removal(img):
     heif_file = pillow_heif.open_heif(img, convert_hdr_to_8bit=False, remove_stride=False)
     heif_array = np.asarray(heif_file)
     assert heif_array.shape == (100, 64, 4 if heif_file.has_alpha else 3)
+
+
+@pytest.mark.parametrize(
+    "img",
+    (
+        "images/heif/L_8__29x100.heif",
+        "images/heif/L_10__29x100.heif",
+        "images/heif/RGB_8__29x100.heif",
+        "images/heif/RGB_12__29x100.heif",
+        "images/heif/RGBA_8__29x100.heif",
+        "images/heif/RGBA_10__29x100.heif",
+    ),
+)
+@pytest.mark.parametrize("bgr_mode", (False, True))
+@pytest.mark.parametrize("convert_hdr_to_8bit", (False, True))
+def test_numpy_decode_into(img, bgr_mode, convert_hdr_to_8bit):
+    expected = np.asarray(pillow_heif.open_heif(img, convert_hdr_to_8bit=convert_hdr_to_8bit, bgr_mode=bgr_mode))
+    batch = np.zeros((2, *expected.shape), dtype=expected.dtype)
+    heif_file = pillow_heif.open_heif(img, convert_hdr_to_8bit=convert_hdr_to_8bit, bgr_mode=bgr_mode)
+    heif_file[0].decode_into(batch[1])
+    assert getattr(heif_file[0], "_data") is None
+    assert np.array_equal(batch[1], expected)
+    assert not batch[0].any()
+    heif_file[0].load()  # copying from already decoded data
+    batch[1] = 0
+    heif_file[0].decode_into(batch[1])
+    assert np.array_equal(batch[1], expected)
+
+
+def test_numpy_decode_into_stride():
+    heif_file = pillow_heif.open_heif("images/heif/RGB_8__29x100.heif")
+    expected = np.asarray(heif_file)
+    out = np.zeros((100, 32, 3), dtype=np.uint8)
+    heif_file[0].decode_into(out, 32 * 3)
+    assert np.array_equal(out[:, :29, :], expected)
+    assert not out[:, 29:, :].any()
+    out[:] = 0
+    heif_file[0].decode_into(out)  # stride is taken from the array
+    assert np.array_equal(out[:, :29, :], expected)
+    assert not out[:, 29:, :].any()
+    out_flat = np.zeros(29 * 3 * 100, dtype=np.uint8)
+    heif_file[0].decode_into(out_flat)  # rows without padding
+    assert np.array_equal(out_flat.reshape(expected.shape), expected)
+    with pytest.raises(ValueError):
+        heif_file[0].decode_into(out, 28 * 3)
+    with pytest.raises(ValueError):
+        heif_file[0].decode_into(out[:99])
+    with pytest.raises(ValueError):
+        heif_file[0].decode_into(out_flat[:-1])
+
+
+def test_numpy_decode_into_from_pillow():
+    im = helpers.gradient_rgb()
+    out = np.zeros((im.height, im.width, 3), dtype=np.uint8)
+    pillow_heif.from_pillow(im)[0].decode_into(out)
+    assert np.array_equal(out, np.asarray(im))
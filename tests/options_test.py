@@ -68,6 +68,8 @@ def test_thumbnails_option():
         # disabling thumbnails and checking them not to be present
         options.THUMBNAILS = False
         heif_file = open_heif(heif_buf)
+        options.THUMBNAILS = True
+        # value of the option is taken when opening, even if `info` is read later
         assert not heif_file.info["thumbnails"]
     finally:
         options.THUMBNAILS = True
@@ -1,8 +1,12 @@
+import asyncio
 import builtins
+import mmap
 import os
+from concurrent.futures import ThreadPoolExecutor
 from copy import copy, deepcopy
 from gc import collect
 from io import BytesIO
+from itertools import product
 from pathlib import Path
 from unittest import mock
 
@@ -13,6 +17,7 @@ from packaging.version import parse as parse_version
 from PIL import Image, ImageCms, ImageSequence, UnidentifiedImageError
 
 import pillow_heif
+from pillow_heif.misc import MODE_INFO, _heif_input
 
 os.chdir(os.path.dirname(os.path.abspath(__file__)))
 
@@ -31,6 +36,303 @@ def test_read_heif():
         assert im._data
 
 
+@pytest.mark.parametrize("workers", (2, 8))
+def test_read_heif_workers(workers):
+    heif_file_ref = pillow_heif.read_heif(Path("images/heif/zPug_3.heic"))
+    heif_file = pillow_heif.read_heif(Path("images/heif/zPug_3.heic"), workers=workers)
+    for im, im_ref in zip(heif_file, heif_file_ref, strict=True):
+        assert im._data
+        assert im.size == im_ref.size
+        assert bytes(im.data) == bytes(im_ref.data)
+
+
+def test_load_all_executor():
+    heif_file = pillow_heif.open_heif(Path("images/heif/zPug_3.heic"))
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        heif_file.load_all(executor=executor)
+    for im in heif_file:
+        assert im._data
+
+
+@pytest.mark.parametrize("ordered", (True, False))
+def test_decode_many(ordered):
+    sources = [Path("images/heif/zPug_3.heic"), b"invalid data", Path("images/heif/RGB_8__29x100.heif")] * 3
+    results = list(pillow_heif.decode_many(iter(sources), workers=2, ordered=ordered))
+    assert len(results) == len(sources)
+    if ordered:
+        assert [i.index for i in results] == list(range(len(sources)))
+    for result in sorted(results, key=lambda x: x.index):
+        assert result.source is sources[result.index]
+        assert result.open_time >= 0 and result.decode_time >= 0
+        if result.index % 3 == 1:
+            assert result.heif_file is None
+            assert isinstance(result.error, ValueError)
+        else:
+            assert result.error is None
+            assert all(im._data for im in result.heif_file)
+
+
+def test_decode_many_unexpected_errors():
+    class BrokenReader:
+        def read(self, *args):
+            raise KeyError("read")
+
+    sources = [object(), Path("images/heif/RGB_8__29x100.heif"), BrokenReader(), Path("images/heif/zPug_3.heic")]
+    results = list(pillow_heif.decode_many(sources, workers=2))
+    assert [i.index for i in results] == list(range(len(sources)))
+    assert isinstance(results[0].error, TypeError) and results[0].heif_file is None
+    assert isinstance(results[2].error, KeyError) and results[2].heif_file is None
+    for result in (results[1], results[3]):
+        assert result.error is None
+        assert all(im._data for im in result.heif_file)
+
+
+def test_decode_ycbcr():
+    heif_file = pillow_heif.open_heif(Path("images/heif/RGB_8__128x128.heif"))
+    y, cb, cr = heif_file[0].decode_ycbcr()
+    assert not heif_file[0]._data
+    assert y.size == heif_file.size
+    assert y.bit_depth == cb.bit_depth == cr.bit_depth == 8
+    chroma = heif_file.info["chroma"]
+    assert cb.size == cr.size == ((64, 64) if chroma == 420 else (64, 128) if chroma == 422 else (128, 128))
+    for plane in (y, cb, cr):
+        assert plane.stride >= plane.size[0]
+        assert len(plane.data) == plane.stride * plane.size[1]
+    im_y = Image.frombuffer("L", y.size, y.data, "raw", "L", y.stride, 1)
+    im_ref_y = heif_file.to_pillow().convert("YCbCr").getchannel("Y")
+    assert abs(sum(im_y.getdata()) - sum(im_ref_y.getdata())) / (128 * 128) < 8
+    for chroma, size in ((444, (128, 128)), (422, (64, 128)), (420, (64, 64))):
+        _, cb, cr = heif_file[0].decode_ycbcr(chroma)
+        assert cb.size == cr.size == size
+    with pytest.raises(ValueError):
+        heif_file[0].decode_ycbcr(411)
+
+
+def test_decode_ycbcr_planes_outlive_image():
+    planes = pillow_heif.open_heif(Path("images/heif/RGB_8__29x100.heif"))[0].decode_ycbcr(444)
+    collect()
+    assert all(len(bytes(plane.data)) == plane.stride * plane.size[1] for plane in planes)
+
+
+def test_decode_ycbcr_monochrome_hdr():
+    planes = pillow_heif.open_heif(Path("images/heif/L_8__29x100.heif"))[0].decode_ycbcr()
+    assert len(planes) == 1
+    assert planes[0].size == (29, 100)
+    y, cb, cr = pillow_heif.open_heif(Path("images/heif/RGB_10__29x100.heif"), False)[0].decode_ycbcr()
+    assert y.bit_depth == cb.bit_depth == cr.bit_depth == 10
+    assert y.stride >= 29 * 2
+    with pytest.raises(ValueError):
+        pillow_heif.from_bytes("L", (4, 4), bytes(16))[0].decode_ycbcr()
+
+
+@pytest.mark.parametrize("bgr_mode", (False, True))
+@pytest.mark.parametrize("remove_stride", (False, True))
+def test_postprocess_simd(bgr_mode, remove_stride):
+    import _pillow_heif  # noqa pylint: disable=import-outside-toplevel
+
+    images = [f"images/heif/{i}__29x100.heif" for i in ("RGB_8", "RGBA_8", "RGB_10", "RGBA_12", "L_10", "LA_8")]
+    try:
+        for image in images:
+            kwargs = {"bgr_mode": bgr_mode, "remove_stride": remove_stride, "convert_hdr_to_8bit": False}
+            assert _pillow_heif.set_simd(False) == "scalar"
+            ref = pillow_heif.open_heif(Path(image), **kwargs)[0]
+            _pillow_heif.set_simd(True)
+            im = pillow_heif.open_heif(Path(image), **kwargs)[0]
+            assert im.mode == ref.mode and im.stride == ref.stride
+            channels, bits = MODE_INFO[im.mode][:2]
+            row_size = im.size[0] * channels * (2 if bits > 8 else 1)
+            for row in range(0, im.stride * im.size[1], im.stride):
+                assert im.data[row : row + row_size] == ref.data[row : row + row_size]
+    finally:
+        _pillow_heif.set_simd(True)
+
+
+@pytest.mark.parametrize("bgr_mode", (False, True))
+@pytest.mark.parametrize("bytes_in_cc", (1, 2))
+def test_postprocess_simd_stride_in_place(bgr_mode, bytes_in_cc):
+    import _pillow_heif  # noqa pylint: disable=import-outside-toplevel
+
+    # in place stride removal moves each row back by the padding, the kernels must not overwrite unread pixels
+    height = 4
+    try:
+        for padding, channels, width in product((1, 2) if bytes_in_cc == 1 else (2,), (3, 4), range(1, 72)):
+            stride_out = width * channels * bytes_in_cc
+            stride_in = stride_out + padding
+            data = bytes(range(256)) * (stride_in * height // 256 + 1)
+            shift_size = 6 if bytes_in_cc == 2 else 0
+            args = ((width, height), channels, bytes_in_cc, shift_size, bgr_mode, stride_in, stride_out)
+            _pillow_heif.set_simd(False)
+            ref = bytearray(data)
+            _pillow_heif.postprocess(ref, *args, 1)
+            _pillow_heif.set_simd(True)
+            out = bytearray(data)
+            _pillow_heif.postprocess(out, *args, 1)
+            assert out[: stride_out * height] == ref[: stride_out * height], (padding, channels, width)
+    finally:
+        _pillow_heif.set_simd(True)
+
+
+@pytest.mark.parametrize("bgr_mode", (False, True))
+@pytest.mark.parametrize("bytes_in_cc", (1, 2))
+def test_postprocess_bands(bgr_mode, bytes_in_cc):
+    import _pillow_heif  # noqa pylint: disable=import-outside-toplevel
+
+    # images above 4K (3840x2160x3 bytes) are split in bands between threads, result must not depend on it
+    width, height, channels = 3840 // bytes_in_cc + 1, 2203, 3
+    stride = width * channels * bytes_in_cc + 8
+    data = bytes(range(251)) * (stride * height // 251 + 1)
+    shift_size = 4 if bytes_in_cc == 2 else 0
+    args = ((width, height), channels, bytes_in_cc, shift_size, bgr_mode, stride, stride)
+    ref = bytearray(data)
+    _pillow_heif.postprocess(ref, *args, 1)
+    for threads in (2, 5, 16):
+        out = bytearray(data)
+        _pillow_heif.postprocess(out, *args, threads)
+        assert out == ref, threads
+
+
+def test_unload():
+    heif_file = pillow_heif.open_heif(Path("images/heif/zPug_3.heic"))
+    data = bytes(heif_file[1].data)
+    view = memoryview(heif_file[1].data)
+    with pytest.raises(BufferError):
+        heif_file[1].unload()
+    assert heif_file[1]._data  # the image keeps its data when it can not be unloaded
+    assert bytes(heif_file[1]._data) == data
+    view.release()
+    heif_file[1].unload()
+    assert not heif_file[1]._data
+    assert bytes(heif_file[1].data) == data
+    heif_file[0].unload()  # not decoded image
+    heif_file.add_frombytes("RGB", (2, 2), bytes(12))
+    heif_file[3].unload()
+    assert heif_file[3].data == bytes(12)
+
+
+@pytest.mark.parametrize("in_memory", (False, True))
+def test_release_input(in_memory):
+    fp = Path("images/heif/zPug_3.heic")
+    heif_file = pillow_heif.open_heif(fp.read_bytes() if in_memory else fp)
+    heif_file[0].load()
+    data = bytes(heif_file[0].data)
+    heif_file.release_input()
+    heif_file.release_input()
+    assert bytes(heif_file[0].data) == data
+    assert heif_file[0].info["thumbnails"] == [32, 16]
+    assert heif_file[1].info["thumbnails"] == [32]
+    with pytest.raises(ValueError):
+        heif_file[1].load()
+    with pytest.raises(ValueError):
+        heif_file[0].get_thumbnail(0)
+    heif_file[0].unload()
+    with pytest.raises(ValueError):
+        heif_file[0].load()
+
+
+def test_frame_cache():
+    heif_file = pillow_heif.open_heif(Path("images/heif/zPug_3.heic"), frame_cache_size=2)
+    data = [bytes(im.data) for im in heif_file]
+    assert [bool(im._data) for im in heif_file] == [False, True, True]
+    assert heif_file[1]._data  # most recently used now
+    assert bytes(heif_file[0].data) == data[0]
+    assert [bool(im._data) for im in heif_file] == [True, True, False]
+    images = list(heif_file)
+    view = memoryview(images[1].data)
+    images[2].load()
+    assert [bool(im._data) for im in heif_file] == [True, True, True]  # image in use stays decoded
+    view.release()
+    assert heif_file[2]._data  # image that was in use is still in the cache and is unloaded now
+    assert [bool(im._data) for im in heif_file] == [True, False, True]
+    del heif_file[1]
+    assert [bytes(im.data) for im in heif_file] == [data[0], data[2]]
+
+
+def test_frame_cache_bytes():
+    heif_file = pillow_heif.open_heif(Path("images/heif/zPug_3.heic"), frame_cache_bytes=1)
+    for im in heif_file:
+        im.load()
+        assert sum(bool(i._data) for i in heif_file) == 1
+
+
+def test_frame_cache_pillow():
+    pillow_heif.options.FRAME_CACHE_SIZE = 1
+    try:
+        im = Image.open(Path("images/heif/zPug_3.heic"))
+        for frame in ImageSequence.Iterator(im):
+            frame.load()
+            assert sum(bool(i._data) for i in im._heif_file) == 1
+    finally:
+        pillow_heif.options.FRAME_CACHE_SIZE = 0
+
+
+@pytest.mark.parametrize("on_disk", (False, True))
+def test_decode_cache(on_disk, tmp_path):
+    cache = pillow_heif.HeifDecodeCache(64 * 1024 * 1024, tmp_path if on_disk else None)
+    heif_file_ref = pillow_heif.read_heif(Path("images/heif/zPug_3.heic"))
+    for fp in (Path("images/heif/zPug_3.heic"), Path("images/heif/zPug_3.heic").read_bytes()):
+        heif_file = pillow_heif.open_heif(fp, cache=cache)
+        assert heif_file.primary_index == heif_file_ref.primary_index
+        assert heif_file.mimetype == heif_file_ref.mimetype
+        for im, im_ref in zip(heif_file, heif_file_ref, strict=True):
+            assert im.mode == im_ref.mode and im.size == im_ref.size
+            assert bytes(im.data) == bytes(im_ref.data)
+            assert im.info["exif"] == im_ref.info["exif"]
+            assert im.info["bit_depth"] == im_ref.info["bit_depth"]
+    assert (cache.hits, cache.misses) == (1, 1)
+    from_cache = pillow_heif.read_heif(BytesIO(Path("images/heif/zPug_3.heic").read_bytes()), cache=cache)
+    assert from_cache.mode == heif_file_ref.mode
+    heif_file_bgr = pillow_heif.open_heif(Path("images/heif/zPug_3.heic"), bgr_mode=True)
+    assert pillow_heif.open_heif(Path("images/heif/zPug_3.heic"), bgr_mode=True, cache=cache).mode == heif_file_bgr.mode
+    assert (cache.hits, cache.misses) == (2, 2)
+    if on_disk:
+        cache = pillow_heif.HeifDecodeCache(64 * 1024 * 1024, tmp_path)
+        pillow_heif.open_heif(Path("images/heif/zPug_3.heic"), cache=cache)
+        assert (cache.hits, cache.misses) == (1, 0)
+    misses = cache.misses
+    cache.clear()
+    pillow_heif.open_heif(Path("images/heif/zPug_3.heic"), cache=cache)
+    assert cache.misses == misses + 1
+
+
+def test_decode_cache_limit():
+    cache = pillow_heif.HeifDecodeCache(1)
+    for _ in range(2):
+        assert bytes(pillow_heif.open_heif(Path("images/heif/RGB_8__29x100.heif"), cache=cache).data)
+    assert (cache.hits, cache.misses) == (0, 2)
+
+
+def test_open_heif_without_metadata():
+    heif_file_ref = pillow_heif.open_heif(Path("images/heif/zPug_3.heic"))
+    heif_file = pillow_heif.open_heif(Path("images/heif/zPug_3.heic"), metadata=False)
+    assert heif_file.primary_index == heif_file_ref.primary_index
+    for im, im_ref in zip(heif_file, heif_file_ref, strict=True):
+        assert im.info == {"primary": im_ref.info["primary"], "bit_depth": im_ref.info["bit_depth"]}
+        assert im.mode == im_ref.mode and im.size == im_ref.size
+        assert bytes(im.data) == bytes(im_ref.data)
+    assert heif_file_ref[0].info["thumbnails"]
+    assert pillow_heif.read_heif(Path("images/heif/zPug_3.heic"), metadata=False).to_pillow().info == {
+        "primary": True,
+        "bit_depth": 8,
+        "original_orientation": None,
+    }
+
+
+def test_open_heif_async():
+    async def open_and_load(path):
+        heif_file = await pillow_heif.open_heif_async(path)
+        assert not heif_file[0]._data
+        await heif_file[0].load_async()
+        return heif_file
+
+    async def main():
+        return await asyncio.gather(*[open_and_load(Path("images/heif/zPug_3.heic")) for _ in range(40)])
+
+    heif_file_ref = pillow_heif.open_heif(Path("images/heif/zPug_3.heic"))
+    for heif_file in asyncio.run(main()):
+        assert heif_file[0]._data
+        assert bytes(heif_file[0].data) == bytes(heif_file_ref[0].data)
+
+
 @pytest.mark.parametrize("img_path", ("images/heif/zPug_3.heic", "images/heif_other/arrow.heic"))
 def test_native_copy_heif(img_path):
     im_heif = pillow_heif.open_heif(Path(img_path))
@@ -196,6 +498,91 @@ def test_pillow_after_load():
         assert len(ImageSequence.Iterator(img)[2].tobytes())
 
 
+@pytest.mark.parametrize("img_path", [Path("images/heif/zPug_3.heic"), "images/heif_other/cat.hif"])
+def test_heif_open_without_reading_file(img_path):
+    with mock.patch("pillow_heif.misc._get_bytes", side_effect=AssertionError("whole file was read")):
+        heif_file = pillow_heif.open_heif(img_path)
+    heif_file_bytes = pillow_heif.open_heif(Path(img_path).read_bytes())
+    collect()
+    assert heif_file.mimetype == heif_file_bytes.mimetype
+    for image, image_bytes in zip(heif_file, heif_file_bytes, strict=True):
+        assert image.data == image_bytes.data
+
+
+def test_heif_input_after_prefix(tmp_path):
+    data = Path("images/heif/zPug_3.heic").read_bytes()
+    path = tmp_path / "embedded.bin"
+    path.write_bytes(b"prefix-data" + data)
+    with builtins.open(path, "rb") as fh:
+        if hasattr(os, "pread"):
+            with _heif_input(fh) as heif_input:
+                assert isinstance(heif_input, int)  # at offset 0 the descriptor is passed to libheif
+        fh.seek(len(b"prefix-data"))
+        with _heif_input(fh) as heif_input:
+            assert heif_input == data  # libheif reads descriptors from offset 0, the stream is read from its position
+    heif_file = pillow_heif.open_heif(heif_input)
+    assert heif_file.mimetype == "image/heic"
+    assert heif_file[1].data == pillow_heif.open_heif(data)[1].data
+
+
+def test_heif_buffer_inputs():
+    img_path = Path("images/heif/zPug_3.heic")
+    data = img_path.read_bytes()
+    with builtins.open(img_path, "rb") as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for fp in [bytearray(data), memoryview(data), mm]:
+            heif_file = pillow_heif.open_heif(fp)
+            assert heif_file.mimetype == "image/heic"
+            assert len(heif_file) == 3
+            assert heif_file[1].data == pillow_heif.open_heif(data)[1].data
+            heif_file = None  # noqa
+            collect()
+
+
+def test_heif_buffer_input_pinned():
+    buffer = bytearray(Path("images/heif/zPug_3.heic").read_bytes())
+    heif_file = pillow_heif.open_heif(buffer)
+    with pytest.raises(BufferError):
+        buffer.clear()
+    assert len(heif_file[0].data) > 0
+
+
+def test_heif_buffer_input_not_contiguous():
+    data = memoryview(Path("images/heif/zPug_3.heic").read_bytes())[::2]
+    with pytest.raises(ValueError):
+        pillow_heif.open_heif(data)
+
+
+def test_heif_decode_after_file_closed():
+    with builtins.open(Path("images/heif/zPug_3.heic"), "rb") as fh:
+        heif_file = pillow_heif.open_heif(fh)
+    assert fh.closed
+    for image in heif_file:
+        assert len(image.data) > 0
+
+
+@pytest.mark.parametrize("img_path", dataset.MINIMAL_DATASET)
+def test_probe_heif(img_path):
+    heif_file = pillow_heif.open_heif(img_path)
+    probe = pillow_heif.probe_heif(img_path)
+    assert probe.mimetype == heif_file.mimetype
+    assert probe.primary_index == heif_file.primary_index
+    assert len(probe) == len(heif_file)
+    for probe_image, image in zip(probe.images, heif_file, strict=True):
+        assert probe_image.size == image.size
+        assert probe_image.mode == image.mode
+        assert probe_image.bit_depth == image.info["bit_depth"]
+        assert probe_image.primary == image.info["primary"]
+        assert probe_image.has_alpha == image.has_alpha
+
+
+def test_probe_heif_modes():
+    probe = pillow_heif.probe_heif(Path("images/heif/RGBA_10__29x100.heif"), convert_hdr_to_8bit=False, bgr_mode=True)
+    assert probe.images[0].mode == "BGRA;16"
+    assert probe.images[0].bit_depth == 10
+    probe = pillow_heif.probe_heif(Path("images/heif/RGBA_10__29x100.heif"))
+    assert probe.images[0].mode == "RGBA"
+
+
 @pytest.mark.parametrize("img_path", dataset.MINIMAL_DATASET)
 def test_heif_from_heif(img_path):
     def heif_from_heif(hdr_to_8bit=True):
@@ -331,6 +718,30 @@ def test_pillow_truncated_ok(img_path):
         frame.load()
 
 
+def test_heif_lazy_info():
+    heif_file = pillow_heif.open_heif(Path("images/heif_other/cat.hif"))
+    heif_file_info = pillow_heif.open_heif(Path("images/heif_other/cat.hif")).info.copy()
+    info = heif_file.info
+    assert set(dict.keys(info)) <= {"primary", "bit_depth", "chroma"}  # only these are read when opening
+    assert info.get("icc_profile") == heif_file_info.get("icc_profile")
+    assert "exif" not in dict.keys(info)
+    assert info.get("xmp") == heif_file_info.get("xmp")
+    assert "exif" in dict.keys(info)
+    assert info == heif_file_info
+    assert isinstance(copy(info), dict)
+    assert deepcopy(info) == heif_file_info
+
+
+def test_heif_lazy_info_set():
+    info = pillow_heif.open_heif(Path("images/heif/zPug_3.heic"))[1].info
+    info["exif"] = b"Exif\x00\x00"
+    del info["metadata"]
+    assert info["exif"] == b"Exif\x00\x00"
+    assert "metadata" not in info
+    assert info.pop("thumbnails")
+    assert "thumbnails" not in list(info)
+
+
 def test_heif_index():
     heif_file = pillow_heif.open_heif(Path("images/heif/zPug_3.heic"))
     with pytest.raises(IndexError):
@@ -449,7 +860,11 @@ def test_aux_image_ycbcr():
     "img_path,tiling",
     (
         # arrow.heic has orientation 6, `tiling` should be in the display space, the same as `size`
-        ("images/heif_other/arrow.heic", {"num_columns": 6, "num_rows": 8, "image_width": 3024, "image_height": 4032}),
+        # its partial tiles are in the first column after the rotation: the grid starts 48 pixels to the left
+        (
+            "images/heif_other/arrow.heic",
+            {"num_columns": 6, "num_rows": 8, "image_width": 3024, "image_height": 4032, "left_offset": 48},
+        ),
         ("images/heif_other/pug.heic", {"num_columns": 8, "num_rows": 6, "image_width": 4032, "image_height": 3024}),
         (
             "images/heif_special/xiaomi.heic",
@@ -463,10 +878,84 @@ def test_read_tiling_info(img_path, tiling):
     if tiling is None:
         assert im.info.get("tiling") is None
     else:
-        assert im.info["tiling"] == {**tiling, "tile_width": 512, "tile_height": 512}
+        assert im.info["tiling"] == {
+            "tile_width": 512,
+            "tile_height": 512,
+            "top_offset": 0,
+            "left_offset": 0,
+            **tiling,
+        }
         assert (im.info["tiling"]["image_width"], im.info["tiling"]["image_height"]) == im.size
 
 
+@pytest.mark.parametrize(
+    "img_path,box,decoded_tiles",
+    (
+        ("images/heif_other/pug.heic", (0, 0, 512, 512), 1),
+        ("images/heif_other/pug.heic", (500, 1000, 100, 100), 4),
+        ("images/heif_other/pug.heic", (3900, 2900, 132, 124), 1),
+        ("images/heif_other/arrow.heic", (1000, 3000, 600, 300), 4),
+        ("images/heif/zPug_3.heic", (10, 20, 30, 40), 1),
+    ),
+)
+def test_decode_region(img_path, box, decoded_tiles):
+    im = pillow_heif.open_heif(img_path)
+    region = im.decode_region(box)
+    assert region.size == box[2:]
+    assert region.mode == im.mode
+    assert region.info["decoded_tiles"] == decoded_tiles
+    assert getattr(im[im.primary_index], "_data") is None
+    x, y, w, h = box
+    expected = im.to_pillow().crop((x, y, x + w, y + h))
+    helpers.assert_image_equal(region.to_pillow(), expected)
+    # image is decoded already, region is just a crop of it
+    assert im.decode_region(box).info["decoded_tiles"] == 0
+    helpers.assert_image_equal(im.decode_region(box).to_pillow(), expected)
+
+
+@pytest.mark.parametrize("box", ((-1, 0, 10, 10), (0, 0, 0, 10), (4000, 0, 33, 10), (0, 3000, 10, 25)))
+def test_decode_region_invalid(box):
+    im = pillow_heif.open_heif("images/heif_other/pug.heic")
+    with pytest.raises(ValueError):
+        im.decode_region(box)
+
+
+@pytest.mark.parametrize("img_path", ("images/heif_other/pug.heic", "images/heif_other/arrow.heic"))
+def test_iter_tiles(img_path):
+    im = pillow_heif.open_heif(img_path)
+    tiling = im.info["tiling"]
+    canvas = Image.new(im.mode, im.size)
+    n_tiles = 0
+    columns = set()
+    for x, y, tile in im[im.primary_index].iter_tiles():
+        column = (x + tiling["left_offset"]) // tiling["tile_width"]
+        x1 = min((column + 1) * tiling["tile_width"] - tiling["left_offset"], im.size[0])
+        row = (y + tiling["top_offset"]) // tiling["tile_height"]
+        y1 = min((row + 1) * tiling["tile_height"] - tiling["top_offset"], im.size[1])
+        assert tile.size == (x1 - x, y1 - y)
+        canvas.paste(tile.to_pillow(), (x, y))
+        columns.add(x)
+        n_tiles += 1
+    assert len(columns) == tiling["num_columns"]
+    assert n_tiles == tiling["num_columns"] * tiling["num_rows"]
+    assert getattr(im[im.primary_index], "_data") is None
+    helpers.assert_image_equal(canvas, im.to_pillow())
+
+
+def test_iter_tiles_without_metadata():
+    im = pillow_heif.open_heif("images/heif_other/pug.heic", metadata=False)
+    tiling = pillow_heif.open_heif("images/heif_other/pug.heic").info["tiling"]
+    assert "tiling" not in im.info
+    tiles = list(im[im.primary_index].iter_tiles())
+    assert len(tiles) == tiling["num_columns"] * tiling["num_rows"] > 1
+    assert getattr(im[im.primary_index], "_data") is None
+
+
+def test_iter_tiles_not_tiled():
+    im = pillow_heif.open_heif("images/heif/zPug_3.heic")[0]
+    assert list(im.iter_tiles()) == [(0, 0, im)]
+
+
 def test_read_heif_metadata():
     im = pillow_heif.open_heif("images/heif_other/spatial_photo.heic")
     assert "heif" in im.info
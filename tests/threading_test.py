@@ -3,6 +3,7 @@
 import os
 import threading
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import suppress
 from io import BytesIO
 
 import pytest
@@ -98,6 +99,29 @@ def test_concurrent_access_shared_object(img):
         assert result == first
 
 
+def test_concurrent_unload_and_decode_region():
+    """`unload` must not release the decoded image while a region is being copied from it or decoded."""
+    heif_image = open_heif("images/heif/RGB_8__128x128.heif")[0]
+    expected = bytes(heif_image.decode_region((10, 20, 64, 64)).data)
+    stop = threading.Event()
+
+    def unload_loop():
+        while not stop.is_set():
+            with suppress(BufferError):
+                heif_image.unload()
+            heif_image.load()
+
+    unloader = threading.Thread(target=unload_loop)
+    unloader.start()
+    try:
+        for _ in range(200):
+            assert bytes(heif_image.decode_region((10, 20, 64, 64)).data) == expected
+            assert len(heif_image.decode_ycbcr()) == 3
+    finally:
+        stop.set()
+        unloader.join()
+
+
 def test_concurrent_decode_data_integrity():
     """Decoded data is bit-identical regardless of concurrent access."""
     img = "images/heif/RGB_8__128x128.heif"
@@ -143,6 +167,40 @@ def test_concurrent_encode():
         assert result == first
 
 
+@pytest.mark.skipif(not hevc_enc(), reason="No HEVC encoder.")
+def test_concurrent_save(tmp_path):
+    """Multiple threads save the same file concurrently, each to its own path and file object."""
+    im = Image.fromarray(np.random.default_rng(0).integers(0, 256, (256, 256, 3), dtype=np.uint8))
+    heif_file = from_pillow(im)
+
+    def _save(i):
+        heif_file.save(tmp_path / f"{i}.heic", quality=-1)
+        with open(tmp_path / f"{i}_fp.heic", "wb") as fp:
+            heif_file.save(fp, quality=-1)
+        return [bytes(open_heif(tmp_path / f"{i}{suffix}.heic").data) for suffix in ("", "_fp")]
+
+    with ThreadPoolExecutor(max_workers=N_WORKERS) as executor:
+        results = list(executor.map(_save, range(N_WORKERS * N_ITERATIONS)))
+    for result in results:
+        assert result == results[0][:1] * 2
+
+
+@pytest.mark.skipif(not hevc_enc(), reason="No HEVC encoder.")
+@pytest.mark.skipif(not hasattr(os, "mkfifo"), reason="Requires named pipes.")
+def test_save_releases_gil(tmp_path):
+    """Saving to a named pipe blocks until another Python thread reads from it, which needs the GIL released."""
+    im = Image.fromarray(np.random.default_rng(0).integers(0, 256, (256, 256, 3), dtype=np.uint8))
+    heif_file = from_pillow(im)
+    fifo = tmp_path / "out.heic"
+    os.mkfifo(fifo)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        future = executor.submit(fifo.read_bytes)
+        heif_file.save(fifo, quality=-1)
+        data = future.result(timeout=60)
+    assert len(data) > 64 * 1024  # larger than the buffer of a pipe
+    assert open_heif(BytesIO(data)).size == im.size
+
+
 def test_concurrent_shared_object_data_integrity():
     """Multiple threads reading .data from the same unloaded object get identical bytes."""
     img = "images/heif/RGB_8__128x128.heif"
@@ -461,3 +519,23 @@ def test_concurrent_load_explicit():
         for t in threads:
             t.join(timeout=10)
         assert not errors, f"Errors in concurrent load: {errors}"
+
+
+def test_concurrent_postprocess_bands():
+    """Concurrent postprocess of images above 4K, band threads are shared between the calls."""
+    import _pillow_heif  # noqa pylint: disable=import-outside-toplevel
+
+    width, height = 3841, 2203
+    stride = width * 3
+    data = bytes(range(251)) * (stride * height // 251 + 1)
+    args = ((width, height), 3, 1, 0, True, stride, stride)
+    ref = bytearray(data)
+    _pillow_heif.postprocess(ref, *args, 1)
+
+    def _postprocess(threads):
+        out = bytearray(data)
+        _pillow_heif.postprocess(out, *args, threads)
+        return out == ref
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        assert all(executor.map(_postprocess, (4, 16, 4, 2, 16, 8, 4, 3)))
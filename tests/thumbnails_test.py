@@ -27,6 +27,68 @@ def test_pillow_thumbnails_present():
             assert len(img.info["thumbnails"]) == 0
 
 
+def test_heif_get_thumbnail():
+    heif_file = pillow_heif.open_heif(Path("images/heif/zPug_3.heic"))
+    for i, box in enumerate(heif_file[0].info["thumbnails"]):
+        thumbnail = heif_file[0].get_thumbnail(i)
+        assert isinstance(thumbnail, pillow_heif.HeifThumbnailImage)
+        assert max(thumbnail.size) == box
+        assert thumbnail.mode == heif_file[0].mode
+        assert len(thumbnail.data) == thumbnail.stride * thumbnail.size[1]
+        assert thumbnail.to_pillow().size == thumbnail.size
+    assert "with no image data" in repr(heif_file[0])
+    with pytest.raises(IndexError):
+        heif_file[0].get_thumbnail(2)
+    with pytest.raises(IndexError):
+        heif_file[2].get_thumbnail(0)
+
+
+def test_heif_get_thumbnail_bgr():
+    heif_file = pillow_heif.open_heif(Path("images/heif/zPug_3.heic"), bgr_mode=True)
+    thumbnail = heif_file[0].get_thumbnail(0)
+    assert thumbnail.mode == heif_file[0].mode
+    assert thumbnail.mode.startswith("BGR")
+
+
+def test_pillow_draft():
+    im = Image.open(Path("images/heif/zPug_3.heic"))
+    original_size = im.size
+    assert im.draft(None, (original_size[0], original_size[1])) is None
+    assert im.draft(None, (1024, 1024)) is None
+    mode, box = im.draft(None, (16, 16))
+    assert mode == im.mode
+    assert box == (0, 0, *im.size)
+    assert max(im.size) in (16, 32)
+    assert im.size[0] >= 16 and im.size[1] >= 16
+    assert im.decoderconfig[0] > 1
+    im.load()
+    assert im.size == box[2:]
+    assert im.info["thumbnails"] == [32]  # of the primary image
+    im.load()  # multi-frame file: loading again uses the draft thumbnail too
+    assert im.size == box[2:]
+    im.seek(0)
+    im.load()
+    assert im.size == pillow_heif.open_heif(Path("images/heif/zPug_3.heic"))[0].size
+
+
+def test_pillow_draft_no_thumbnails():
+    im = Image.open(Path("images/heif/zPug_3.heic"))
+    im.seek(2)
+    assert im.draft(None, (8, 8)) is None
+    im.load()
+    assert im.size == pillow_heif.open_heif(Path("images/heif/zPug_3.heic"))[2].size
+
+
+def test_pillow_draft_thumbnail():
+    im = Image.open(Path("images/heif/zPug_3.heic"))
+    original_size = im.size
+    im.thumbnail((8, 8))
+    assert max(im.size) == 8
+    im_full = Image.open(Path("images/heif/zPug_3.heic"))
+    im_full.load()
+    assert im_full.size == original_size
+
+
 def test_heif_to_pillow_thumbnails():
     heif_file = pillow_heif.open_heif(Path("images/heif/zPug_3.heic"))
     assert heif_file[0].to_pillow().info["thumbnails"] == [32, 16]
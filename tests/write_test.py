@@ -1,3 +1,4 @@
+import asyncio
 import builtins
 import math
 import os
@@ -76,6 +77,64 @@ def test_outputs():
         heif_file.save(bytes(b"1234567890"), quality=10)
 
 
+def test_outputs_streaming():
+    heif_file = pillow_heif.open_heif(helpers.create_heif((31, 64)))
+    ref = BytesIO()
+    heif_file.save(ref, quality=10)
+
+    class Writer:  # writes at most 100 bytes per call, keeps references to the passed chunks
+        def __init__(self):
+            self.chunks = []
+            self.data = bytearray()
+
+        def write(self, chunk):
+            self.chunks.append(chunk)
+            self.data += chunk[:100]
+            return min(len(chunk), 100)
+
+    writer = Writer()
+    heif_file.save(writer, quality=10)
+    assert bytes(writer.data) == ref.getvalue()
+    assert all(isinstance(chunk, bytes) and 0 < len(chunk) <= 1 << 20 for chunk in writer.chunks)
+
+    class KeepingWriter:  # only stores the chunks, e.g. to upload them later
+        def __init__(self):
+            self.chunks = []
+
+        def write(self, chunk):
+            self.chunks.append(chunk)
+
+    writer = KeepingWriter()
+    heif_file.save(writer, quality=10)
+    assert b"".join(writer.chunks) == ref.getvalue()
+    with builtins.open(Path("tmp.heic"), "wb", buffering=0) as output:
+        heif_file.save(output, quality=10)
+    assert Path("tmp.heic").read_bytes() == ref.getvalue()
+    Path("tmp.heic").unlink()
+
+
+def test_outputs_write_error():
+    heif_file = pillow_heif.open_heif(helpers.create_heif((31, 64)))
+    writer = mock.Mock()
+    writer.write.side_effect = OSError("disk is full")
+    with pytest.raises(OSError, match="disk is full"):
+        heif_file.save(writer, quality=10)
+
+
+def test_outputs_path_errors(tmp_path):
+    heif_file = pillow_heif.open_heif(helpers.create_heif((31, 64)))
+    with pytest.raises(OSError) as exc_info:
+        heif_file.save(tmp_path / "missing" / "out.heic", quality=10)
+    assert exc_info.value.filename == str(tmp_path / "missing" / "out.heic")
+    existing = tmp_path / "existing.heic"
+    existing.write_bytes(b"old content")
+    with pytest.raises(ValueError):
+        pillow_heif.encode("RGB", (64, 64), bytes(64), existing)
+    assert existing.read_bytes() == b"old content"
+    heif_file.save(existing, quality=10)
+    assert pillow_heif.open_heif(existing).size == (31, 64)
+
+
 def test_heif_save_one_all():
     im = pillow_heif.open_heif(helpers.create_heif((61, 64), n_images=2))
     out_heif = BytesIO()
@@ -85,6 +144,13 @@ def test_heif_save_one_all():
     assert len(pillow_heif.open_heif(out_heif)) == 1
 
 
+def test_heif_save_async():
+    im = pillow_heif.open_heif(helpers.create_heif((61, 64), n_images=2))
+    out_heif = BytesIO()
+    asyncio.run(im.save_async(out_heif, quality=-1))
+    assert len(pillow_heif.open_heif(out_heif)) == 2
+
+
 def test_pillow_save_one_all():
     im = Image.open(helpers.create_heif((61, 64), n_images=2))
     out_heif = BytesIO()
@@ -780,6 +846,85 @@ def test_grid_encoding_non_divisible():
     helpers.assert_image_similar(im_single.crop(bottom_rows), im_out.crop(bottom_rows), 3.0)
 
 
+@pytest.mark.parametrize("mode", ("L", "I;16"))
+def test_grid_encoding_non_divisible_gray(mode):
+    im = Image.linear_gradient("L").resize((150, 99))
+    if mode == "I;16":
+        im = im.convert("I").point(lambda v: v * 256).convert("I;16")
+    buf_grid, buf_single = BytesIO(), BytesIO()
+    im.save(buf_grid, format="HEIF", tile_size=64)
+    im.save(buf_single, format="HEIF", tile_size=0)
+    assert _get_tiling_info(buf_grid)["num_columns"] == 3
+    im_grid, im_single = Image.open(buf_grid), Image.open(buf_single)
+    assert im_grid.mode == im_single.mode
+    # the right and bottom edge tiles are partial, compare their edges with the single image encoding
+    for box in ((im.size[0] - 2, 0, im.size[0], im.size[1]), (0, im.size[1] - 2, im.size[0], im.size[1])):
+        a, b = im_single.crop(box).convert("I"), im_grid.crop(box).convert("I")
+        if mode == "I;16":
+            a, b = a.point(lambda v: v / 256), b.point(lambda v: v / 256)
+        helpers.assert_image_similar(a, b, 3.0)
+
+
+@pytest.mark.parametrize("as_iterator", (False, True))
+def test_encode_tiles(as_iterator):
+    im = helpers.gradient_rgb().resize((301, 201))
+    buf_ref = BytesIO()
+    im.save(buf_ref, format="HEIF", tile_size=64)
+    requested = []
+
+    def get_tile(box):
+        requested.append(box)
+        return im.crop((box[0], box[1], box[0] + box[2], box[1] + box[3])).tobytes()
+
+    tiles_boxes = [(x, y, min(64, 301 - x), min(64, 201 - y)) for y in range(0, 201, 64) for x in range(0, 301, 64)]
+    tiles = (get_tile(box) for box in tiles_boxes) if as_iterator else get_tile
+    buf = BytesIO()
+    pillow_heif.encode_tiles("RGB", im.size, tiles, buf, tile_size=64)
+    assert requested == tiles_boxes
+    assert _get_tiling_info(buf)["num_columns"] == 5
+    assert bytes(pillow_heif.open_heif(buf).data) == bytes(pillow_heif.open_heif(buf_ref).data)
+
+
+def test_encode_tiles_thumbnail_source():
+    im = helpers.gradient_rgb().resize((512, 384))
+    preview = im.resize((128, 96))
+
+    def get_tile(box):
+        return im.crop((box[0], box[1], box[0] + box[2], box[1] + box[3])).tobytes()
+
+    with pytest.raises(ValueError, match="thumbnail_source"):
+        pillow_heif.encode_tiles("RGB", im.size, get_tile, BytesIO(), tile_size=128, thumbnails=[64])
+    buf = BytesIO()
+    pillow_heif.encode_tiles(
+        "RGB",
+        im.size,
+        get_tile,
+        buf,
+        tile_size=128,
+        thumbnails=[64, 256],  # 256 is larger than the downscaled source and is skipped
+        thumbnail_source=(preview.size, preview.tobytes()),
+    )
+    heif_file = pillow_heif.open_heif(buf)
+    assert heif_file.info["thumbnails"] == [64]
+    thumbnail = heif_file[0].get_thumbnail(0)
+    assert thumbnail.size == (64, 48)
+    # 64x48 thumbnail of a gradient: compression artifacts are larger than in full-size images
+    for channel, channel_out in zip(preview.resize((64, 48)).split(), thumbnail.to_pillow().split(), strict=True):
+        helpers.assert_image_similar(channel, channel_out, 5.0)
+
+
+def test_encode_tiles_errors():
+    tile = bytes(64 * 64 * 3)
+    with pytest.raises(ValueError, match="tile_size"):
+        pillow_heif.encode_tiles("RGB", (128, 128), [tile] * 4, BytesIO())
+    with pytest.raises(ValueError, match="RGBA"):
+        pillow_heif.encode_tiles("RGBA", (128, 128), [tile] * 4, BytesIO(), tile_size=64)
+    with pytest.raises(ValueError, match="Not enough tiles"):
+        pillow_heif.encode_tiles("RGB", (128, 128), [tile] * 3, BytesIO(), tile_size=64)
+    with pytest.raises(ValueError, match="enough data"):
+        pillow_heif.encode_tiles("RGB", (128, 128), [tile[:-1]] * 4, BytesIO(), tile_size=64)
+
+
 def test_grid_encoding_rgba():
     # images with alpha fall back to single-image encoding: Apple's ImageIO ignores per-tile alpha
     im = helpers.gradient_rgba()